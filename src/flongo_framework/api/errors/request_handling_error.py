@@ -11,10 +11,12 @@ class RequestHandlingError(API_Error):
                  message:str = 'Error Handling Request',
                  data:Optional[dict] = None, 
                  status_code:int = 500, 
-                 stack_trace:Union[str, None] = None
+                 stack_trace:Union[str, None] = None,
+                 headers:Optional[dict] = None
         ):
 
         self.message = message
         self.data = data or {}
         self.status_code = status_code
         self.stack_trace = stack_trace
+        self.headers = headers or {}
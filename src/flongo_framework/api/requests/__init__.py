@@ -1,2 +1,4 @@
 from .request import App_Request
 from .identity import Request_Identity
+from .pagination import Request_Pagination
+from .projection import Request_Projection
@@ -31,6 +31,8 @@ class Request_Identity:
 
     @classmethod
     def from_dict(cls, data:dict) -> "Request_Identity":
+        # Copied so the claims of the request's JWT can be read again
+        data = dict(data)
         return Request_Identity(data.pop("sub"), **data)
 
 
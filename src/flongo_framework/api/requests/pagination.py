@@ -0,0 +1,215 @@
+import base64
+import json
+import traceback
+from collections.abc import Mapping
+from typing import Any, Optional
+
+from bson import json_util
+from pymongo import ASCENDING, DESCENDING
+
+from ...api.responses.errors.api_error import API_Error
+
+class Request_Pagination:
+    ''' Keyset pagination parsed from a request payload
+
+        Supports the following reserved payload fields:
+        - limit: The number of records to return (capped by the route maximum)
+        - sort: The field to sort by. Prefix with `-` to sort descending (e.g. `-created`).
+          Only `_id` and the sort fields allowed by the route can be used
+        - after: The opaque cursor returned with the previous page
+
+        Records are always ordered by the sort field and then by `_id` so that
+        the next page can be found by seeking past the last record returned
+        instead of skipping over all previous records
+    '''
+
+    LIMIT_FIELD = 'limit'
+    SORT_FIELD = 'sort'
+    AFTER_FIELD = 'after'
+
+    def __init__(self,
+            limit:int=0,
+            sort_field:str='_id',
+            sort_order:int=ASCENDING,
+            after:Optional[tuple[Any, Any]]=None
+        ) -> None:
+        # Maximum number of records in a page. 0 returns all records
+        self.limit = limit
+        # Field and direction to sort the records by
+        self.sort_field = sort_field
+        self.sort_order = sort_order
+        # Sort field value and _id of the last record of the previous page
+        self.after = after
+
+
+    @property
+    def sort(self) -> list[tuple[str, int]]:
+        ''' Get the sort specification, ending with `_id` as a tie breaker '''
+
+        if self.sort_field == '_id':
+            return [('_id', self.sort_order)]
+
+        return [(self.sort_field, self.sort_order), ('_id', self.sort_order)]
+
+
+    @property
+    def query_limit(self) -> int:
+        ''' Get the number of records to query for. One extra record
+            is read to tell if there is a next page
+        '''
+
+        return self.limit + 1 if self.limit else 0
+
+
+    def apply(self, search_payload:dict) -> dict:
+        ''' Add the keyset condition for the requested page to a MongoDB filter '''
+
+        if not self.after:
+            return search_payload
+
+        operator = '$gt' if self.sort_order == ASCENDING else '$lt'
+        value, _id = self.after
+        if self.sort_field == '_id':
+            keyset = {'_id': {operator: _id}}
+        else:
+            # Records with the same sort value as the last record are ordered by _id
+            same_value = {self.sort_field: value, '_id': {operator: _id}}
+            # Null and missing values sort before all other values, but
+            # comparison operators (like `$gt: null`) never match them
+            if value is None:
+                keyset = {'$or': [{self.sort_field: {'$ne': None}}, same_value]} if self.sort_order == ASCENDING else same_value
+            else:
+                keyset = {'$or': [{self.sort_field: {operator: value}}, same_value]}
+                if self.sort_order == DESCENDING:
+                    keyset['$or'].append({self.sort_field: None})
+
+        return {'$and': [search_payload, keyset]} if search_payload else keyset
+
+
+    def trim(self, records:list[dict]) -> Optional[str]:
+        ''' Remove the extra record read past the end of the page from a list of
+            records. Returns the cursor for the next page if there is one
+        '''
+
+        if not self.limit or len(records) <= self.limit:
+            return None
+
+        del records[self.limit:]
+        return self.get_next_cursor(records[-1])
+
+
+    def get_next_cursor(self, last_record:dict) -> str:
+        ''' Get an opaque cursor that continues after the passed record '''
+
+        token = json_util.dumps([
+            self.sort_field,
+            self.sort_order,
+            self._get_field_value(last_record, self.sort_field),
+            last_record.get('_id')
+        ])
+
+        return base64.urlsafe_b64encode(token.encode()).decode().rstrip('=')
+
+
+    @staticmethod
+    def _get_field_value(record:Mapping, field:str) -> Any:
+        ''' Get the value of a field from a record (or a RawBSONDocument), following dot notation '''
+
+        value = record
+        for key in field.split('.'):
+            value = value.get(key) if isinstance(value, Mapping) else None
+
+        return value
+
+
+    @classmethod
+    def from_payload(cls, 
+            payload:dict, 
+            default_limit:int=0, 
+            max_limit:int=0, 
+            sort:Optional[tuple[str, int]]=None,
+            sort_fields:Optional[list[str]]=None
+        ) -> "Request_Pagination":
+        ''' Remove the pagination fields from a request payload and parse them.
+            The limit defaults to `default_limit` and is capped at `max_limit`.
+            Clients can sort by `_id` or the passed `sort_fields`. If a `sort`
+            is passed, records are always sorted by it and the client can't
+            pass a sort field
+        '''
+
+        limit = cls._parse_limit(payload.pop(cls.LIMIT_FIELD, None), default_limit)
+        if max_limit and (not limit or limit > max_limit):
+            limit = max_limit
+
+        if sort:
+            if (requested_sort:=payload.pop(cls.SORT_FIELD, None)) is not None:
+                raise cls._pagination_error(f"[{cls.SORT_FIELD}] can't be passed to this route", requested_sort)
+            sort_field, sort_order = sort
+        else:
+            sort_field, sort_order = cls._parse_sort(payload.pop(cls.SORT_FIELD, None), sort_fields)
+        after = cls._parse_after(payload.pop(cls.AFTER_FIELD, None), sort_field, sort_order)
+
+        return cls(limit, sort_field, sort_order, after)
+
+
+    @classmethod
+    def _parse_limit(cls, limit:Any, default_limit:int) -> int:
+        if limit in (None, ''):
+            return default_limit
+
+        try:
+            limit = int(limit)
+            if limit < 1:
+                raise ValueError()
+        except (TypeError, ValueError):
+            raise cls._pagination_error(f"[{cls.LIMIT_FIELD}] must be a positive integer", limit)
+
+        return limit
+
+
+    @classmethod
+    def _parse_sort(cls, sort:Any, sort_fields:Optional[list[str]]=None) -> tuple[str, int]:
+        if not sort:
+            return '_id', ASCENDING
+
+        if not isinstance(sort, str) or sort.lstrip('-').startswith('$'):
+            raise cls._pagination_error(f"[{cls.SORT_FIELD}] must be a field name", sort)
+
+        sort_field, sort_order = (sort[1:], DESCENDING) if sort.startswith('-') else (sort, ASCENDING)
+        # Sorting by other fields would read and sort records without an index
+        if sort_field != '_id' and sort_field not in (sort_fields or []):
+            raise cls._pagination_error(f"[{cls.SORT_FIELD}] can only be one of {['_id', *(sort_fields or [])]}", sort)
+
+        return sort_field, sort_order
+
+
+    @classmethod
+    def _parse_after(cls, after:Any, sort_field:str, sort_order:int) -> Optional[tuple[Any, Any]]:
+        if not after:
+            return None
+
+        try:
+            if isinstance(after, list):
+                # The query string parser decodes cursors that are valid base64 JSON
+                field, order, value, _id = json_util.loads(json.dumps(after))
+            else:
+                token = str(after)
+                token += '=' * (-len(token) % 4)
+                field, order, value, _id = json_util.loads(base64.urlsafe_b64decode(token.encode()).decode())
+        except Exception:
+            raise cls._pagination_error(f"[{cls.AFTER_FIELD}] is not a valid cursor", after)
+
+        if field != sort_field or order != sort_order:
+            raise cls._pagination_error(f"[{cls.AFTER_FIELD}] cursor was created for a different sort order", after)
+
+        return value, _id
+
+
+    @staticmethod
+    def _pagination_error(message:str, value:Any) -> API_Error:
+        return API_Error(
+            f"Invalid pagination: {message}",
+            {'value': value},
+            status_code=400,
+            stack_trace=traceback.format_exc()
+        )
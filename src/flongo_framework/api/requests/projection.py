@@ -0,0 +1,96 @@
+import traceback
+from typing import Any, Optional
+
+from ...api.responses.errors.api_error import API_Error
+
+class Request_Projection:
+    ''' Field projection parsed from a request payload
+
+        Only the projected fields of each record are read from MongoDB.
+        Clients can request a sparse fieldset from the fields the route
+        allows with the reserved `fields` payload field (e.g. `fields=name,email`)
+    '''
+
+    FIELDS_FIELD = 'fields'
+
+    def __init__(self, fields:Optional[list[str]]=None) -> None:
+        # Fields to read from each record. None reads all fields
+        self.fields = list(dict.fromkeys(fields)) if fields else None
+        # Fields read for internal use (like pagination) that are not sent to the client
+        self.hidden_fields:set[str] = set()
+
+
+    @property
+    def projection(self) -> Optional[dict[str, int]]:
+        ''' Get the MongoDB projection for the fields or None to read all fields '''
+
+        if not self.fields:
+            return None
+
+        projection = {field: 1 for field in self.fields}
+        if '_id' not in projection:
+            projection['_id'] = 0
+
+        return projection
+
+
+    def include(self, *fields:str):
+        ''' Make sure fields are read from MongoDB without sending them to the client '''
+
+        if not self.fields:
+            return
+
+        for field in fields:
+            if field not in self.fields:
+                self.fields.append(field)
+                top_level_field = field.split('.')[0]
+                if not any(requested.split('.')[0] == top_level_field for requested in self.fields if requested != field):
+                    self.hidden_fields.add(top_level_field)
+
+
+    def strip(self, record:dict) -> dict:
+        ''' Remove the fields that should not be sent to the client from a record '''
+
+        if not self.hidden_fields:
+            return record
+
+        return {key: value for key, value in record.items() if key not in self.hidden_fields}
+
+
+    @classmethod
+    def from_payload(cls,
+            payload:dict,
+            default_fields:Optional[list[str]]=None,
+            allowed_fields:Optional[list[str]]=None
+        ) -> "Request_Projection":
+        ''' Remove the `fields` field from a request payload and parse it. Falls
+            back to `default_fields` if the client didn't request a sparse fieldset.
+
+            The `fields` field is only reserved if the route allows sparse fieldsets,
+            either from `allowed_fields` or from `default_fields`
+        '''
+
+        allowed_fields = allowed_fields or default_fields
+        if not allowed_fields or cls.FIELDS_FIELD not in payload:
+            return cls(default_fields)
+
+        fields = cls._parse_fields(payload.pop(cls.FIELDS_FIELD))
+        if invalid_fields:=[field for field in fields if field not in allowed_fields]:
+            raise API_Error(
+                f"Invalid fields requested: {invalid_fields}",
+                {'allowed_fields': allowed_fields},
+                status_code=400,
+                stack_trace=traceback.format_exc()
+            )
+
+        return cls(fields or default_fields)
+
+
+    @classmethod
+    def _parse_fields(cls, fields:Any) -> list[str]:
+        if isinstance(fields, str):
+            fields = fields.split(',')
+        elif not isinstance(fields, list):
+            fields = [fields]
+
+        return [str(field).strip() for field in fields if str(field).strip()]
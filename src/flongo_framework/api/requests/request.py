@@ -1,11 +1,20 @@
+import random
+import re
+import time
 import traceback
-from typing import Any, Optional
+import uuid
+from typing import Any, Callable, Optional, Union
 from bson import ObjectId
+import pymongo
 from pymongo.collection import Collection
+from pymongo.errors import AutoReconnect, ServerSelectionTimeoutError
 from flask import Request
 
 from .identity import Request_Identity
+from .pagination import Request_Pagination
+from .projection import Request_Projection
 from ...api.responses.errors.api_error import API_Error
+from ...utils.logging.loggers.database import DatabaseLogger
 
 class App_Request:
     ''' Base class that wraps Flask's request and allows
@@ -13,29 +22,101 @@ class App_Request:
         and MongoDB collection to be injected
     '''
 
+    # Header used to pass and return the id of a request
+    REQUEST_ID_HEADER = 'X-Request-ID'
+    # Option used to limit the time MongoDB runs each read operation for. Other 
+    # operations (like writes) are limited with a client side timeout instead
+    MAX_TIME_OPTIONS = {
+        'find': 'max_time_ms',
+        'find_one': 'max_time_ms',
+        'count_documents': 'maxTimeMS',
+        'estimated_document_count': 'maxTimeMS',
+        'aggregate': 'maxTimeMS',
+        'distinct': 'maxTimeMS'
+    }
+    # Operations an index hint is passed to
+    HINTED_OPERATIONS = [
+        'find', 'find_one', 'count_documents', 'aggregate', 'update_one', 
+        'update_many', 'replace_one', 'delete_one', 'delete_many'
+    ]
+    # Idempotent read operations that are retried after transient network errors.
+    # Aggregations that write with $out or $merge are not retried. Cursors of a find
+    # are lazy, so handlers retry finds together with reading them with `retry_read`
+    RETRYABLE_OPERATIONS = ['find_one', 'count_documents', 'estimated_document_count', 'distinct', 'aggregate']
+    MAX_RETRY_DELAY_MS = 1000
+
     def __init__(self, 
             raw_request:Request,
             identity:Optional[Request_Identity]=None,
-            payload:Optional[dict]=None,
-            collection:Optional[Collection]=None
+            payload:Optional[Union[dict, list[dict]]]=None,
+            collection:Optional[Collection]=None,
+            stream:bool=False,
+            batch_size:Optional[int]=None,
+            page_size:int=0,
+            max_page_size:int=0,
+            sort_fields:Optional[list[str]]=None,
+            projection_fields:Optional[list[str]]=None,
+            allowed_fields:Optional[list[str]]=None,
+            request_id:Optional[str]=None,
+            path_params:Optional[dict[str, Any]]=None,
+            hint:Optional[Union[str, list[tuple[str, Any]]]]=None,
+            timeout_ms:int=0,
+            retry_attempts:int=0,
+            retry_base_delay_ms:int=50
         ) -> None:
         # Raw Flask request
         self.raw_request = raw_request
         # JWT Identity parsed from cookies if available
         self.identity = identity
-        # Data parsed from query string and request body if available
-        self.payload = payload or {}
+        # Data parsed from query string and request body if available. A list of records if the body was a JSON array
+        self.payload = payload if payload is not None else {}
         # MongoDB collection instance to configured collection if available
         self.collection = collection
         # Files parsed from the raw request
         self.files = self.raw_request.files.to_dict(flat=True) if self.raw_request.files else {}
+        # Stream MongoDB cursor results to the client instead of loading them into memory
+        self.stream = stream
+        # Number of documents MongoDB should return per cursor batch if configured
+        self.batch_size = batch_size
+        # Default and maximum number of records returned per page of results. 0 is unlimited
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+        # Fields clients can sort by other than `_id`
+        self.sort_fields = sort_fields
+        # Fields read from MongoDB by default and fields clients can request with `fields`
+        self.projection_fields = projection_fields
+        self.allowed_fields = allowed_fields
+        # Id of the request. Passed as the `$comment` of MongoDB operations so they can be traced to it
+        self.request_id = request_id or self.get_request_id(raw_request)
+        # Variables parsed from the URL rule of the route (like `id` in `/sample/<id>`)
+        self.path_params = path_params or {}
+        # Index MongoDB operations that support it are forced to use
+        self.hint = hint
+        # Time (from time.monotonic()) the request must finish by. The remaining time
+        # is the maximum time MongoDB can run each operation for
+        self.deadline = time.monotonic() + timeout_ms / 1000 if timeout_ms else None
+        # Times idempotent reads are retried after transient network errors and the
+        # base of the exponential delay between them. Each delay is randomized (full jitter)
+        self.retry_attempts = retry_attempts
+        self.retry_base_delay_ms = retry_base_delay_ms
+
+
+    @classmethod
+    def get_request_id(cls, raw_request:Request) -> str:
+        ''' Get the request id passed in the request headers or generate a new one '''
+
+        request_id = raw_request.headers.get(cls.REQUEST_ID_HEADER, '')
+        if request_id and len(request_id) <= 128 and re.fullmatch(r'[\w\-.:]+', request_id):
+            return request_id
+
+        return uuid.uuid4().hex
 
 
     def set_identity(self, identity:Request_Identity):
         self.identity = identity
 
 
-    def set_payload(self, payload:dict):
+    def set_payload(self, payload:Union[dict, list[dict]]):
         self.payload = payload
 
 
@@ -43,23 +124,207 @@ class App_Request:
         self.collection = collection
 
 
-    def run_mongo_operation(self, op:str='find', search_payload:Optional[dict]=None, set_payload:bool=False, upsert:bool=False) -> Any:
+    def set_cursor_options(self, stream:bool=False, batch_size:Optional[int]=None):
+        self.stream = stream
+        self.batch_size = batch_size
+
+
+    def set_page_sizes(self, page_size:int=0, max_page_size:int=0, sort_fields:Optional[list[str]]=None):
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+        self.sort_fields = sort_fields
+
+
+    def get_pagination(self, sort:Optional[tuple[str, int]]=None) -> Request_Pagination:
+        ''' Remove the pagination fields (`limit`, `sort` and `after`) from the
+            payload and parse them using the page sizes and sort fields configured
+            for the route. Pass a `sort` to always sort by a field
+        '''
+
+        return Request_Pagination.from_payload(self.payload, self.page_size, self.max_page_size, sort, self.sort_fields)
+
+
+    def set_projection_fields(self, projection_fields:Optional[list[str]]=None, allowed_fields:Optional[list[str]]=None):
+        self.projection_fields = projection_fields
+        self.allowed_fields = allowed_fields
+
+
+    def get_projection(self) -> Request_Projection:
+        ''' Remove the sparse fieldset field (`fields`) from the payload and 
+            parse it using the fields configured for the route
+        '''
+
+        return Request_Projection.from_payload(self.payload, self.projection_fields, self.allowed_fields)
+
+
+    def run_mongo_operation(self, 
+            op:str='find', 
+            search_payload:Optional[dict]=None, 
+            set_payload:bool=False, 
+            upsert:bool=False, 
+            pagination:Optional[Request_Pagination]=None, 
+            projection:Optional[Request_Projection]=None,
+            **options
+        ) -> Any:
         ''' Runs the specified operation on the stored MongoDB collection with a passed
-            or with the stored payload 
+            or with the stored payload. Any additional `options` (like `batch_size`
+            for `find`) are passed to the pymongo operation
+
+            If `pagination` is passed to a `find`, only the requested page is read
+            plus one record to tell if there is a next page. If `projection` is
+            passed to a `find`, only the projected fields are read. The request
+            id is passed as the `comment` of the operation and the route index
+            `hint` is passed to the operations that support it, unless the operation
+            matches records by `_id` or runs a `$text` search.
+
+            If the request has a deadline, the operation can only run for the
+            time remaining. A 504 is raised if there is no time remaining.
+
+            Idempotent reads are retried `retry_attempts` times after transient
+            network errors if there is time remaining
         '''
 
         if self.collection != None:
             func = getattr(self.collection, op)
-            if not search_payload:
+            if search_payload is None:
                 search_payload = self.payload
 
-            if set_payload:
-                if upsert:
-                    return func(search_payload, {"$set": self.payload}, upsert=upsert)
-                else:
-                    return func(search_payload, {"$set": self.payload})
-            else:
-                return func(search_payload)
+            if self.request_id:
+                options = {'comment': self.request_id, **options}
+
+            # Lookups by _id use the _id index and $text searches use the text index
+            # instead of the route index. MongoDB rejects a hint for a $text search
+            if self.hint and op in self.HINTED_OPERATIONS and not self.is_id_filter(search_payload) \
+                    and not self.is_text_search(search_payload):
+                options = {'hint': self.hint, **options}
+
+            if pagination and op == 'find':
+                search_payload = pagination.apply(search_payload)
+                options = {'sort': pagination.sort, 'limit': pagination.query_limit, **options}
+                # The sort fields are needed to create the cursor for the next page
+                if projection:
+                    projection.include(*[field for field, _ in pagination.sort])
+
+            if projection and op == 'find' and projection.projection:
+                options = {'projection': projection.projection, **options}
+
+            args = [search_payload, {"$set": self.payload}] if set_payload else [search_payload]
+            if upsert:
+                options = {'upsert': upsert, **options}
+
+            if self.is_retryable_operation(op, search_payload):
+                return self.retry_read(op, lambda: self._run(op, func, args, options))
+
+            return self._run(op, func, args, options)
+
+
+    def _run(self, op:str, func:Any, args:list, options:dict) -> Any:
+        ''' Run an operation limited to the time remaining before the request deadline '''
+
+        if self.deadline is None:
+            return func(*args, **options)
+
+        options = {**options, **self.get_max_time_options(op, options)}
+        if op in self.MAX_TIME_OPTIONS:
+            return func(*args, **options)
+
+        with pymongo.timeout(self.ensure_time_remaining() / 1000):
+            return func(*args, **options)
+
+
+    def retry_read(self, op:str, read:Callable[[], Any]) -> Any:
+        ''' Run an idempotent read (like a `find` and reading its cursor) and retry
+            it `retry_attempts` times after transient network errors with a jittered
+            exponential delay. Failed server selection isn't retried since the
+            server selection timeout was already waited for
+        '''
+
+        attempt = 0
+        while True:
+            try:
+                return read()
+            except AutoReconnect as e:
+                if isinstance(e, ServerSelectionTimeoutError) or attempt >= self.retry_attempts:
+                    raise
+
+                delay_ms = random.uniform(0, min(self.MAX_RETRY_DELAY_MS, self.retry_base_delay_ms * 2 ** attempt))
+                remaining_ms = self.get_remaining_time_ms()
+                if remaining_ms is not None and remaining_ms <= delay_ms:
+                    raise
+
+                attempt += 1
+                DatabaseLogger(collection=self.collection.name if self.collection is not None else '').warn(
+                    f"* Retrying MongoDB [{op}] in [{int(delay_ms)}]ms (attempt [{attempt}] of [{self.retry_attempts}]). Error: {e} *"
+                )
+                time.sleep(delay_ms / 1000)
+
+
+    def is_retryable_operation(self, op:str, search_payload:Any=None) -> bool:
+        ''' Returns True if the operation is an idempotent read '''
+
+        if op not in self.RETRYABLE_OPERATIONS:
+            return False
+        if op == 'aggregate' and isinstance(search_payload, list):
+            return not any(('$out' in stage or '$merge' in stage) for stage in search_payload if isinstance(stage, dict))
+        return True
+
+
+    @staticmethod
+    def is_id_filter(search_payload:Any) -> bool:
+        ''' Returns True if a filter matches records by `_id` '''
+
+        return isinstance(search_payload, dict) and '_id' in search_payload
+
+
+    @staticmethod
+    def is_text_search(search_payload:Any) -> bool:
+        ''' Returns True if a filter or the `$match` stages of a pipeline run a `$text` search '''
+
+        if isinstance(search_payload, list):
+            return any(
+                isinstance(stage, dict) and isinstance(stage.get('$match'), dict) and '$text' in stage['$match']
+                for stage in search_payload
+            )
+        return isinstance(search_payload, dict) and '$text' in search_payload
+
+
+    def get_remaining_time_ms(self) -> Optional[int]:
+        ''' Get the time remaining before the request deadline or None if there is no deadline '''
+
+        if self.deadline is not None:
+            return int((self.deadline - time.monotonic()) * 1000)
+
+
+    def ensure_time_remaining(self) -> int:
+        ''' Ensure there is time remaining before the request deadline or throw an exception.
+            Returns the time remaining
+        '''
+
+        remaining_ms = self.get_remaining_time_ms()
+        if remaining_ms is not None and remaining_ms <= 0:
+            raise API_Error(
+                "The request took longer than the time allowed for this route",
+                {'url': self.raw_request.root_url, 'method': self.raw_request.method},
+                status_code=504,
+                stack_trace=traceback.format_exc()
+            )
+
+        return remaining_ms or 0
+
+
+    def get_max_time_options(self, op:str, options:Optional[dict]=None) -> dict[str, int]:
+        ''' Get the option limiting a read operation to the time remaining before the 
+            request deadline. A shorter time already in `options` is kept
+        '''
+
+        if self.deadline is None or (option:=self.MAX_TIME_OPTIONS.get(op)) is None:
+            return {}
+
+        remaining_ms = self.ensure_time_remaining()
+        if requested_ms:=(options or {}).get(option):
+            remaining_ms = min(requested_ms, remaining_ms)
+
+        return {option: remaining_ms}
 
 
     def ensure_collection(self):
@@ -73,6 +338,18 @@ class App_Request:
             )
         
 
+    def ensure_record_payload(self):
+        ''' Ensure the payload for this Request is a single record and not a list of records or throw an exception '''
+
+        if not isinstance(self.payload, dict):
+            raise API_Error(
+                f"A {self.raw_request.method} request to this route requires a single JSON object",
+                {'url': self.raw_request.root_url, 'method': self.raw_request.method},
+                status_code=400,
+                stack_trace=traceback.format_exc()
+            )
+
+
     def ensure_field(self, field:str, required_value:str='') -> Any:
         ''' Ensure a field is specified in this request payload and return the field value '''
 
@@ -99,15 +376,33 @@ class App_Request:
         return value
     
 
+    def get_path_id(self, parameter:str='id') -> Any:
+        ''' Get the record ID passed in the URL of the request, converted to an
+            ObjectId if it is valid. Returns None if the route has no ID parameter
+        '''
+
+        if (_id:=self.path_params.get(parameter)) is not None and ObjectId.is_valid(_id):
+            return ObjectId(_id)
+
+        return _id
+
+
     def normalize_id(self, field:str="_id", enforce:bool=True):
         ''' Convert a field from string to ObjectId '''
 
         if enforce:
             self.ensure_field(field)
 
-        if field in self.payload:
-            if ObjectId.is_valid(self.payload[field]):
-                self.payload[field] = ObjectId(self.payload[field])
+        self.normalize_record_id(self.payload, field)
+
+
+    @staticmethod
+    def normalize_record_id(record:dict, field:str="_id"):
+        ''' Convert a field of a record from string to ObjectId '''
+
+        if field in record:
+            if ObjectId.is_valid(record[field]):
+                record[field] = ObjectId(record[field])
 
 
     def set_payload_from_current_identity(self, field:str="_id"):
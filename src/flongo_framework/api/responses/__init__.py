@@ -1,2 +1,3 @@
 from .api_json_response import API_JSON_Response
 from .api_message_response import API_Message_Response
+from .api_json_stream_response import API_JSON_Stream_Response
@@ -0,0 +1,78 @@
+from bson.codec_options import CodecOptions
+from flask import Response
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from ...utils.json.bson_json_converter import BSON_JSON_Converter
+from ...utils.json.json_encoder import JSON_Encoder
+from ...utils.logging.loggers.app import ApplicationLogger
+
+class API_JSON_Stream_Response(Response):
+    ''' A JSON response that streams an iterable of records (like a 
+        MongoDB cursor) to the client as a chunked JSON array
+
+        The records are set in the response JSON with the key 'data'
+        and are encoded `chunk_size` records at a time so memory stays
+        flat regardless of how many records are sent
+
+        If `trailer` is passed, the fields it returns after all records
+        are sent are added to the response JSON (like the next page cursor)
+
+        Chunks of raw BSON documents are converted to JSON in a single pass
+        using the `codec_options` of the collection they were read from
+
+        The status and headers are sent before the records are read, so an
+        error while reading them (like a MongoDB timeout) can't change the
+        status. The error is logged, the JSON is closed and the error message
+        is added to the response JSON with the key 'error' instead
+    '''
+
+    def __init__(self, 
+            data:Iterable[Any], 
+            status_code:int=200, 
+            chunk_size:int=100, 
+            trailer:Optional[Callable[[], dict]]=None,
+            codec_options:Optional[CodecOptions]=None
+        ) -> None:
+        super().__init__(self._encode(data, max(chunk_size, 1), trailer, codec_options), status=status_code, mimetype='application/json')
+
+
+    @staticmethod
+    def _encode(data:Iterable[Any], chunk_size:int, trailer:Optional[Callable[[], dict]]=None, codec_options:Optional[CodecOptions]=None) -> Iterator[str]:
+        ''' Lazily encode the records as a JSON array '''
+
+        encoder = JSON_Encoder()
+        chunk, separator, in_array = [], '', True
+        try:
+            yield '{"data": ['
+            for record in data:
+                chunk.append(record)
+                if len(chunk) >= chunk_size:
+                    yield separator + API_JSON_Stream_Response._encode_chunk(chunk, encoder, codec_options)
+                    chunk, separator = [], ', '
+
+            if chunk:
+                yield separator + API_JSON_Stream_Response._encode_chunk(chunk, encoder, codec_options)
+            yield ']'
+            in_array = False
+
+            for key, value in (trailer() if trailer else {}).items():
+                yield f", {encoder.encode(key)}: {encoder.encode(value)}"
+            yield '}'
+        except Exception as e:
+            # Records that were read but not sent yet are dropped
+            ApplicationLogger.error(f"[Failed to stream the response: {e}]")
+            yield f"{']' if in_array else ''}, \"error\": {encoder.encode(f'The response is incomplete: {e}')}}}"
+        finally:
+            # Release the underlying cursor if the client disconnects early
+            if close:=getattr(data, 'close', None):
+                close()
+
+
+    @staticmethod
+    def _encode_chunk(chunk:list[Any], encoder:JSON_Encoder, codec_options:Optional[CodecOptions]=None) -> str:
+        ''' Encode a chunk of records as the items of a JSON array '''
+
+        if BSON_JSON_Converter.is_raw(chunk):
+            return encoder.encode(BSON_JSON_Converter.convert(chunk, codec_options))[1:-1]
+
+        return ', '.join(encoder.encode(record) for record in chunk)
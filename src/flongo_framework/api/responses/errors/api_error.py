@@ -3,20 +3,22 @@ from typing import Any, Optional
 class API_Error(Exception):
     ''' An base exception that can be thrown from
         user defined request handling functions
-        to display a string error message response
+        to display a string error message response.
+        Any `headers` (like `Retry-After`) are added to the response
     '''
 
-    def __init__(self, message:Any, data:Optional[dict] = None, status_code:int=500, stack_trace:Optional[str]=None):
+    def __init__(self, message:Any, data:Optional[dict] = None, status_code:int=500, stack_trace:Optional[str]=None, headers:Optional[dict]=None):
         super(Exception, self).__init__(message)
-        self._initialize(message, data, status_code, stack_trace)
+        self._initialize(message, data, status_code, stack_trace, headers)
 
 
-    def _initialize(self, message:Any, data:Optional[dict] = None, status_code:int=500, stack_trace:Optional[str]=None):
+    def _initialize(self, message:Any, data:Optional[dict] = None, status_code:int=500, stack_trace:Optional[str]=None, headers:Optional[dict]=None):
         self.message = message
         self.status_code = status_code
         self.stack_trace = stack_trace
 
         self.data = data or {}
+        self.headers = headers or {}
 
 
     def set_stack_trace(self, stack_trace:str):
@@ -1,6 +1,12 @@
 from .routes import App_Routes
 from .route import Route
 from .route_schema import Route_Schema
+from .route_cache import Route_Cache
+from .route_bulkhead import Route_Bulkhead
+from .route_rate_limit import Route_Rate_Limit
+from .route_single_flight import Route_Single_Flight
+from .batch_route import Batch_Route
+from .aggregation_parameter import Aggregation_Parameter
 from .utils.tranformers import Route_Transformer, Field_Transformer
 from .route_permissions import Route_Permissions
-from .handlers import Route_Handler, Default_Route_Handler
+from .handlers import Route_Handler, Default_Route_Handler, Aggregation_Route_Handler, Search_Route_Handler
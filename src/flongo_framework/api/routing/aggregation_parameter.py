@@ -0,0 +1,64 @@
+import traceback
+from typing import Any, Callable, Optional
+
+from ...api.responses.errors.api_error import API_Error
+
+class Aggregation_Parameter:
+    ''' A placeholder in the `$match` stage of an aggregation pipeline
+        template that is bound to a field of the request payload
+
+        ```
+        {'$match': {'status': Aggregation_Parameter('status', required=True)}}
+        ```
+        Only single values (or lists of values) can be bound, so a client
+        can't inject query operators. Values bound inside `$expr` are passed
+        as literals so they can't reference fields. If a parameter isn't
+        passed and isn't required, its condition is removed from the stage
+    '''
+
+    def __init__(self,
+            name:str,
+            data_type:Optional[Callable[[Any], Any]]=None,
+            required:bool=False,
+            default:Any=None
+        ) -> None:
+
+        # Name of the payload field bound to this parameter
+        self.name = name
+        # Function used to convert the value (like `int` for query string values)
+        self.data_type = data_type
+        self.required = required
+        self.default = default
+
+
+    def bind(self, payload:dict, in_expression:bool=False) -> Any:
+        ''' Get the value to bind from the payload. Returns this parameter if
+            there isn't a value and the condition should be removed
+        '''
+
+        value = payload.get(self.name, self.default)
+        if value is None:
+            if self.required:
+                raise self._parameter_error(f"Required parameter [{self.name}] was not passed")
+            return self
+
+        if self.data_type:
+            try:
+                value = [self.data_type(item) for item in value] if isinstance(value, list) else self.data_type(value)
+            except Exception:
+                raise self._parameter_error(f"Parameter [{self.name}] must be a valid {getattr(self.data_type, '__name__', 'value')}", value)
+
+        values = value if isinstance(value, list) else [value]
+        if any(isinstance(item, (dict, list)) for item in values):
+            raise self._parameter_error(f"Parameter [{self.name}] must be a single value or a list of values", value)
+
+        return {'$literal': value} if in_expression else value
+
+
+    def _parameter_error(self, message:str, value:Any=None) -> API_Error:
+        return API_Error(
+            f"Invalid aggregation parameters: {message}",
+            {'parameter': self.name, 'value': value},
+            status_code=400,
+            stack_trace=traceback.format_exc()
+        )
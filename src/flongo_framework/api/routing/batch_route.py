@@ -0,0 +1,196 @@
+import json
+import os
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Optional
+
+from flask import Flask, Response, request
+from flask_cors import cross_origin
+from werkzeug.test import EnvironBuilder
+
+from ...api.responses.api_json_response import API_JSON_Response
+from ...api.responses.errors.api_error import API_Error
+from ...config.enums.http_methods import HTTP_METHODS
+from ...config.settings.app_settings import App_Settings
+from ...utils.json import JSON_Encoder
+from ...utils.logging.loggers.routing import RoutingLogger
+
+class Batch_Route:
+    ''' Route that runs several requests to the other routes of an
+        application in one HTTP request. Each request is dispatched through
+        the normal pipeline of its route (permissions, schemas, transformers)
+        with the headers and cookies of the batch request:
+        ```
+        POST /batch
+        [
+            {"method": "GET", "url": "/sample/656a7a3b9c0b6a2f3c1d2e4f"},
+            {"method": "GET", "url": "/orders", "payload": {"status": "open"}},
+            {"method": "PATCH", "url": "/profile", "payload": {"theme": "dark"}}
+        ]
+        ```
+        Returns the `status`, `headers` and `body` of each response in
+        the same order. Consecutive read-only requests (like GET) run
+        concurrently on a pool of up to `max_workers` threads. Other
+        requests run one at a time in order, after the requests before them
+    '''
+
+    READ_ONLY_METHODS = ['GET', 'HEAD', 'OPTIONS']
+    # Flask answers HEAD requests with the GET handler of a route
+    HEAD_METHOD = 'HEAD'
+    # Headers of the batch request that aren't passed to each request
+    UNFORWARDED_HEADERS = ['content-type', 'content-length', 'content-encoding', 'transfer-encoding']
+
+    def __init__(self, url:str='/batch', max_requests:int=25, max_workers:int=4) -> None:
+        self.url = url
+        # Maximum number of requests in a batch. 0 is unlimited
+        self.max_requests = max_requests
+        self.max_workers = max_workers
+
+        self._executor:Optional[ThreadPoolExecutor] = None
+        self._lock = Lock()
+        self._pid = os.getpid()
+
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        ''' Get the thread pool read-only requests run on. Forked worker processes create their own '''
+
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='batch')
+                    self._pid = os.getpid()
+
+        return self._executor
+
+
+    def register(self, flask_app:Flask, settings:App_Settings):
+        ''' Register the batch URL to a Flask app '''
+
+        def handler() -> Response:
+            return self.handle(flask_app)
+
+        method_handler = cross_origin(origins=settings.flask.cors_origins, supports_credentials=True)(handler)
+        flask_app.add_url_rule(self.url, f"{self.url}_POST", method_handler, methods=['POST'])
+        RoutingLogger(self.url).info(f"* Created batch route: [{self.url}] *")
+
+
+    def handle(self, flask_app:Flask) -> Response:
+        ''' Run the requests in the body of the batch request and return their responses '''
+
+        items = request.get_json(silent=True)
+        if not isinstance(items, list):
+            raise API_Error("The batch request body must be a JSON array of requests", status_code=400)
+        if self.max_requests and len(items) > self.max_requests:
+            raise API_Error(
+                f"A batch can contain up to [{self.max_requests}] requests",
+                {'requests': len(items)},
+                status_code=400
+            )
+
+        headers = [(name, value) for name, value in request.headers.items() if name.lower() not in self.UNFORWARDED_HEADERS]
+        environ_base = {'REMOTE_ADDR': request.remote_addr}
+        results:list[Optional[dict[str, Any]]] = [None] * len(items)
+        cookies:list[str] = []
+
+        # Run consecutive read-only requests together and other requests alone
+        index = 0
+        while index < len(items):
+            group = [index]
+            if self._is_read_only(items[index]):
+                while group[-1] + 1 < len(items) and self._is_read_only(items[group[-1] + 1]):
+                    group.append(group[-1] + 1)
+
+            if len(group) > 1:
+                group_results = self.executor.map(
+                    lambda i: self._run_request(flask_app, items[i], headers, environ_base), group
+                )
+            else:
+                group_results = [self._run_request(flask_app, items[index], headers, environ_base)]
+
+            for i, (result, result_cookies) in zip(group, group_results):
+                results[i] = result
+                cookies.extend(result_cookies)
+
+            index = group[-1] + 1
+
+        response = API_JSON_Response(results)
+        # Cookies set by the requests (like a login) are set by the batch response
+        for cookie in cookies:
+            response.headers.add('Set-Cookie', cookie)
+
+        return response
+
+
+    def _is_read_only(self, item:Any) -> bool:
+        return isinstance(item, dict) and str(item.get('method', '')).upper() in self.READ_ONLY_METHODS
+
+
+    def _run_request(self,
+            flask_app:Flask,
+            item:Any,
+            headers:list[tuple[str, str]],
+            environ_base:dict[str, Any]
+        ) -> tuple[dict[str, Any], list[str]]:
+        ''' Dispatch a request in the batch to its route. Returns the result
+            of the request and the cookies its response sets
+        '''
+
+        if error:=self._validate_item(item):
+            return {'status': 400, 'headers': {}, 'body': {'error': error}}, []
+
+        method = item['method'].upper()
+        builder = EnvironBuilder(
+            path=item['url'],
+            method=method,
+            headers=headers,
+            environ_base=environ_base,
+            data=json.dumps(item['payload'], cls=JSON_Encoder) if item.get('payload') is not None else None,
+            content_type='application/json' if item.get('payload') is not None else None
+        )
+        try:
+            with flask_app.request_context(builder.get_environ()):
+                response = flask_app.full_dispatch_request()
+                try:
+                    # HEAD responses have the headers of a GET response without its body
+                    body = response.get_data() if method != self.HEAD_METHOD else b''
+                finally:
+                    # Releases resources held by streamed responses
+                    response.close()
+        except Exception as e:
+            RoutingLogger(self.url).error(f"* Error running batch request [{method}] [{item['url']}]: {e} *")
+            RoutingLogger(self.url).debug(traceback.format_exc())
+            return {'status': 500, 'headers': {}, 'body': {'error': str(e)}}, []
+        finally:
+            builder.close()
+
+        return {
+            'status': response.status_code,
+            'headers': {name: value for name, value in response.headers.items() if name.lower() != 'set-cookie'},
+            'body': self._parse_body(response, body)
+        }, response.headers.getlist('Set-Cookie')
+
+
+    def _validate_item(self, item:Any) -> Optional[str]:
+        ''' Get the reason a request in the batch is invalid if it is '''
+
+        if not isinstance(item, dict) or not isinstance(item.get('url'), str) or not isinstance(item.get('method'), str):
+            return "Each request must be an object with a [method] and [url]"
+        if item['method'].upper() != self.HEAD_METHOD and item['method'].lower() not in HTTP_METHODS:
+            return f"[{item['method']}] is not a valid HTTP method"
+        if not item['url'].startswith('/'):
+            return f"[{item['url']}] must be a path on this application"
+        if item['url'].split('?')[0] == self.url:
+            return "Batch requests can't be nested"
+
+
+    @staticmethod
+    def _parse_body(response:Response, body:bytes) -> Any:
+        if response.is_json:
+            try:
+                return json.loads(body) if body else None
+            except ValueError:
+                pass
+
+        return body.decode(errors='replace')
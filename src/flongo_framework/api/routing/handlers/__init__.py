@@ -1,2 +1,4 @@
 from .route_handler import Route_Handler
 from .default_route_handler import Default_Route_Handler
+from .aggregation_route_handler import Aggregation_Route_Handler
+from .search_route_handler import Search_Route_Handler
@@ -0,0 +1,159 @@
+import traceback
+from typing import Any, Callable, Optional
+from flask import Response
+from pymongo.errors import ExecutionTimeout
+from ....api.requests.request import App_Request
+from ....api.responses.api_json_response import API_JSON_Response
+from ....api.responses.api_json_stream_response import API_JSON_Stream_Response
+from ....api.responses.errors.api_error import API_Error
+from ....api.routing.aggregation_parameter import Aggregation_Parameter
+
+from ....api.routing.handlers.route_handler import Route_Handler
+
+
+class Aggregation_Route_Handler(Route_Handler):
+    ''' Class that runs an aggregation pipeline on the MongoDB collection
+        of a route for GET requests and streams the results to the client
+
+        The pipeline is a template. `Aggregation_Parameter` placeholders
+        in its `$match` stages are bound to fields of the request payload:
+        ```
+        Aggregation_Route_Handler(
+            pipeline=[
+                {'$match': {'status': Aggregation_Parameter('status', required=True)}},
+                {'$group': {'_id': '$owner', 'total': {'$sum': '$amount'}}}
+            ],
+            allow_disk_use=True,
+            max_time_ms=5000,
+            batch_size=500
+        )
+        ```
+        - allow_disk_use: Let stages that exceed MongoDB's memory limit write to temporary files
+        - max_time_ms: Maximum time MongoDB can run the aggregation for
+        - batch_size: Number of results read from MongoDB and sent to the client at a time
+        - max_results: Maximum number of results returned
+        - stream: Stream the results as they are read instead of loading them into memory
+    '''
+
+    STAGE_MATCH = '$match'
+    OPERATOR_EXPRESSION = '$expr'
+
+    def __init__(self,
+            pipeline:list[dict],
+            allow_disk_use:bool=False,
+            max_time_ms:Optional[int]=None,
+            batch_size:Optional[int]=None,
+            max_results:Optional[int]=None,
+            stream:bool=True,
+            **methods:Callable[[App_Request], Response]
+        ):
+
+        self.pipeline = self._validate_pipeline(pipeline)
+        self.allow_disk_use = allow_disk_use
+        self.max_time_ms = max_time_ms
+        self.batch_size = batch_size
+        self.max_results = max_results
+        self.stream = stream
+
+        super().__init__(**methods)
+
+
+    def GET(self, request:App_Request):
+        ''' Runs the aggregation pipeline with the parameters bound from the
+            payload of the request and returns the results
+        '''
+
+        request.ensure_collection()
+        request.ensure_record_payload()
+
+        options:dict[str, Any] = {'allowDiskUse': self.allow_disk_use}
+        if self.max_time_ms:
+            options['maxTimeMS'] = self.max_time_ms
+        if batch_size:=(self.batch_size or request.batch_size):
+            options['batchSize'] = batch_size
+
+        try:
+            cursor = request.run_mongo_operation(op='aggregate', search_payload=self.get_pipeline(request.payload), **options)
+        except ExecutionTimeout:
+            raise API_Error(
+                f"The aggregation took longer than [{self.max_time_ms}ms]",
+                {'max_time_ms': self.max_time_ms},
+                status_code=504,
+                stack_trace=traceback.format_exc()
+            )
+
+        if self.stream:
+            return API_JSON_Stream_Response(cursor, chunk_size=batch_size or 100)
+
+        return API_JSON_Response(list(cursor))
+
+
+    def get_pipeline(self, payload:dict) -> list[dict]:
+        ''' Get the pipeline with the parameters in its `$match` stages bound to the payload '''
+
+        pipeline = []
+        for stage in self.pipeline:
+            if self.STAGE_MATCH in stage:
+                stage = {self.STAGE_MATCH: self._bind(stage[self.STAGE_MATCH], payload) or {}}
+                if not stage[self.STAGE_MATCH]:
+                    continue
+
+            pipeline.append(stage)
+
+        if self.max_results:
+            pipeline.append({'$limit': self.max_results})
+
+        return pipeline
+
+
+    def _bind(self, value:Any, payload:dict, in_expression:bool=False) -> Any:
+        ''' Bind the parameters in part of a `$match` stage. Returns None
+            if the part only had parameters that weren't passed
+        '''
+
+        if isinstance(value, Aggregation_Parameter):
+            bound = value.bind(payload, in_expression)
+            return None if bound is value else bound
+
+        if isinstance(value, dict):
+            bound = {}
+            for key, item in value.items():
+                if (bound_item:=self._bind(item, payload, in_expression or key == self.OPERATOR_EXPRESSION)) is not None or item is None:
+                    bound[key] = bound_item
+
+            return bound if bound or not value else None
+
+        if isinstance(value, list):
+            bound = [bound_item for item in value if (bound_item:=self._bind(item, payload, in_expression)) is not None or item is None]
+            # The arguments of an expression operator can't be removed without changing its meaning
+            if in_expression and len(bound) != len(value):
+                return None
+            return bound if bound or not value else None
+
+        return value
+
+
+    @classmethod
+    def _validate_pipeline(cls, pipeline:list[dict]) -> list[dict]:
+        ''' Make sure parameters are only used in `$match` stages '''
+
+        if not isinstance(pipeline, list) or not all(isinstance(stage, dict) for stage in pipeline):
+            raise ValueError("Aggregation_Route_Handler: The pipeline must be a list of stages")
+
+        for stage in pipeline:
+            if cls.STAGE_MATCH not in stage and cls._has_parameters(stage):
+                raise ValueError(f"Aggregation_Route_Handler: Parameters can only be bound in [{cls.STAGE_MATCH}] stages. Found one in {list(stage.keys())}")
+
+        return pipeline
+
+
+    @classmethod
+    def _has_parameters(cls, value:Any) -> bool:
+        if isinstance(value, Aggregation_Parameter):
+            return True
+        if isinstance(value, dict):
+            return any(cls._has_parameters(item) for item in value.values())
+        if isinstance(value, list):
+            return any(cls._has_parameters(item) for item in value)
+
+        return False
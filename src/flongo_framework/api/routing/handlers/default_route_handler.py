@@ -1,9 +1,25 @@
-from typing import Callable, Optional
-from flask import Response
+import hashlib
+import json
+import time
+from typing import Any, Callable, Iterator, Optional
+from flask import Flask, Response
+from pymongo.collection import Collection
+from pymongo import UpdateOne
+from pymongo.cursor import Cursor
+from pymongo.errors import BulkWriteError
 from ....api.requests.request import App_Request
+from ....api.requests.pagination import Request_Pagination
+from ....api.requests.projection import Request_Projection
 from ....api.responses.api_json_response import API_JSON_Response
+from ....api.responses.api_json_stream_response import API_JSON_Stream_Response
 from ....api.responses.api_message_response import API_Message_Response
+from ....api.routing.route_cache import Route_Cache
+from ....api.routing.route_permissions import Route_Permissions
 from ....config.enums.http_methods import HTTP_METHODS
+from ....config.settings.mongodb_settings import MongoDB_Settings
+from ....database.mongodb.write_behind_queue import MongoDB_Write_Behind_Queue
+from ....utils.cache import Cache_Entry, LRU_Cache_Store
+from ....utils.json import BSON_JSON_Converter, JSON_Encoder
 
 from ....api.routing.handlers.route_handler import Route_Handler
 
@@ -13,33 +29,301 @@ class Default_Route_Handler(Route_Handler):
         methods like GET or POST but uses a default operation 
         if a custom function isn't passed.
 
-        - GET: Gets a record from the MongoDB collection specified using the payload from the request
-        - POST: Creates a record from the MongoDB collection specified using the payload from the request
-        - PUT: Updates a record from the MongoDB collection specified by ID using the payload from the request. Creates it if it does not exist
-        - PATCH: Updates a record from the MongoDB collection specified by ID using the payload from the request. Does not create it if it does not exist
+        - GET: Gets a page of records from the MongoDB collection specified using the payload from the request. Streams the records if the route enables streaming. Returns total and facet counts if the handler counts records
+        - POST: Creates a record from the MongoDB collection specified using the payload from the request. Creates each record if the payload is a list
+        - PUT: Updates a record from the MongoDB collection specified by ID using the payload from the request. Creates it if it does not exist. Updates each record if the payload is a list
+        - PATCH: Updates a record from the MongoDB collection specified by ID using the payload from the request. Does not create it if it does not exist. Buffers the update if the handler has a write-behind queue
         - DELETE: Deletes a record from the MongoDB collection specified using the payload from the request
+
+        If the URL of the route has an `id` variable (like `/sample/<id>`), each method
+        reads or writes the single record with that ID using `find_one`, `update_one` or `delete_one`
     '''
 
+    # Response header containing the cursor for the next page of GET results
+    NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+    # URL rule variable containing the ID of a single record (like `/sample/<id>`)
+    ID_PATH_PARAMETER = 'id'
+    # Response header containing the total number of records matching a GET request
+    TOTAL_COUNT_HEADER = 'X-Total-Count'
+    # Names of the pipelines in the `$facet` stage used to count records
+    FACET_DATA = 'data'
+    FACET_TOTAL = 'total'
+    FACET_PREFIX = 'facet:'
+
     def GET(self, request:App_Request):
-        ''' Gets a record from the MongoDB collection specified 
-            using the payload from the request
+        ''' Gets a page of records from the MongoDB collection specified 
+            using the payload from the request. Paginated records are always
+            returned in a `data` envelope with the cursor for the next page
+            in `next` (also returned in the `X-Next-Cursor` header). Only the
+            fields projected by the route or requested with `fields` are returned.
+
+            If the handler counts records, the envelope also has the `total`
+            number of records matching the payload (and the `facets` counts
+            if configured). The total is also returned in the `X-Total-Count` header.
+            Records read without pagination or counts are returned in `data`, or
+            as a single object if there is one
         '''
 
         request.ensure_collection()
+        request.ensure_record_payload()
+        if (_id:=request.get_path_id(self.ID_PATH_PARAMETER)) is not None:
+            return self._get_record(request, _id)
+
+        pagination = request.get_pagination()
+        projection = request.get_projection()
         request.normalize_id(enforce=False)
 
-        if result:=list(request.run_mongo_operation() or []):
-            return API_JSON_Response(result) if len(result) > 1 else API_JSON_Response(result[0])
+        counts = self._get_cached_counts(request) if self.counts_records else None
+        options = {'batch_size': request.batch_size} if request.batch_size else {}
+        if request.stream:
+            if self.counts_records and counts is None:
+                counts = self._count_records(request)
+            # Read the first record so a 404 can still be sent for empty results
+            def find_first() -> tuple[Cursor, Any]:
+                cursor = self._find(request, pagination, projection, **options)
+                return cursor, next(cursor, None)
+
+            cursor, first = request.retry_read('find', find_first)
+            return self._stream_records(cursor, first, pagination, projection, request.batch_size, counts)
+
+        # Later pages are found with an indexed keyset filter instead, 
+        # since it would also filter the records counted by a `$facet`
+        if self.counts_records and counts is None and request.payload and not pagination.after:
+            # Read the first page and count the filtered records in one round trip
+            result, counts = self._find_with_counts(request, pagination, projection)
         else:
+            result = request.retry_read('find', lambda: list(self._find(request, pagination, projection, **options) or []))
+            if self.counts_records and counts is None:
+                counts = self._count_records(request)
+
+        next_cursor = pagination.trim(result)
+        if BSON_JSON_Converter.is_raw(result):
+            result = BSON_JSON_Converter.convert(result, request.collection.codec_options)
+        result = [projection.strip(record) for record in result]
+        if (envelope:=self._get_envelope(pagination, counts, next_cursor)) is not None:
+            response = API_JSON_Response({'data': result, **envelope}, 200 if result else 404)
+            if counts is not None:
+                response.headers[self.TOTAL_COUNT_HEADER] = str(counts['total'])
+        elif not result:
             return API_JSON_Response(result, 404)
+        elif len(result) > 1:
+            response = API_JSON_Response(result)
+        else:
+            response = API_JSON_Response(result[0])
+
+        if next_cursor:
+            response.headers[self.NEXT_CURSOR_HEADER] = next_cursor
+        return response
+
+
+    @staticmethod
+    def _get_envelope(pagination:Request_Pagination, counts:Optional[dict]=None, next_cursor:Optional[str]=None) -> Optional[dict]:
+        ''' Get the fields sent with the `data` of paginated or counted GET
+            responses. Returns None if records are sent without an envelope
+        '''
+
+        if not pagination.limit and counts is None:
+            return None
+
+        return {**({'next': next_cursor} if pagination.limit else {}), **(counts or {})}
+
+
+    def _find(self, request:App_Request, pagination:Request_Pagination, projection:Request_Projection, **options) -> Cursor:
+        ''' Find a page of records. If the handler reads raw BSON, the records
+            are read as `RawBSONDocument` and only decoded when they are sent
+        '''
+
+        collection = request.collection
+        if self.raw_bson:
+            request.set_collection(collection.with_options(
+                codec_options=BSON_JSON_Converter.get_raw_codec_options(collection.codec_options)
+            ))
+
+        try:
+            return request.run_mongo_operation(pagination=pagination, projection=projection, **options)
+        finally:
+            request.set_collection(collection)
+
+
+    @property
+    def counts_records(self) -> bool:
+        return self.count_total or bool(self.facet_fields)
+
+
+    def _count_records(self, request:App_Request) -> dict:
+        ''' Count the records matching the request payload and the most common
+            values of each facet field. Unfiltered totals are estimated
+            from the collection metadata instead of scanning it
+        '''
+
+        if request.payload:
+            total = request.run_mongo_operation(op='count_documents')
+        else:
+            total = request.collection.estimated_document_count(
+                comment=request.request_id, 
+                **request.get_max_time_options('estimated_document_count')
+            )
+
+        counts:dict[str, Any] = {'total': total}
+        if self.facet_fields:
+            result = next(request.run_mongo_operation(
+                op='aggregate',
+                search_payload=[{'$match': request.payload}, {'$facet': self._get_facet_stages()}],
+                allowDiskUse=True
+            ), {})
+            counts['facets'] = self._get_facet_counts(result)
+
+        self._set_cached_counts(request, counts)
+        return counts
+
+
+    def _find_with_counts(self,
+            request:App_Request,
+            pagination:Request_Pagination,
+            projection:Request_Projection
+        ) -> tuple[list[dict], dict]:
+        ''' Read the first page of records and count the records matching
+            the request payload with a single `$facet` aggregation
+        '''
+
+        # The sort fields are needed to create the cursor for the next page
+        projection.include(*[field for field, _ in pagination.sort])
+
+        page:list[dict] = []
+        if pagination.query_limit:
+            page.append({'$limit': pagination.query_limit})
+        if projection.projection:
+            page.append({'$project': projection.projection})
+
+        result = next(request.run_mongo_operation(
+            op='aggregate',
+            search_payload=[
+                {'$match': request.payload},
+                {'$sort': dict(pagination.sort)},
+                {'$facet': {
+                    self.FACET_DATA: page or [{'$skip': 0}],
+                    self.FACET_TOTAL: [{'$count': 'count'}],
+                    **self._get_facet_stages()
+                }}
+            ],
+            allowDiskUse=True
+        ), {})
+
+        counts:dict[str, Any] = {'total': result[self.FACET_TOTAL][0]['count'] if result.get(self.FACET_TOTAL) else 0}
+        if self.facet_fields:
+            counts['facets'] = self._get_facet_counts(result)
+
+        self._set_cached_counts(request, counts)
+        return result.get(self.FACET_DATA, []), counts
+
+
+    def _get_facet_stages(self) -> dict[str, list[dict]]:
+        ''' Get the `$facet` pipelines that count the most common values of each facet field '''
+
+        return {
+            self._get_facet_name(field): [{'$sortByCount': f"${field}"}, {'$limit': self.max_facet_values}]
+            for field in self.facet_fields
+        }
+
+
+    def _get_facet_counts(self, result:dict) -> dict[str, list[dict]]:
+        return {
+            field: [{'value': count['_id'], 'count': count['count']} for count in result.get(self._get_facet_name(field), [])]
+            for field in self.facet_fields
+        }
+
+
+    def _get_facet_name(self, field:str) -> str:
+        ''' Get the name of the `$facet` pipeline counting a field. Pipeline names can't contain dots '''
+
+        return f"{self.FACET_PREFIX}{field.replace('.', ':')}"
+
+
+    def _get_count_key(self, request:App_Request) -> str:
+        ''' Get the key counts are cached by for the filter of a request '''
+
+        key = json.dumps([request.collection.full_name, request.payload, self.facet_fields], sort_keys=True, cls=JSON_Encoder)
+        return hashlib.sha256(key.encode()).hexdigest()
+
+
+    def _get_cached_counts(self, request:App_Request) -> Optional[dict]:
+        if (entry:=self._count_cache.get(self._get_count_key(request))) and entry.is_fresh(0):
+            return json.loads(entry.body)
+
+
+    def _set_cached_counts(self, request:App_Request, counts:dict):
+        if self.count_cache_ttl_secs:
+            self._count_cache.set(self._get_count_key(request), Cache_Entry(
+                body=json.dumps(counts, cls=JSON_Encoder).encode(),
+                expires_at=time.time() + self.count_cache_ttl_secs
+            ))
+
+
+    def _stream_records(self,
+            cursor:Cursor,
+            first:Any,
+            pagination:Request_Pagination,
+            projection:Request_Projection,
+            batch_size:Optional[int]=None,
+            counts:Optional[dict]=None
+        ) -> Response:
+        ''' Streams the first record read from a MongoDB cursor and the rest of its records
+            to the client as a chunked JSON array. Counts are sent in the trailer of the
+            array and in the `X-Total-Count` header
+        '''
+
+        if first is None:
+            cursor.close()
+            if (envelope:=self._get_envelope(pagination, counts)) is None:
+                return API_JSON_Response([], 404)
+
+            response = API_JSON_Response({'data': [], **envelope}, 404)
+            if counts is not None:
+                response.headers[self.TOTAL_COUNT_HEADER] = str(counts['total'])
+            return response
+
+        page = {'next': None}
+        def records() -> Iterator[Any]:
+            try:
+                last, count = first, 1
+                yield projection.strip(first)
+                for record in cursor:
+                    # The extra record read past the end of the page means there is a next page
+                    if pagination.limit and count >= pagination.limit:
+                        page['next'] = pagination.get_next_cursor(last)
+                        break
+                    last, count = record, count + 1
+                    yield projection.strip(record)
+            finally:
+                cursor.close()
+
+        trailer = None
+        if pagination.limit or counts is not None:
+            trailer = lambda: {**(page if pagination.limit else {}), **(counts or {})}
+
+        response = API_JSON_Stream_Response(
+            records(), 
+            chunk_size=batch_size or 100, 
+            trailer=trailer, 
+            codec_options=cursor.collection.codec_options
+        )
+        if counts is not None:
+            response.headers[self.TOTAL_COUNT_HEADER] = str(counts['total'])
+        return response
         
 
     def POST(self, request:App_Request):
         ''' Creates a record from the MongoDB collection specified 
-            using the payload from the request
+            using the payload from the request. If the payload is a
+            list, each record is created and the result for each 
+            record is returned
         '''
 
         request.ensure_collection()
+        if isinstance(request.payload, list):
+            return self._insert_records(request)
+
+        self._set_path_id(request)
         request.normalize_id(enforce=False)
 
         if _id:=request.run_mongo_operation(op='insert_one').inserted_id:
@@ -50,13 +334,19 @@ class Default_Route_Handler(Route_Handler):
 
     def PUT(self, request:App_Request):
         ''' Updates a record from the MongoDB collection specified by ID
-            using the payload from the request. Creates it if it does not exist
+            using the payload from the request. Creates it if it does not exist.
+            If the payload is a list, each record is updated by ID and the
+            result for each record is returned
         '''
 
         request.ensure_collection()
+        if isinstance(request.payload, list):
+            return self._upsert_records(request)
+
+        self._set_path_id(request)
         request.normalize_id()
         result = request.run_mongo_operation(
-            op='update_many', 
+            op='update_one', 
             search_payload={"_id": request.payload.pop("_id")}, 
             set_payload=True, 
             upsert=True
@@ -75,13 +365,22 @@ class Default_Route_Handler(Route_Handler):
 
     def PATCH(self, request:App_Request):
         ''' Updates a record from the MongoDB collection specified by ID
-            using the payload from the request. Does not create it if it does not exist
+            using the payload from the request. Does not create it if it does not exist.
+
+            If the handler has a write-behind queue, the update is buffered and
+            merged with other updates to the record and a 202 is returned
         '''
 
         request.ensure_collection()
+        request.ensure_record_payload()
+        self._set_path_id(request)
         request.normalize_id()
+        if self.write_behind:
+            self.write_behind.add(request.collection, request.payload.pop("_id"), request.payload)
+            return API_JSON_Response({}, 202)
+
         result = request.run_mongo_operation(
-            op='update_many',
+            op='update_one',
             search_payload={"_id": request.payload.pop("_id")},
             set_payload=True
         )
@@ -98,6 +397,11 @@ class Default_Route_Handler(Route_Handler):
         '''
 
         request.ensure_collection()
+        request.ensure_record_payload()
+        if (_id:=request.get_path_id(self.ID_PATH_PARAMETER)) is not None:
+            deleted_count = request.run_mongo_operation(op='delete_one', search_payload={'_id': _id}).deleted_count
+            return API_JSON_Response({}, 200 if deleted_count else 404)
+
         request.normalize_id(enforce=False)
         
         if request.run_mongo_operation(op='delete_many').deleted_count:
@@ -106,8 +410,157 @@ class Default_Route_Handler(Route_Handler):
             return API_JSON_Response({}, 404)
         
 
+    def _get_record(self, request:App_Request, _id:Any) -> Response:
+        ''' Gets a single record by the ID passed in the URL '''
+
+        projection = request.get_projection()
+        options = {'projection': projection.projection} if projection.projection else {}
+        if record:=request.run_mongo_operation(op='find_one', search_payload={'_id': _id}, **options):
+            return API_JSON_Response(record)
+
+        return API_JSON_Response({}, 404)
+
+
+    def _set_path_id(self, request:App_Request):
+        ''' Use the ID passed in the URL as the ID of the record in the payload '''
+
+        if (_id:=request.get_path_id(self.ID_PATH_PARAMETER)) is not None:
+            request.ensure_record_payload()
+            request.payload['_id'] = _id
+
+
+    def _insert_records(self, request:App_Request) -> Response:
+        ''' Creates each record in a list of records in unordered batches '''
+
+        results:list[Optional[dict]] = [None] * len(request.payload)
+        records = []
+        for index, record in enumerate(request.payload):
+            if not isinstance(record, dict):
+                results[index] = self._get_bulk_result(None, 400, {'errmsg': 'Record must be a JSON object'})
+                continue
+
+            request.normalize_record_id(record)
+            records.append((index, record))
+
+        for batch in self._get_batches(records):
+            try:
+                request.run_mongo_operation(op='insert_many', search_payload=[record for _, record in batch], ordered=False)
+                errors, write_concern_error = {}, None
+            except BulkWriteError as e:
+                errors = {error['index']: error for error in e.details.get('writeErrors', [])}
+                write_concern_error = self._get_write_concern_error(e)
+
+            # Records are given an _id by pymongo when they are inserted
+            for offset, (index, record) in enumerate(batch):
+                results[index] = self._get_bulk_result(record.get('_id'), 201, errors.get(offset) or write_concern_error)
+
+        return self._get_bulk_response(results, 201)
+
+
+    def _upsert_records(self, request:App_Request) -> Response:
+        ''' Updates each record in a list of records by ID in unordered batches. 
+            Creates the records that do not exist
+        '''
+
+        results:list[Optional[dict]] = [None] * len(request.payload)
+        operations = []
+        for index, record in enumerate(request.payload):
+            if not isinstance(record, dict) or record.get('_id') is None:
+                results[index] = self._get_bulk_result(None, 400, {'errmsg': 'Required field [_id] not passed in record'})
+                continue
+
+            request.normalize_record_id(record)
+            if not (fields:={field: value for field, value in record.items() if field != '_id'}):
+                results[index] = self._get_bulk_result(record['_id'], 400, {'errmsg': 'No fields passed to update in record'})
+                continue
+
+            operations.append((index, record['_id'], UpdateOne({'_id': record['_id']}, {'$set': fields}, upsert=True)))
+
+        for batch in self._get_batches(operations):
+            try:
+                result = request.run_mongo_operation(op='bulk_write', search_payload=[operation for _, _, operation in batch], ordered=False)
+                upserted, errors, write_concern_error = result.upserted_ids, {}, None
+            except BulkWriteError as e:
+                upserted = {upsert['index']: upsert['_id'] for upsert in e.details.get('upserted', [])}
+                errors = {error['index']: error for error in e.details.get('writeErrors', [])}
+                write_concern_error = self._get_write_concern_error(e)
+
+            for offset, (index, _id, _) in enumerate(batch):
+                results[index] = self._get_bulk_result(_id, 201 if offset in upserted else 200, errors.get(offset) or write_concern_error)
+
+        return self._get_bulk_response(results, 200)
+
+
+    @staticmethod
+    def _get_batches(items:list) -> Iterator[list]:
+        ''' Split a list of items into batches of the bulk write size configured for the app '''
+
+        settings = MongoDB_Settings.get_settings_from_flask()
+        batch_size = max(settings.bulk_write_batch_size or 0, 1) if settings else max(len(items), 1)
+        for start in range(0, len(items), batch_size):
+            yield items[start:start + batch_size]
+
+
+    @staticmethod
+    def _get_write_concern_error(error:BulkWriteError) -> Optional[dict]:
+        ''' Get the error for the records of a batch that were written but whose
+            write concern was not satisfied (like a `wtimeout` waiting for replication)
+        '''
+
+        if write_concern_errors:=error.details.get('writeConcernErrors'):
+            return {
+                'status': 500,
+                'errmsg': f"Record was written but its write concern was not satisfied: {write_concern_errors[0].get('errmsg')}"
+            }
+
+
+    @staticmethod
+    def _get_bulk_result(_id:Any, status_code:int, error:Optional[dict]=None) -> dict:
+        ''' Get the result of a bulk operation for a single record '''
+
+        if error:
+            return {
+                '_id': str(_id) if _id is not None else None, 
+                'status': error.get('status') or (409 if error.get('code') == 11000 else 400), 
+                'error': error.get('errmsg')
+            }
+
+        return {'_id': str(_id), 'status': status_code}
+
+
+    @staticmethod
+    def _get_bulk_response(results:list[Optional[dict]], status_code:int) -> Response:
+        ''' Get the response for a bulk operation. Returns a 207 if any record failed '''
+
+        if any(result and result['status'] >= 400 for result in results):
+            status_code = 207
+
+        return API_JSON_Response(results, status_code)
+
+
     # Holds a reference of all methods for this route
-    def __init__(self, **methods:Optional[Callable[[App_Request], Response]]):
+    def __init__(self,
+            count_total:bool=False,
+            facet_fields:Optional[list[str]]=None,
+            max_facet_values:int=20,
+            count_cache_ttl_secs:float=5,
+            write_behind:Optional[MongoDB_Write_Behind_Queue]=None,
+            raw_bson:bool=False,
+            **methods:Optional[Callable[[App_Request], Response]]
+        ):
+        # Return the total number of records matching the payload of GET requests
+        self.count_total = count_total
+        # Fields to return the most common values (and their counts) of
+        self.facet_fields = facet_fields or []
+        self.max_facet_values = max_facet_values
+        # Time the counts for a filter are re-used for. 0 disables caching
+        self.count_cache_ttl_secs = count_cache_ttl_secs
+        self._count_cache = LRU_Cache_Store()
+        # Buffers PATCH updates and writes them to MongoDB in batches
+        self.write_behind = write_behind
+        # Read GET records as raw BSON and convert them straight to JSON
+        self.raw_bson = raw_bson
+
         self.methods = {
             "GET": self.GET,
             "POST": self.POST,
@@ -127,3 +580,22 @@ class Default_Route_Handler(Route_Handler):
             # that should run when it is called 
             setattr(self, normalized_method, func)
             self.methods[normalized_method] = func
+
+
+    def register_url_methods(self, url:str, collection_name:str, permissions:Route_Permissions, enable_CORS:bool, flask_app:Flask, *args, **kwargs):
+        ''' Register the functions for all methods (like GET or POST)
+            that are supported for a specified URL with Flask. Cached
+            responses for the collection are invalidated when the 
+            write-behind queue writes buffered updates to it
+        '''
+
+        super().register_url_methods(url, collection_name, permissions, enable_CORS, flask_app, *args, **kwargs)
+        if self.write_behind and collection_name:
+            collection_caches = Route_Cache.register(flask_app, collection_name)
+
+            def invalidate_caches(collection:Collection):
+                if collection.name == collection_name:
+                    for collection_cache in collection_caches:
+                        collection_cache.invalidate(collection_name)
+
+            self.write_behind.add_listener(invalidate_caches)
@@ -1,8 +1,13 @@
 from flask_cors import cross_origin
 from jwt import ExpiredSignatureError
 
+from ....api.requests.identity import Request_Identity
 from ....api.requests.request import App_Request
+from ....api.routing.route_bulkhead import Route_Bulkhead
+from ....api.routing.route_cache import Route_Cache
 from ....api.routing.route_permissions import Route_Permissions
+from ....api.routing.route_rate_limit import Route_Rate_Limit
+from ....api.routing.route_single_flight import Route_Single_Flight
 from ....api.routing.route_schema import Route_Schema
 from ..utils.tranformers import Route_Transformer
 from ....config.enums.http_methods import HTTP_METHODS
@@ -10,16 +15,21 @@ from ....config.settings.app_settings import App_Settings
 from ....api.errors.schema_validation_error import SchemaValidationError
 
 from ....api.responses.errors.api_error import API_Error
-from ....database.mongodb.database import MongoDB_Database
+from ....database.errors.database_error import DatabaseError
+from ....database.mongodb.collection_registry import MongoDB_Collection_Registry
 from ..utils.authentication_util import Authentication_Util
 from ....utils.logging.loggers.routing import RoutingLogger
+from ....utils.rate_limit import Rate_Limit_Result
 from ....utils.requests import RequestDataParser
 from ....api.errors.request_handling_error import RequestHandlingError
 
+import math
 import traceback
-from flask import Flask, Response, jsonify, request
+from pymongo.errors import ConnectionFailure, PyMongoError
+from flask import Flask, Response, after_this_request, g, jsonify, request
 from werkzeug.exceptions import HTTPException
-from typing import Callable, Optional
+from contextlib import nullcontext
+from typing import Any, Callable, Optional, Union
 from sentry_sdk import start_span
 
 
@@ -75,7 +85,25 @@ class Route_Handler:
             request_transformer:Route_Transformer,
             response_transformer:Route_Transformer,
             request_schema:Route_Schema,
-            response_schema:Route_Schema
+            response_schema:Route_Schema,
+            collection_registry:Optional[MongoDB_Collection_Registry]=None,
+            stream:bool=False,
+            batch_size:Optional[int]=None,
+            page_size:Optional[int]=None,
+            max_page_size:Optional[int]=None,
+            sort_fields:Optional[list[str]]=None,
+            projection_fields:Optional[list[str]]=None,
+            allowed_fields:Optional[list[str]]=None,
+            cache:Optional[Route_Cache]=None,
+            collection_caches:Optional[list[Route_Cache]]=None,
+            database_name:str='',
+            read_preference:Optional[str]=None,
+            write_concern:Optional[Union[int, str]]=None,
+            hint:Optional[Union[str, list[tuple[str, Any]]]]=None,
+            timeout_ms:Optional[int]=None,
+            bulkhead:Optional[Route_Bulkhead]=None,
+            rate_limits:Optional[list[Route_Rate_Limit]]=None,
+            single_flight:Optional[Route_Single_Flight]=None
         ) -> Callable:
         ''' Delegates a request recieved by Flask to one
             of the methods registered to an instance of
@@ -83,13 +111,83 @@ class Route_Handler:
         '''
         
         logger = RoutingLogger(url, method)
+        collection_registry = collection_registry or MongoDB_Collection_Registry(settings.mongodb)
+        page_size = (settings.flask.default_page_size or 0) if page_size is None else page_size
+        max_page_size = (settings.flask.max_page_size or 0) if max_page_size is None else max_page_size
+        timeout_ms = (settings.flask.request_timeout_ms or 0) if timeout_ms is None else timeout_ms
+        # Cached responses are invalidated by writes to the collection, or to the route if there is no collection
+        cache_namespace = collection_name or url
+        cache = cache if cache and cache.is_cached_method(method) else None
+        invalidates_caches = collection_caches is not None and method in Route_Cache.INVALIDATING_METHODS
+        rate_limits = [rate_limit for rate_limit in (rate_limits or []) if rate_limit.is_limited_method(method)]
+        single_flight = single_flight if single_flight and single_flight.is_coalesced_method(method) else None
         def handler(**kwargs) -> Optional[Response]:
             logger.info(f"* Recieved HTTP {method} request *")
-            wrapped_request = App_Request(request)
+            wrapped_request = App_Request(
+                request, 
+                stream=stream, 
+                batch_size=batch_size, 
+                page_size=page_size, 
+                max_page_size=max_page_size,
+                sort_fields=sort_fields,
+                projection_fields=projection_fields,
+                allowed_fields=allowed_fields,
+                path_params=kwargs,
+                hint=hint,
+                timeout_ms=timeout_ms,
+                retry_attempts=settings.mongodb.read_retry_attempts or 0,
+                retry_base_delay_ms=settings.mongodb.read_retry_base_delay_ms or 0
+            )
+
+            # Return the request id so the request can be traced in the logs and MongoDB profiles
+            g.request_id = wrapped_request.request_id
+            @after_this_request
+            def set_request_id_header(response:Response) -> Response:
+                response.headers[App_Request.REQUEST_ID_HEADER] = wrapped_request.request_id
+                return response
+
+            # Count the request against the rate limits of the route before reading it
+            if rate_limits:
+                try:
+                    rate_limit, rate_limit_result = self._consume_rate_limits(url, rate_limits, wrapped_request)
+                except Exception as e:
+                    # Requests are rejected if a store can't count them. Stores that should let
+                    # requests through instead (like a MongoDB store with fail_open) don't raise
+                    self._log_and_raise_exception(wrapped_request, method,
+                        RequestHandlingError(
+                            f"Could not check the rate limits of this route: {e}",
+                            data={'url': url},
+                            status_code=503,
+                            headers={'Retry-After': '1'}
+                        ),
+                        settings,
+                        logger
+                    )
+                if not rate_limit_result.allowed:
+                    self._log_and_raise_exception(wrapped_request, method, rate_limit.get_rejection_error(url, rate_limit_result), settings, logger)
+
+                @after_this_request
+                def set_rate_limit_headers(response:Response) -> Response:
+                    response.headers.update(rate_limit.get_headers(rate_limit_result))
+                    return response
+
+            # Take a turn to handle the request before reading it. Requests that
+            # can't be handled or queued are rejected immediately
+            holds_bulkhead = False
+            if bulkhead:
+                remaining_ms = wrapped_request.get_remaining_time_ms()
+                if not bulkhead.acquire(remaining_ms / 1000 if remaining_ms is not None else None):
+                    self._log_and_raise_exception(wrapped_request, method, bulkhead.get_rejection_error(url), settings, logger)
+                holds_bulkhead = True
 
             # Get the data from the request body or query params
-            with start_span(op="parse_request_data", description="Parse data from the query string or request body"):
-                payload = RequestDataParser.get_request_data(wrapped_request.raw_request, logger)
+            try:
+                with start_span(op="parse_request_data", description="Parse data from the query string or request body"):
+                    payload = RequestDataParser.get_request_data(wrapped_request.raw_request, logger)
+            except BaseException:
+                if holds_bulkhead:
+                    bulkhead.release()
+                raise
             
             try:
                 # Validate JIT roles
@@ -106,16 +204,55 @@ class Route_Handler:
                 with start_span(op="transform_request_data", description="Transform data from the query string or request body"):
                     wrapped_request.set_payload(request_transformer.transform(wrapped_request.raw_request, payload, logger))
 
-                # Execute the function configured for this route if one is configured
-                # If there is a MongoDB collection specified, grab it and pass it too
-                if collection_name:
-                    with start_span(op="open_database", description="Open a configured MongoDB collection"):
-                        with MongoDB_Database(collection_name, settings=settings.mongodb, connection_must_be_valid=True) as db:
-                            logger.debug(f"* Opened DATABASE CONNECTION to MongoDB collection [{collection_name}] for request")
-                            wrapped_request.set_collection(db)
+                # Serve the response from the cache if there is a fresh one
+                cache_key, cache_generation = None, 0
+                if cache:
+                    with start_span(op="read_cache", description="Read a cached response"):
+                        identity = wrapped_request.identity
+                        if cache.vary_by_identity and not identity:
+                            identity = Authentication_Util.get_current_identity()
+
+                        cache_key = cache.get_key(wrapped_request.raw_request, wrapped_request.payload, identity)
+                        if cached_response:=cache.get(cache_key, cache_namespace):
+                            logger.info(f"* Sending CACHED HTTP {method} response: ({cached_response.status_code}) *")
+                            return cached_response
+
+                        cache_generation = cache.get_generation(cache_namespace)
 
-                with start_span(op="handle_request", description="Run user configured request handling logic"):
-                    response = action(wrapped_request)
+                # Identical concurrent requests wait for the first one and share its response
+                single_flight_key = None
+                if single_flight:
+                    identity = wrapped_request.identity
+                    if single_flight.vary_by_identity and not identity:
+                        identity = Authentication_Util.get_current_identity()
+
+                    single_flight_key = single_flight.get_key(wrapped_request.raw_request, wrapped_request.payload, identity)
+
+                try:
+                    # Fail fast without waiting on MongoDB if it has been unreachable
+                    with collection_registry.circuit_breaker.guard(wrapped_request.deadline) if collection_name else nullcontext():
+                        # Execute the function configured for this route if one is configured
+                        # If there is a MongoDB collection specified, grab it and pass it too
+                        if collection_name:
+                            with start_span(op="open_database", description="Get a configured MongoDB collection"):
+                                collection_registry.validate_connection(raise_exception=True)
+                                wrapped_request.set_collection(
+                                    collection_registry.get_collection(collection_name, database_name, read_preference, write_concern)
+                                )
+                                logger.debug(f"* Using DATABASE CONNECTION to MongoDB collection [{collection_name}] for request")
+
+                        with start_span(op="handle_request", description="Run user configured request handling logic"):
+                            if single_flight and single_flight_key:
+                                response = single_flight.run(single_flight_key, lambda: action(wrapped_request))
+                            else:
+                                response = action(wrapped_request)
+
+                except (DatabaseError, ConnectionFailure) as e:
+                    # Serve an expired response from the cache if MongoDB can't be reached
+                    if cache_key and (stale_response:=cache.get_stale(cache_key)):
+                        logger.warn(f"* Sending STALE CACHED HTTP {method} response: ({stale_response.status_code}). Error: {e} *")
+                        return stale_response
+                    raise
 
                 with start_span(op="create_response", description="Create the final Flask response"):
                     if not isinstance(response, Response):
@@ -123,17 +260,36 @@ class Route_Handler:
                             logger.warn(f"* HTTP {method} response was forced to a Response! Type: {type(response)}")
                             response = jsonify(response)
 
-                    with start_span(op="transform_response_data", description="Transform data from the response"):
-                        if isinstance(response.json, dict) and response_transformer:
-                            response.set_data(jsonify(response_transformer.transform(request, response.json, logger)).get_data())
+                    # Streamed responses are sent as they are read so they can't be transformed or validated
+                    if not response.is_streamed:
+                        with start_span(op="transform_response_data", description="Transform data from the response"):
+                            if isinstance(response.json, dict) and response_transformer:
+                                response.set_data(jsonify(response_transformer.transform(request, response.json, logger)).get_data())
+
+                        # Validate the payload passed to this route agains the request JSONSchema if configured    
+                        with start_span(op="validate_response_schema", description="Validate the passed response data against the configured JSONSchema"):
+                            if isinstance(response.json, dict) and response_schema.validate_schema(wrapped_request.raw_request, response.json, is_response_schema=True):
+                                logger.info("* Validated response SCHEMA successfully")
+
+                    if cache_key and response.status_code == 200 and not response.is_streamed:
+                        with start_span(op="write_cache", description="Cache the response"):
+                            cache.set(cache_key, response, cache_generation)
+
+                    # Accepted writes (like buffered PATCH updates) invalidate caches once they are written
+                    if invalidates_caches and collection_caches and response.status_code < 400 and response.status_code != 202:
+                        with start_span(op="invalidate_cache", description="Invalidate cached responses for the collection"):
+                            for collection_cache in collection_caches:
+                                collection_cache.invalidate(cache_namespace)
+                            logger.debug(f"* Invalidated CACHED responses for [{cache_namespace}]")
 
-                    # Validate the payload passed to this route agains the request JSONSchema if configured    
-                    with start_span(op="validate_response_schema", description="Validate the passed response data against the configured JSONSchema"):
-                        if isinstance(response.json, dict) and response_schema.validate_schema(wrapped_request.raw_request, response.json, is_response_schema=True):
-                            logger.info("* Validated response SCHEMA successfully")
-                            
                     with start_span(op="deliver_response", description="Send the response"):
-                        if response.json:
+                        if response.is_streamed:
+                            # Streamed responses keep reading from MongoDB until they are sent
+                            if holds_bulkhead:
+                                response.call_on_close(bulkhead.release)
+                                holds_bulkhead = False
+                            logger.debug(f"* Streaming RESPONSE BODY")
+                        elif response.json:
                             logger.debug(f"* Attached RESPONSE BODY [{response.json}]")
                         
                         logger.info(f"* Sending HTTP {method} response: ({response.status_code}) *")
@@ -160,6 +316,24 @@ class Route_Handler:
                     settings,
                     logger
                 )
+            except DatabaseError as e:
+                # Requests rejected by an open circuit breaker or failed heartbeats can be retried once MongoDB is reachable
+                unavailable = e.code == 503
+                self._log_and_raise_exception(wrapped_request, method,
+                    RequestHandlingError(
+                        e.message,
+                        data=e.data,
+                        status_code=503 if unavailable else 500,
+                        headers={'Retry-After': str(max(1, math.ceil(e.data.get('retry_after_secs', 0))))} if unavailable else None
+                    ),
+                    settings,
+                    logger
+                )
+            except PyMongoError as e:
+                # MongoDB operations that ran out of the time left before the request deadline
+                self._log_and_raise_exception(wrapped_request, method,
+                    RequestHandlingError(str(e), status_code=504 if (e.timeout and wrapped_request.deadline) else 500), settings, logger
+                )
             except ExpiredSignatureError as e:
                 self._log_and_raise_exception(wrapped_request, method,
                     RequestHandlingError(f"JWT cookie is expired!", status_code=401), settings, logger
@@ -169,10 +343,53 @@ class Route_Handler:
                 self._log_and_raise_exception(wrapped_request, method,
                     RequestHandlingError(str(e), status_code=500), settings, logger
                 )
+            finally:
+                # Log the MongoDB operations for this request that were slow
+                if collection_name:
+                    collection_registry.log_slow_queries()
+                if holds_bulkhead:
+                    bulkhead.release()
             
         return handler
     
 
+    def _consume_rate_limits(self, 
+            url:str, 
+            rate_limits:list[Route_Rate_Limit], 
+            wrapped_request:App_Request
+        ) -> tuple[Route_Rate_Limit, Rate_Limit_Result]:
+        ''' Count a request against the rate limits of a route. Returns the first 
+            limit that rejects the request or the limit with the fewest requests remaining.
+            Requests rejected by a limit are refunded to the limits that counted them
+        '''
+
+        identity:Optional[Request_Identity] = None
+        if any(rate_limit.requires_identity for rate_limit in rate_limits):
+            try:
+                identity = Authentication_Util.get_current_identity()
+            except Exception:
+                # Requests with an invalid JWT are counted by IP and rejected later if the route requires one
+                pass
+
+        most_limited:Optional[tuple[Route_Rate_Limit, Rate_Limit_Result]] = None
+        consumed:list[Route_Rate_Limit] = []
+        for rate_limit in rate_limits:
+            result = rate_limit.consume(url, wrapped_request.raw_request, identity)
+            if not result.allowed:
+                for consumed_rate_limit in consumed:
+                    try:
+                        consumed_rate_limit.refund(url, wrapped_request.raw_request, identity)
+                    except Exception as e:
+                        RoutingLogger(url).warn(f"* Failed to refund a rejected request to a rate limit: {e} *")
+                return rate_limit, result
+
+            consumed.append(rate_limit)
+            if not most_limited or result.remaining < most_limited[1].remaining:
+                most_limited = (rate_limit, result)
+
+        return most_limited # type: ignore
+
+
     def _log_and_raise_exception(self, wrapped_request:App_Request, method:str, error:API_Error, settings:App_Settings, logger:RoutingLogger):
         ''' Log and raise an exception '''
 
@@ -200,12 +417,34 @@ class Route_Handler:
             response_transformer:Route_Transformer,
             request_schema:Route_Schema,
             response_schema:Route_Schema, 
-            log_level:str
+            log_level:str,
+            stream:bool=False,
+            batch_size:Optional[int]=None,
+            page_size:Optional[int]=None,
+            max_page_size:Optional[int]=None,
+            sort_fields:Optional[list[str]]=None,
+            allowed_fields:Optional[list[str]]=None,
+            cache:Optional[Route_Cache]=None,
+            database_name:str='',
+            read_preference:Optional[str]=None,
+            write_concern:Optional[Union[int, str]]=None,
+            hint:Optional[Union[str, list[tuple[str, Any]]]]=None,
+            timeout_ms:Optional[int]=None,
+            bulkhead:Optional[Route_Bulkhead]=None,
+            rate_limits:Optional[list[Route_Rate_Limit]]=None,
+            single_flight:Optional[Route_Single_Flight]=None
         ):
         ''' Register the functions for all methods (like GET or POST)
             that are supported for a specified URL with Flask
         '''
 
+        collection_registry = MongoDB_Collection_Registry.get_registry(flask_app, settings.mongodb)
+        # Caches of all routes for the collection so writes through this route can invalidate them.
+        # Routes without a collection only invalidate their own cache
+        collection_caches = Route_Cache.register(flask_app, collection_name, cache) if collection_name else \
+            ([cache] if cache else [])
+        if bulkhead:
+            Route_Bulkhead.register(flask_app, url, bulkhead)
         for method, action in self.get_methods().items():
             if action:
                 self.configure_logger(url, method, log_level)
@@ -220,7 +459,25 @@ class Route_Handler:
                     request_transformer,
                     response_transformer,
                     request_schema,
-                    response_schema
+                    response_schema,
+                    collection_registry,
+                    stream,
+                    batch_size,
+                    page_size,
+                    max_page_size,
+                    sort_fields,
+                    response_schema.get_record_fields(method),
+                    allowed_fields,
+                    cache,
+                    collection_caches,
+                    database_name,
+                    read_preference,
+                    write_concern,
+                    hint,
+                    timeout_ms,
+                    bulkhead,
+                    rate_limits,
+                    single_flight
                 )
 
                 # Enable CORS for the route if it is specified
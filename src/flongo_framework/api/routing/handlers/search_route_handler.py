@@ -0,0 +1,140 @@
+import traceback
+from typing import Any, Callable, Optional
+from flask import Response
+from pymongo import DESCENDING
+from pymongo.errors import OperationFailure
+from ....api.requests.request import App_Request
+from ....api.responses.api_json_response import API_JSON_Response
+from ....api.responses.errors.api_error import API_Error
+
+from ....api.routing.handlers.route_handler import Route_Handler
+
+
+class Search_Route_Handler(Route_Handler):
+    ''' Class that runs a full-text search on the MongoDB collection of a
+        route for GET requests using its text index (`MongoDB_Index(is_text=True)`)
+
+        The search terms are passed in the `q` field. Results are sorted by
+        their text score (returned in `_score`) and paged with the `limit` and
+        `after` fields. Other payload fields filter the results by equality:
+        ```
+        GET /articles/search?q=mongodb indexes&author=peter&limit=20
+        ```
+        - filter_fields: Fields the results can be filtered by. Any field can be used if not passed
+        - language: Language used to parse the search terms. Uses the language of the text index if not passed
+        - min_score: Minimum text score of the results
+        - score_field: Field the text score is returned in. Use a field the records don't have
+    '''
+
+    QUERY_FIELD = 'q'
+    SCORE_FIELD = '_score'
+    # Response header containing the cursor for the next page of results
+    NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+    # MongoDB error code for a $text query on a collection without a text index
+    TEXT_INDEX_REQUIRED_CODE = 27
+
+    def __init__(self,
+            filter_fields:Optional[list[str]]=None,
+            language:Optional[str]=None,
+            min_score:Optional[float]=None,
+            score_field:str=SCORE_FIELD,
+            **methods:Callable[[App_Request], Response]
+        ):
+
+        self.filter_fields = filter_fields
+        self.language = language
+        self.min_score = min_score
+        self.score_field = score_field
+
+        super().__init__(**methods)
+
+
+    def GET(self, request:App_Request):
+        ''' Gets a page of the records matching the search terms in `q`,
+            best matches first. The cursor for the next page is returned
+            in the `X-Next-Cursor` header and with the records
+        '''
+
+        request.ensure_collection()
+        request.ensure_record_payload()
+        query = self._get_query(request.payload)
+        pagination = request.get_pagination(sort=(self.score_field, DESCENDING))
+        projection = request.get_projection()
+        request.normalize_id(enforce=False)
+
+        pipeline:list[dict] = [
+            {'$match': {'$text': query, **self._get_filters(request.payload)}},
+            {'$addFields': {self.score_field: {'$meta': 'textScore'}}}
+        ]
+        if self.min_score is not None:
+            pipeline.append({'$match': {self.score_field: {'$gte': self.min_score}}})
+        if pagination.after:
+            pipeline.append({'$match': pagination.apply({})})
+
+        pipeline.append({'$sort': dict(pagination.sort)})
+        if pagination.query_limit:
+            pipeline.append({'$limit': pagination.query_limit})
+        # The _id is needed to create the cursor for the next page
+        projection.include('_id')
+        if projection.projection:
+            pipeline.append({'$project': {**projection.projection, self.score_field: 1}})
+
+        try:
+            result = list(request.run_mongo_operation(op='aggregate', search_payload=pipeline))
+        except OperationFailure as e:
+            if e.code != self.TEXT_INDEX_REQUIRED_CODE:
+                raise
+            raise API_Error(
+                "The collection for this route does not have a text index",
+                {'collection': request.collection.name},
+                status_code=500,
+                stack_trace=traceback.format_exc()
+            )
+
+        next_cursor = pagination.trim(result)
+        result = [projection.strip(record) for record in result]
+        response = API_JSON_Response({'data': result, **({'next': next_cursor} if pagination.limit else {})})
+        if next_cursor:
+            response.headers[self.NEXT_CURSOR_HEADER] = next_cursor
+        return response
+
+
+    def _get_query(self, payload:dict) -> dict:
+        ''' Remove the search terms from the payload and get the `$text` query '''
+
+        terms = payload.pop(self.QUERY_FIELD, None)
+        if not isinstance(terms, str) or not terms.strip():
+            raise self._search_error(f"Required field [{self.QUERY_FIELD}] must contain the terms to search for", terms)
+
+        query = {'$search': terms.strip()}
+        if self.language:
+            query['$language'] = self.language
+
+        return query
+
+
+    def _get_filters(self, payload:dict) -> dict[str, Any]:
+        ''' Get the equality filters from the rest of the payload. Lists of values match any of the values '''
+
+        filters:dict[str, Any] = {}
+        for field, value in payload.items():
+            if field.startswith('$') or (self.filter_fields is not None and field not in self.filter_fields):
+                raise self._search_error(f"Results can't be filtered by [{field}]", value)
+
+            values = value if isinstance(value, list) else [value]
+            if any(isinstance(item, (dict, list)) for item in values):
+                raise self._search_error(f"Filter [{field}] must be a single value or a list of values", value)
+
+            filters[field] = {'$in': value} if isinstance(value, list) else value
+
+        return filters
+
+
+    @staticmethod
+    def _search_error(message:str, value:Any=None) -> API_Error:
+        return API_Error(
+            f"Invalid search: {message}",
+            {'value': value},
+            status_code=400,
+            stack_trace=traceback.format_exc()
+        )
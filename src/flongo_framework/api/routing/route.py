@@ -1,8 +1,13 @@
-from typing import Optional
+from typing import Any, Optional, Union
 from flask import Flask
+from ...api.routing.route_bulkhead import Route_Bulkhead
+from ...api.routing.route_cache import Route_Cache
 from ...api.routing.route_permissions import Route_Permissions
+from ...api.routing.route_rate_limit import Route_Rate_Limit
+from ...api.routing.route_single_flight import Route_Single_Flight
 from ...config.enums.logs.log_levels import LOG_LEVELS
 from ...config.settings.app_settings import App_Settings
+from ...database.mongodb.collection_registry import MongoDB_Collection_Registry
 from ...utils.logging.loggers.routing import RoutingLogger
 from ...api.routing.handlers.route_handler import Route_Handler
 from ...api.routing.route_schema import Route_Schema
@@ -25,7 +30,23 @@ class Route:
             response_transformer:Optional[Route_Transformer]=None,
             request_schema:Optional[Route_Schema]=None,
             response_schema:Optional[Route_Schema]=None,
-            log_level:str=LOG_LEVELS.WARN
+            log_level:str=LOG_LEVELS.WARN,
+            stream:bool=False,
+            batch_size:Optional[int]=None,
+            page_size:Optional[int]=None,
+            max_page_size:Optional[int]=None,
+            sort_fields:Optional[list[str]]=None,
+            allowed_fields:Optional[list[str]]=None,
+            cache:Optional[Route_Cache]=None,
+            database_name:str='',
+            read_preference:Optional[str]=None,
+            write_concern:Optional[Union[int, str]]=None,
+            hint:Optional[Union[str, list[tuple[str, Any]]]]=None,
+            timeout_ms:Optional[int]=None,
+            max_concurrency:Optional[int]=None,
+            max_queue:int=0,
+            rate_limits:Optional[list[Route_Rate_Limit]]=None,
+            single_flight:Optional[Route_Single_Flight]=None
         ):
 
         self.url = url
@@ -38,6 +59,41 @@ class Route:
         self.request_schema = request_schema or Route_Schema()
         self.response_schema = response_schema or Route_Schema()
         self.log_level = log_level
+        # Stream MongoDB cursor results to the client as a chunked JSON array
+        self.stream = stream
+        # Number of documents to read per MongoDB cursor batch
+        self.batch_size = batch_size
+        # Default and maximum number of records per page of results (0 is unlimited).
+        # Uses the application defaults if not passed
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+        # Fields clients can sort by other than `_id`. They should be indexed
+        self.sort_fields = sort_fields
+        # Fields clients can request with `fields`. Defaults to the fields of the response schema
+        self.allowed_fields = allowed_fields
+        # Cache responses and invalidate them when the collection is written to
+        self.cache = cache
+        # Database of the collection if it isn't the default database
+        self.database_name = database_name
+        # Read preference (like `secondaryPreferred`) and write concern (like `1` or `majority`)
+        # of the collection. Uses the client options if not passed
+        self.read_preference = read_preference
+        self.write_concern = write_concern
+        MongoDB_Collection_Registry.get_collection_options(read_preference, write_concern)
+        # Index (name or key pattern) the MongoDB operations of the route are forced to use
+        self.hint = hint
+        # Time requests to the route have to finish their MongoDB operations. 
+        # Uses the application default if not passed (0 is unlimited)
+        self.timeout_ms = timeout_ms
+        # Requests to the route handled at once and requests that can wait for a turn.
+        # Other requests are rejected with a 503. Unlimited if not passed
+        if max_queue and not max_concurrency:
+            raise ValueError(f"Route: [{url}] max_queue can only be used with max_concurrency")
+        self.bulkhead = Route_Bulkhead(max_concurrency, max_queue) if max_concurrency else None
+        # Limits on how often clients (by IP or JWT identity) can call the route
+        self.rate_limits = rate_limits or []
+        # Let identical concurrent requests share the response of the first one
+        self.single_flight = single_flight
 
         self._configure_logger()
     
@@ -58,7 +114,22 @@ class Route:
             self.response_transformer,
             self.request_schema,
             self.response_schema,
-            self.log_level
+            self.log_level,
+            self.stream,
+            self.batch_size,
+            self.page_size,
+            self.max_page_size,
+            self.sort_fields,
+            self.allowed_fields,
+            self.cache,
+            self.database_name,
+            self.read_preference,
+            self.write_concern,
+            self.hint,
+            self.timeout_ms,
+            self.bulkhead,
+            self.rate_limits,
+            self.single_flight
         )
 
         RoutingLogger(self.url).info(f"* Created application route: [{self.url}] *")
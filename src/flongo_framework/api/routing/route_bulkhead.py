@@ -0,0 +1,131 @@
+import traceback
+from collections import deque
+from threading import Condition
+from typing import Any, Optional
+
+from flask import Flask
+
+from ...api.responses.errors.api_error import API_Error
+
+class Route_Bulkhead:
+    ''' Limits the requests a route handles at once so one slow route
+        can't take every worker thread from the others
+
+        Up to `max_concurrency` requests are handled at once and up to
+        `max_queue` more wait for a turn (in order) for at most
+        `max_wait_secs` or the time left before the request deadline.
+        Other requests are rejected immediately with a 503 and a
+        `Retry-After` header:
+        ```
+        Route(url='/reports', handler=Default_Route_Handler(), collection_name='orders', max_concurrency=4, max_queue=8)
+        ```
+        The counters of every route are returned by `Route_Bulkhead.get_all_stats(flask_app)`
+    '''
+
+    FLASK_REGISTRY_KEY = 'APP_ROUTE_BULKHEADS'
+
+    def __init__(self,
+            max_concurrency:int,
+            max_queue:int=0,
+            max_wait_secs:float=10,
+            retry_after_secs:int=1
+        ) -> None:
+
+        if max_concurrency < 1:
+            raise ValueError(f"Route_Bulkhead: max_concurrency [{max_concurrency}] must be at least 1")
+        if max_queue < 0:
+            raise ValueError(f"Route_Bulkhead: max_queue [{max_queue}] can't be negative")
+
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait_secs = max_wait_secs
+        # Seconds clients are told to wait before retrying rejected requests
+        self.retry_after_secs = retry_after_secs
+
+        self._condition = Condition()
+        self._in_flight = 0
+        self._waiting:deque[object] = deque()
+        self._admitted = 0
+        self._rejected = 0
+
+
+    def acquire(self, timeout_secs:Optional[float]=None) -> bool:
+        ''' Take a turn handling a request, waiting in the queue if there is room.
+            Returns False if the request is rejected
+        '''
+
+        with self._condition:
+            if self._in_flight < self.max_concurrency and not self._waiting:
+                return self._admit()
+
+            if len(self._waiting) >= self.max_queue:
+                self._rejected += 1
+                return False
+
+            # Queued requests are let in in the order they arrived
+            waiter = object()
+            self._waiting.append(waiter)
+            timeout_secs = self.max_wait_secs if timeout_secs is None else min(timeout_secs, self.max_wait_secs)
+            admitted = self._condition.wait_for(
+                lambda: self._in_flight < self.max_concurrency and self._waiting[0] is waiter,
+                max(0, timeout_secs)
+            )
+            self._waiting.remove(waiter)
+            # Let the next queued request check if it is its turn
+            self._condition.notify_all()
+            if admitted:
+                return self._admit()
+
+            self._rejected += 1
+            return False
+
+
+    def _admit(self) -> bool:
+        self._in_flight += 1
+        self._admitted += 1
+        return True
+
+
+    def release(self):
+        ''' Finish handling a request and let the next queued request in '''
+
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+
+    def get_rejection_error(self, url:str) -> API_Error:
+        return API_Error(
+            "Too many requests are being handled by this route. Try again later",
+            {'url': url, 'max_concurrency': self.max_concurrency, 'max_queue': self.max_queue},
+            status_code=503,
+            stack_trace=traceback.format_exc(),
+            headers={'Retry-After': str(self.retry_after_secs)}
+        )
+
+
+    def get_stats(self) -> dict[str, Any]:
+        ''' Get the counters of the bulkhead for monitoring '''
+
+        return {
+            'in_flight': self._in_flight,
+            'queued': len(self._waiting),
+            'admitted': self._admitted,
+            'rejected': self._rejected,
+            'max_concurrency': self.max_concurrency,
+            'max_queue': self.max_queue
+        }
+
+
+    @classmethod
+    def register(cls, flask_app:Flask, url:str, bulkhead:"Route_Bulkhead"):
+        ''' Register the bulkhead of a route so its counters can be monitored '''
+
+        flask_app.config.setdefault(cls.FLASK_REGISTRY_KEY, {})[url] = bulkhead
+
+
+    @classmethod
+    def get_all_stats(cls, flask_app:Flask) -> dict[str, dict[str, Any]]:
+        ''' Get the counters of the bulkhead of every route of a Flask app by URL '''
+
+        return {url: bulkhead.get_stats() for url, bulkhead in flask_app.config.get(cls.FLASK_REGISTRY_KEY, {}).items()}
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import time
+from typing import Any, Optional
+
+from flask import Flask, Request, Response
+
+from ...api.requests.identity import Request_Identity
+from ...utils.cache import Cache_Entry, Cache_Store, LRU_Cache_Store
+from ...utils.json import JSON_Encoder
+
+class Route_Cache:
+    ''' Caches the responses of a route for a configured time
+
+        Responses are keyed by method, URL, normalized payload and optionally
+        the identity of the requester. Cached responses for a `collection_name`
+        are invalidated when a POST, PUT, PATCH or DELETE request on any route
+        with the same `collection_name` succeeds.
+
+        The default store is an in-process LRU. Use a `SQLite_Cache_Store` to
+        share entries and invalidations between all workers on a host:
+        ```
+        Route_Cache(ttl_secs=30, stale_ttl_secs=600, store=SQLite_Cache_Store("/tmp/cache.sqlite3"))
+        ```
+        If `stale_ttl_secs` is set, expired responses are served for that
+        long after they expire when MongoDB can't be reached
+    '''
+
+    FLASK_REGISTRY_KEY = 'APP_ROUTE_CACHES'
+    CACHE_HEADER = 'X-Cache'
+    INVALIDATING_METHODS = ['POST', 'PUT', 'PATCH', 'DELETE']
+    # Headers that are specific to a single response and not cached
+    UNCACHED_HEADERS = ['set-cookie', 'content-length', 'x-request-id']
+
+    def __init__(self,
+            ttl_secs:float=60,
+            stale_ttl_secs:float=0,
+            store:Optional[Cache_Store]=None,
+            vary_by_identity:bool=False,
+            methods:Optional[list[str]]=None
+        ) -> None:
+
+        # Time a response is served from the cache
+        self.ttl_secs = ttl_secs
+        # Time an expired response is served if MongoDB can't be reached
+        self.stale_ttl_secs = stale_ttl_secs
+        self.store = store or LRU_Cache_Store()
+        # Cache responses separately for each requester
+        self.vary_by_identity = vary_by_identity
+        # Methods that are cached
+        self.methods = [method.upper() for method in (methods or ['GET'])]
+
+
+    def is_cached_method(self, method:str) -> bool:
+        return method.upper() in self.methods
+
+
+    def get_key(self, request:Request, payload:Any, identity:Optional[Request_Identity]=None) -> str:
+        ''' Get the cache key for a request and its parsed payload '''
+
+        return self.create_key(request, payload, identity if self.vary_by_identity else None)
+
+
+    @staticmethod
+    def create_key(request:Request, payload:Any, identity:Optional[Request_Identity]=None) -> str:
+        ''' Get a key identifying requests with the same method, URL, normalized payload and identity '''
+
+        key = json.dumps(
+            [
+                request.method,
+                request.path,
+                payload,
+                identity._id if identity else None
+            ],
+            sort_keys=True,
+            cls=JSON_Encoder
+        )
+
+        return hashlib.sha256(key.encode()).hexdigest()
+
+
+    def get_generation(self, namespace:str) -> int:
+        ''' Get the current generation of a namespace. Read this before
+            creating a response so writes during the request invalidate it
+        '''
+
+        return self.store.get_generation(namespace)
+
+
+    def get(self, key:str, namespace:str) -> Optional[Response]:
+        ''' Get a fresh cached response by key '''
+
+        if (entry:=self.store.get(key)) and entry.is_fresh(self.store.get_generation(namespace)):
+            return self._to_response(entry, 'HIT')
+
+
+    def get_stale(self, key:str) -> Optional[Response]:
+        ''' Get a cached response that can be served when MongoDB can't be reached '''
+
+        if self.stale_ttl_secs and (entry:=self.store.get(key)) and entry.is_stale_usable():
+            return self._to_response(entry, 'STALE')
+
+
+    def set(self, key:str, response:Response, generation:int):
+        ''' Cache a response by key for the generation read before it was created '''
+
+        now = time.time()
+        self.store.set(key, Cache_Entry(
+            body=response.get_data(),
+            status_code=response.status_code,
+            headers=self.get_response_headers(response),
+            generation=generation,
+            expires_at=now + self.ttl_secs,
+            stale_until=now + self.ttl_secs + self.stale_ttl_secs
+        ))
+
+
+    def invalidate(self, namespace:str):
+        ''' Invalidate all cached responses in a namespace '''
+
+        self.store.invalidate(namespace)
+
+
+    def _to_response(self, entry:Cache_Entry, status:str) -> Response:
+        response = Response(entry.body, status=entry.status_code, headers=entry.headers)
+        response.headers[self.CACHE_HEADER] = status
+
+        return response
+
+
+    @classmethod
+    def get_response_headers(cls, response:Response) -> list[tuple[str, str]]:
+        ''' Get the headers of a response that can be sent with copies of it '''
+
+        return [(name, value) for name, value in response.headers.items() if name.lower() not in cls.UNCACHED_HEADERS]
+
+
+    @classmethod
+    def register(cls, flask_app:Flask, collection_name:str, cache:Optional["Route_Cache"]=None) -> list["Route_Cache"]:
+        ''' Register a route cache to be invalidated by writes to a collection.
+            Returns all caches registered for the collection
+        '''
+
+        registry:dict[str, list[Route_Cache]] = flask_app.config.setdefault(cls.FLASK_REGISTRY_KEY, {})
+        caches = registry.setdefault(collection_name, [])
+        if cache and cache not in caches:
+            caches.append(cache)
+
+        return caches
@@ -0,0 +1,112 @@
+import math
+import traceback
+from typing import Optional
+
+from flask import Request
+
+from ...api.requests.identity import Request_Identity
+from ...api.responses.errors.api_error import API_Error
+from ...utils.rate_limit import Memory_Rate_Limit_Store, Rate_Limit_Result, Rate_Limit_Store
+
+class Route_Rate_Limit:
+    ''' Limits how often a route can be called with a token bucket that
+        allows `limit` requests per `period_secs` (and bursts of up to `burst`)
+
+        Requests are counted by client IP, by the `_id` of the JWT identity
+        or by its roles. Requests without an identity are counted by IP. Only
+        the `methods` passed are limited (all methods if not passed):
+        ```
+        Route(url='/orders', ..., rate_limits=[
+            Route_Rate_Limit(limit=600, period_secs=60, key_by='ip'),
+            Route_Rate_Limit(limit=10, period_secs=60, key_by='identity', methods=['POST'])
+        ])
+        ```
+        The default store is in-process. Use a `SQLite_Rate_Limit_Store` to
+        share buckets between all workers on a host or a `MongoDB_Rate_Limit_Store`
+        to share them between hosts
+    '''
+
+    KEY_BY = ['ip', 'identity', 'role']
+    KEYS_REQUIRING_IDENTITY = ['identity', 'role']
+
+    def __init__(self,
+            limit:int,
+            period_secs:float=60,
+            key_by:str='ip',
+            methods:Optional[list[str]]=None,
+            burst:Optional[int]=None,
+            store:Optional[Rate_Limit_Store]=None
+        ) -> None:
+
+        if limit < 1 or period_secs <= 0:
+            raise ValueError(f"Route_Rate_Limit: limit [{limit}] and period_secs [{period_secs}] must be positive")
+        if key_by not in self.KEY_BY:
+            raise ValueError(f"Route_Rate_Limit: [{key_by}] is not a valid key. Must be one of {self.KEY_BY}")
+
+        self.limit = limit
+        self.period_secs = period_secs
+        self.key_by = key_by
+        # Methods that are limited
+        self.methods = [method.upper() for method in (methods or [])]
+        # Requests that can be made at once after not calling the route for a while
+        self.burst = burst or limit
+        self.store = store or Memory_Rate_Limit_Store()
+
+
+    @property
+    def requires_identity(self) -> bool:
+        return self.key_by in self.KEYS_REQUIRING_IDENTITY
+
+
+    def is_limited_method(self, method:str) -> bool:
+        return not self.methods or method.upper() in self.methods
+
+
+    def get_key(self, url:str, request:Request, identity:Optional[Request_Identity]=None) -> str:
+        ''' Get the key of the bucket a request is counted in '''
+
+        if self.key_by == 'identity' and identity:
+            client = f"identity:{identity._id}"
+        elif self.key_by == 'role' and identity and identity.roles:
+            client = f"role:{','.join(sorted(identity.roles))}"
+        else:
+            client = f"ip:{request.remote_addr}"
+
+        return f"{url}:{','.join(self.methods) or '*'}:{self.limit}/{self.period_secs}:{client}"
+
+
+    def consume(self, url:str, request:Request, identity:Optional[Request_Identity]=None) -> Rate_Limit_Result:
+        ''' Count a request against the limit '''
+
+        return self.store.consume(self.get_key(url, request, identity), self.burst, self.limit / self.period_secs)
+
+
+    def refund(self, url:str, request:Request, identity:Optional[Request_Identity]=None):
+        ''' Return the token of a request that was counted but rejected by another limit '''
+
+        self.store.refund(self.get_key(url, request, identity), self.burst, self.limit / self.period_secs)
+
+
+    def get_headers(self, result:Rate_Limit_Result) -> dict[str, str]:
+        ''' Get the standard `RateLimit-*` headers for the result of a request '''
+
+        headers = {
+            'RateLimit-Limit': str(result.limit),
+            'RateLimit-Remaining': str(result.remaining),
+            'RateLimit-Reset': str(math.ceil(result.reset_secs)),
+            'RateLimit-Policy': f"{self.limit};w={math.ceil(self.period_secs)}"
+        }
+        if not result.allowed:
+            headers['Retry-After'] = str(max(1, math.ceil(result.retry_after_secs)))
+
+        return headers
+
+
+    def get_rejection_error(self, url:str, result:Rate_Limit_Result) -> API_Error:
+        return API_Error(
+            "Too many requests. Try again later",
+            {'url': url, 'limit': self.limit, 'period_secs': self.period_secs, 'key_by': self.key_by},
+            status_code=429,
+            stack_trace=traceback.format_exc(),
+            headers=self.get_headers(result)
+        )
@@ -2,7 +2,7 @@ from ...config.enums.http_methods import HTTP_METHODS
 from ...utils.requests import JSON_Schema_Validator
 
 from flask import Request
-from typing import Any, Optional
+from typing import Any, Optional, Union
 
 class Route_Schema:
     ''' Base class that allows JSONSchemas to be bound
@@ -41,16 +41,39 @@ class Route_Schema:
         return self.get_schemas().get(method)
     
 
-    def validate_schema(self, request:Request, payload:dict, is_response_schema=False) -> bool:
+    def get_record_fields(self, method:str) -> Optional[list[str]]:
+        ''' Returns the fields of the records described by the schema for a method
+            if the schema doesn't allow additional properties. The records are either
+            the response itself or the items of an array stored in its `data` property
+        '''
+
+        if not (schema:=self.get_schema(method)):
+            return None
+
+        data_schema = schema.get('properties', {}).get('data', {})
+        for record_schema in (data_schema.get('items'), data_schema, schema):
+            if isinstance(record_schema, dict) and record_schema.get('additionalProperties') == False \
+                and (properties:=record_schema.get('properties')) and 'data' not in properties:
+                return list(properties.keys())
+
+        return None
+    
+
+    def validate_schema(self, request:Request, payload:Union[dict, list[dict]], is_response_schema=False) -> bool:
         ''' Validate the request payload against a JSONSchema if one was supplied
             Returns True if a schema was validated, False if one was not and throws
-            an exception if schema validation failed 
+            an exception if schema validation failed. Each record is validated if the
+            payload is a list of records and the schema isn't for an array
         '''
 
         method = request.method.upper()
         if schema:=self.get_schema(method):
             validator = JSON_Schema_Validator(schema, request.url_root, method, is_response_schema)
-            validator.validate_request(payload)
+            if isinstance(payload, list) and schema.get('type') != 'array':
+                for record in payload:
+                    validator.validate_request(record)
+            else:
+                validator.validate_request(payload)
 
             return True
         
@@ -0,0 +1,104 @@
+from dataclasses import dataclass, field
+from threading import Event, Lock
+from typing import Any, Callable, Optional
+
+from flask import Request, Response
+
+from ...api.requests.identity import Request_Identity
+from ...api.routing.route_cache import Route_Cache
+from ...utils.cache import Cache_Entry
+
+@dataclass
+class _Flight:
+    ''' A request being handled that identical requests wait on '''
+
+    done: Event = field(default_factory=Event)
+    # Response of the request if it can be shared
+    entry: Optional[Cache_Entry] = None
+
+
+class Route_Single_Flight:
+    ''' Coalesces identical concurrent requests to a route so only the
+        first one (the leader) runs the route's handler and the others
+        wait for it and get a copy of its response
+
+        Requests are identical if they have the same method, URL and 
+        normalized payload (and JWT identity if `vary_by_identity`).
+        Permissions, schemas and transformers are still applied to each
+        request. Streamed responses are not shared, and requests that
+        waited on a leader that failed or took longer than `timeout_secs`
+        run the handler themselves.
+        ```
+        Route(url='/products', ..., single_flight=Route_Single_Flight())
+        ```
+    '''
+
+    SINGLE_FLIGHT_HEADER = 'X-Single-Flight'
+
+    def __init__(self, 
+            vary_by_identity:bool=False, 
+            methods:Optional[list[str]]=None, 
+            timeout_secs:float=30
+        ) -> None:
+
+        # Only share responses between requests with the same identity
+        self.vary_by_identity = vary_by_identity
+        # Methods that are coalesced
+        self.methods = [method.upper() for method in (methods or ['GET'])]
+        self.timeout_secs = timeout_secs
+
+        self._flights:dict[str, _Flight] = {}
+        self._lock = Lock()
+        self._leaders = 0
+        self._shared = 0
+
+
+    def is_coalesced_method(self, method:str) -> bool:
+        return method.upper() in self.methods
+
+
+    def get_key(self, request:Request, payload:Any, identity:Optional[Request_Identity]=None) -> str:
+        ''' Get the key identical requests share '''
+
+        return Route_Cache.create_key(request, payload, identity if self.vary_by_identity else None)
+
+
+    def run(self, key:str, handle:Callable[[], Any]) -> Any:
+        ''' Run `handle` for the first request with a key, or wait for
+            the request running it and return a copy of its response
+        '''
+
+        with self._lock:
+            if is_leader:=((flight:=self._flights.get(key)) is None):
+                flight = self._flights[key] = _Flight()
+                self._leaders += 1
+
+        if not is_leader:
+            if flight.done.wait(self.timeout_secs) and flight.entry:
+                self._shared += 1
+                response = Response(flight.entry.body, status=flight.entry.status_code, headers=flight.entry.headers)
+                response.headers[self.SINGLE_FLIGHT_HEADER] = 'SHARED'
+                return response
+
+            return handle()
+
+        try:
+            response = handle()
+            if isinstance(response, Response) and not response.is_streamed:
+                flight.entry = Cache_Entry(
+                    body=response.get_data(), 
+                    status_code=response.status_code, 
+                    headers=Route_Cache.get_response_headers(response)
+                )
+
+            return response
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+
+    def get_stats(self) -> dict[str, int]:
+        ''' Get the number of requests that ran the handler and that shared a response '''
+
+        return {'in_flight': len(self._flights), 'leaders': self._leaders, 'shared': self._shared}
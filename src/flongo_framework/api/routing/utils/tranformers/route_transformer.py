@@ -3,7 +3,7 @@ from .....config.enums.http_methods import HTTP_METHODS
 from .field_transformer import Field_Transformer
 
 from flask import Request
-from typing import Optional
+from typing import Optional, Union
 
 class Route_Transformer:
     ''' Base class that allows payload data to be transformed by
@@ -42,11 +42,15 @@ class Route_Transformer:
         return self.get_field_transformers_for_methods().get(method)
     
 
-    def transform(self, request:Request, payload:dict, logger:Optional[RoutingLogger]=None) -> dict:
+    def transform(self, request:Request, payload:Union[dict, list[dict]], logger:Optional[RoutingLogger]=None) -> Union[dict, list[dict]]:
         ''' Transforms the request payload against a transformer if one is supplied
-            Returns the transformed payload 
+            Returns the transformed payload. Each record is transformed if the 
+            payload is a list of records
         '''
 
+        if isinstance(payload, list):
+            return [self.transform(request, record, logger) if isinstance(record, dict) else record for record in payload]
+
         method = request.method.upper()
         if field_transformers:=self.get_field_transformers(method):
             for field_transformer in field_transformers:
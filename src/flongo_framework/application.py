@@ -1,12 +1,18 @@
+import atexit
 import logging
+import os
 import traceback
+from threading import Lock
 
 from flask_cors import cross_origin
 import sentry_sdk
 from .api.routing import App_Routes
+from .api.routing.batch_route import Batch_Route
 from .config.settings import App_Settings
 from .api.responses.errors.api_error import API_Error
 from .database.mongodb.database import MongoDB_Database
+from .database.mongodb.client_provider import MongoDB_Client_Provider
+from .database.mongodb.collection_registry import MongoDB_Collection_Registry
 from .database.mongodb.fixture.fixtures import MongoDB_Fixtures
 from .database.mongodb.index.indices import MongoDB_Indices
 from sentry_sdk.integrations.flask import FlaskIntegration
@@ -14,7 +20,7 @@ from sentry_sdk.integrations.logging import LoggingIntegration
 from .utils.json import JSON_Provider
 
 from flask import Flask, jsonify
-from typing import Optional
+from typing import Any, Optional
 
 from .utils.logging.loggers.app import ApplicationLogger
 from .utils.jwt.jwt_manager import App_JWT_Manager
@@ -24,6 +30,9 @@ class Application:
         It allows us to extend the Flask application and add custom setup steps
         for our application like connecting to a database
     '''
+
+    # Key of the application in the extensions of its Flask app
+    FLASK_EXTENSION_KEY = 'flongo_framework'
     
     def __init__(self, 
             routes:App_Routes, 
@@ -52,9 +61,20 @@ class Application:
         # Initialize the application
         self._initialize()
 
-        # Initialize the database and store client for re-use
-        if database:=self._initialize_database():
-            self.app.config['APP_DB_CLIENT'] = database.get_client()
+        # Initialize the database
+        self._initialize_database()
+
+        # Open MongoDB connections in each worker process after it is forked (with the
+        # gunicorn `post_fork` hook) or else when it handles its first request, so a master
+        # process (like gunicorn with --preload) doesn't open connections its workers can't use
+        self._warmed_up_pid:Optional[int] = None
+        self._warm_up_lock = Lock()
+        if self.settings.mongodb.warm_up_connections:
+            self.app.before_request(self._warm_up_database_once)
+
+        # Report the query shapes that weren't covered by an index when the process exits
+        if self.settings.mongodb.index_advisor:
+            atexit.register(self.log_index_advice)
 
         if self.settings.flask.log_boot_events:
             ApplicationLogger.critical(f"[App Started Successfully]")
@@ -69,17 +89,42 @@ class Application:
     def _initialize(self):
         # Store passed settings in the Flask app config
         self.app.config['APP_SETTINGS'] = self.settings
+        self.app.extensions[self.FLASK_EXTENSION_KEY] = self
 
         # Create error handling definitions
         self._register_error_handlers()
 
+        # Create MongoDB clients lazily in each process so they aren't shared across fork()
+        self.app.config[MongoDB_Client_Provider.FLASK_PROVIDER_KEY] = MongoDB_Client_Provider()
+
+        # Create a registry so MongoDB collection handles are re-used across requests
+        self.app.config[MongoDB_Collection_Registry.FLASK_REGISTRY_KEY] = MongoDB_Collection_Registry(self.settings.mongodb)
+
         # Register all passed Route definitions
         self.routes.register_routes(self.app, self.settings)
 
+        # Register the route that runs several requests in one HTTP request
+        self._register_batch_route()
+
         # Set JSON encoding class
         self.app.json = JSON_Provider(self.app)
 
 
+    def _register_batch_route(self):
+        if not (batch_url:=self.settings.flask.batch_url):
+            return
+
+        if any(route.url == batch_url for route in self.routes.get_routes()):
+            ApplicationLogger.warn(f"[Batch route not created. A route already uses the URL [{batch_url}]]")
+            return
+
+        Batch_Route(
+            batch_url,
+            max_requests=self.settings.flask.batch_max_requests or 0,
+            max_workers=self.settings.flask.batch_max_workers or 1
+        ).register(self.app, self.settings)
+
+
     def _initialize_jwt(self):
         App_JWT_Manager(self.app, self.settings.jwt)
 
@@ -125,26 +170,91 @@ class Application:
             connection_must_be_valid=requires_mongodb
         )
 
-        # If MongoDB is not required but the connection is valid, create and return the DB
-        if requires_mongodb or database.validate_connection():
-            if self.settings.flask.log_boot_events:
-                ApplicationLogger.critical(f"[Setting up Database]")
+        try:
+            # If MongoDB is not required but the connection is valid, create and return the DB
+            if requires_mongodb or database.validate_connection():
+                if self.settings.flask.log_boot_events:
+                    ApplicationLogger.critical(f"[Setting up Database]")
 
-            # Create indices
-            if self.indices and len(self.indices):
-                database.create_indices()
-                ApplicationLogger.warn(
-                    f"[Created [{len(self.indices)}] database {'indices' if len(self.indices) > 1 else 'index'}]"
-                )
+                # Create indices
+                if self.indices and len(self.indices):
+                    report = database.create_indices()
+                    created = sum(len(changes["create"]) for changes in report.values())
+                    ApplicationLogger.warn(
+                        f"[Synchronized [{len(self.indices)}] database {'indices' if len(self.indices) > 1 else 'index'}. Created [{created}]]"
+                    )
+
+                # Create fixtures
+                if self.fixtures and len(self.fixtures):
+                    created = database.create_fixtures()
+                    ApplicationLogger.warn(
+                        f"[Created [{created}] database fixture{'s' if created != 1 else ''}]"
+                    )
 
-            # Create fixtures
-            if self.fixtures and len(self.fixtures):
-                database.create_fixtures()
-                ApplicationLogger.warn(
-                    f"[Created [{len(self.fixtures)}] database fixture{'s' if len(self.fixtures) > 1 else ''}]"
+                return database
+        finally:
+            # Requests use a client created by the process handling them, so the client 
+            # created for setup is closed instead of being inherited across fork(). The 
+            # client the Flask app provides to this process (in an app context) is kept
+            setup_client = database.get_client()
+            if setup_client is not MongoDB_Database.get_client_from_flask():
+                setup_client.close()
+
+
+    def warm_up_database(self):
+        ''' Open `MONGODB_MIN_POOL_SIZE` connections to MongoDB and query
+            the collection of every route for the current process
+        '''
+
+        try:
+            with self.app.app_context():
+                MongoDB_Collection_Registry.get_registry(self.app).warm_up(
+                    [route.collection_name for route in self.routes.get_routes() if route.collection_name],
+                    self.settings.mongodb.min_pool_size or 0
                 )
+        except Exception as e:
+            ApplicationLogger.error(f"[Failed to warm up database connections: {e}]")
+
+
+    def _warm_up_database_once(self):
+        ''' Warm up the database connections of the current process if it hasn't been done '''
+
+        if self._warmed_up_pid != os.getpid():
+            with self._warm_up_lock:
+                if self._warmed_up_pid != os.getpid():
+                    self._warmed_up_pid = os.getpid()
+                    self.warm_up_database()
+
+
+    @classmethod
+    def post_fork(cls, server:Any, worker:Any):
+        ''' Gunicorn `post_fork` hook that warms up the database connections of each
+            worker before it accepts requests if `MONGODB_WARM_UP_CONNECTIONS` is enabled.
+            Set `post_fork = Application.post_fork` in the gunicorn config file
+        '''
+
+        # Find the Flask app under any WSGI middleware (like ProxyFix)
+        wsgi_app = server.app.wsgi()
+        while wsgi_app is not None and not isinstance(wsgi_app, Flask):
+            wsgi_app = getattr(wsgi_app, 'app', None)
+
+        application:Optional[Application] = wsgi_app.extensions.get(cls.FLASK_EXTENSION_KEY) if wsgi_app else None
+        if application and application.settings.mongodb.warm_up_connections:
+            application._warm_up_database_once()
+
+
+    def log_index_advice(self, limit:int=10) -> Optional[MongoDB_Indices]:
+        ''' Log the query shapes recorded by the index advisor of the current
+            process that aren't covered by an index and return suggested indices
+        '''
+
+        try:
+            with self.app.app_context():
+                if MongoDB_Database.get_client_from_flask():
+                    return MongoDB_Collection_Registry.get_registry(self.app).database.log_index_advice(limit)
+        except Exception as e:
+            ApplicationLogger.error(f"[Failed to create index advice: {e}]")
 
-            return database
 
     def _register_error_handlers(self):
         ''' Register wrappers to handle specific kinds of errors '''
@@ -160,6 +270,8 @@ class Application:
                 additional_data=error.data,
             )
             response.status_code = error.status_code
+            if headers:=getattr(error, 'headers', None):
+                response.headers.update(headers)
             return response
 
 
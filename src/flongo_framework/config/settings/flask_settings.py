@@ -102,6 +102,54 @@ class Flask_Settings(Settings):
         metadata={"log_level": LOG_LEVELS.WARN}
     ) # type: ignore
 
+    default_page_size: Optional[int] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "APP_DEFAULT_PAGE_SIZE", 
+            data_type=int,
+            default_value="100"
+        ),
+    ) # type: ignore
+
+    max_page_size: Optional[int] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "APP_MAX_PAGE_SIZE", 
+            data_type=int,
+            default_value="1000"
+        ),
+    ) # type: ignore
+
+    request_timeout_ms: Optional[int] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "APP_REQUEST_TIMEOUT_MS", 
+            data_type=int,
+            default_value="0"
+        ),
+    ) # type: ignore
+
+    batch_url: Optional[str] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "APP_BATCH_URL", 
+            data_type=str,
+            default_value=""
+        ),
+    ) # type: ignore
+
+    batch_max_requests: Optional[int] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "APP_BATCH_MAX_REQUESTS", 
+            data_type=int,
+            default_value="25"
+        ),
+    ) # type: ignore
+
+    batch_max_workers: Optional[int] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "APP_BATCH_MAX_WORKERS", 
+            data_type=int,
+            default_value="4"
+        ),
+    ) # type: ignore
+
     allowed_file_extensions: Optional[list] = field(
         default_factory=lambda: Settings.read_config_from_env_or_default(
             "APP_ALLOWED_FILE_EXTENSIONS", 
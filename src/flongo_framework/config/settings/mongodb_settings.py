@@ -62,6 +62,168 @@ class MongoDB_Settings(Settings):
         ),
     ) # type: ignore
 
+    max_pool_size: Optional[int] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "MONGODB_MAX_POOL_SIZE",
+            data_type=int,
+            default_value="100"
+        ),
+    ) # type: ignore
+
+    min_pool_size: Optional[int] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "MONGODB_MIN_POOL_SIZE",
+            data_type=int,
+            default_value="0"
+        ),
+    ) # type: ignore
+
+    max_idle_time_ms: Optional[int] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "MONGODB_MAX_IDLE_TIME_MS",
+            data_type=int,
+            default_value=None
+        ),
+    ) # type: ignore
+
+    wait_queue_timeout_ms: Optional[int] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "MONGODB_WAIT_QUEUE_TIMEOUT_MS",
+            data_type=int,
+            default_value=None
+        ),
+    ) # type: ignore
+
+    compressors: Optional[list] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "MONGODB_COMPRESSORS",
+            data_type=list,
+            default_value=None
+        ),
+    ) # type: ignore
+
+    read_preference: Optional[str] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "MONGODB_READ_PREFERENCE",
+            data_type=str,
+            default_value="primary"
+        ),
+    ) # type: ignore
+
+    read_concern_level: Optional[str] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "MONGODB_READ_CONCERN_LEVEL",
+            data_type=str,
+            default_value=None
+        ),
+    ) # type: ignore
+
+    retry_reads: Optional[bool] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "MONGODB_RETRY_READS",
+            data_type=bool,
+            default_value="True"
+        ),
+    ) # type: ignore
+
+    write_concern: Optional[str] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "MONGODB_WRITE_CONCERN",
+            data_type=str,
+            default_value=None
+        ),
+    ) # type: ignore
+
+    circuit_breaker_failure_threshold: Optional[int] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "MONGODB_CIRCUIT_BREAKER_FAILURE_THRESHOLD",
+            data_type=int,
+            default_value="5"
+        ),
+    ) # type: ignore
+
+    circuit_breaker_reset_timeout_ms: Optional[int] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "MONGODB_CIRCUIT_BREAKER_RESET_TIMEOUT_MS",
+            data_type=int,
+            default_value="10000"
+        ),
+    ) # type: ignore
+
+    read_retry_attempts: Optional[int] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "MONGODB_READ_RETRY_ATTEMPTS",
+            data_type=int,
+            default_value="2"
+        ),
+    ) # type: ignore
+
+    read_retry_base_delay_ms: Optional[int] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "MONGODB_READ_RETRY_BASE_DELAY_MS",
+            data_type=int,
+            default_value="50"
+        ),
+    ) # type: ignore
+
+    bulk_write_batch_size: Optional[int] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "MONGODB_BULK_WRITE_BATCH_SIZE", 
+            data_type=int,
+            default_value="1000"
+        ),
+    ) # type: ignore
+
+    drop_undeclared_indices: Optional[bool] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "MONGODB_DROP_UNDECLARED_INDICES", 
+            data_type=bool,
+            default_value="False"
+        ),
+        metadata={"log_level": LOG_LEVELS.WARN}
+    ) # type: ignore
+
+    index_sync_dry_run: Optional[bool] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "MONGODB_INDEX_SYNC_DRY_RUN", 
+            data_type=bool,
+            default_value="False"
+        ),
+        metadata={"log_level": LOG_LEVELS.WARN}
+    ) # type: ignore
+
+    slow_query_threshold_ms: Optional[int] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "MONGODB_SLOW_QUERY_THRESHOLD_MS",
+            data_type=int,
+            default_value="0"
+        ),
+    ) # type: ignore
+
+    explain_slow_queries: Optional[bool] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "MONGODB_EXPLAIN_SLOW_QUERIES",
+            data_type=bool,
+            default_value="True"
+        ),
+    ) # type: ignore
+
+    index_advisor: Optional[bool] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "MONGODB_INDEX_ADVISOR",
+            data_type=bool,
+            default_value="False"
+        ),
+    ) # type: ignore
+
+    warm_up_connections: Optional[bool] = field(
+        default_factory=lambda: Settings.read_config_from_env_or_default(
+            "MONGODB_WARM_UP_CONNECTIONS",
+            data_type=bool,
+            default_value="False"
+        ),
+    ) # type: ignore
+
     log_level: Optional[str] = field(
         default_factory=lambda: Settings.read_config_from_env_or_default(
             "MONGODB_LOG_LEVEL", 
@@ -71,6 +233,59 @@ class MongoDB_Settings(Settings):
         metadata={"log_level": LOG_LEVELS.WARN}
     ) # type: ignore
 
+    COMPRESSORS = ['zstd', 'snappy', 'zlib']
+    READ_PREFERENCES = ['primary', 'primaryPreferred', 'secondary', 'secondaryPreferred', 'nearest']
+    READ_CONCERN_LEVELS = ['local', 'available', 'majority', 'linearizable', 'snapshot']
+
+    def __post_init__(self):
+        self._validate_client_options()
+        super().__post_init__()
+
+
+    def _validate_client_options(self):
+        ''' Validate the options used to create the MongoDB client '''
+
+        if self.compressors == ['']:
+            self.compressors = None
+
+        if invalid_compressors:=[compressor for compressor in (self.compressors or []) if compressor not in self.COMPRESSORS]:
+            raise ValueError(f"MongoDB_Settings: {invalid_compressors} are not valid compressors. Must be any of {self.COMPRESSORS}")
+
+        if self.read_preference and self.read_preference not in self.READ_PREFERENCES:
+            raise ValueError(f"MongoDB_Settings: [{self.read_preference}] is not a valid read preference. Must be one of {self.READ_PREFERENCES}")
+
+        if self.read_concern_level and self.read_concern_level not in self.READ_CONCERN_LEVELS:
+            raise ValueError(f"MongoDB_Settings: [{self.read_concern_level}] is not a valid read concern level. Must be one of {self.READ_CONCERN_LEVELS}")
+
+        if self.max_pool_size and self.min_pool_size and self.min_pool_size > self.max_pool_size:
+            raise ValueError(f"MongoDB_Settings: min_pool_size [{self.min_pool_size}] can't be larger than max_pool_size [{self.max_pool_size}]")
+
+
+    @property
+    def client_options(self) -> dict:
+        ''' Get the configured options to create a MongoClient with. Options
+            that aren't configured are left to the connection string or pymongo
+        '''
+
+        write_concern = self.write_concern
+        if write_concern and write_concern.isdigit():
+            write_concern = int(write_concern)
+
+        options = {
+            'maxPoolSize': self.max_pool_size,
+            'minPoolSize': self.min_pool_size,
+            'maxIdleTimeMS': self.max_idle_time_ms,
+            'waitQueueTimeoutMS': self.wait_queue_timeout_ms,
+            'compressors': ','.join(self.compressors) if self.compressors else None,
+            'readPreference': self.read_preference,
+            'readConcernLevel': self.read_concern_level,
+            'retryReads': self.retry_reads,
+            'w': write_concern
+        }
+
+        return {option: value for option, value in options.items() if value not in (None, '')}
+
+
     @classmethod
     def get_settings_from_flask(cls) -> Optional["MongoDB_Settings"]:
         ''' Get the MongoDB settings for the current Flask app '''
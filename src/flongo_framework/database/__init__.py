@@ -1 +1,5 @@
 from .mongodb.database import MongoDB_Database
+from .mongodb.collection_registry import MongoDB_Collection_Registry
+from .mongodb.write_behind_queue import MongoDB_Write_Behind_Queue
+from .mongodb.circuit_breaker import MongoDB_Circuit_Breaker
+from .mongodb.rate_limit_store import MongoDB_Rate_Limit_Store
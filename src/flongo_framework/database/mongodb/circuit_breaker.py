@@ -0,0 +1,207 @@
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Any, Iterator, Optional
+from pymongo.errors import ConnectionFailure, PyMongoError
+
+from ...database.errors.database_error import DatabaseError
+from ...utils.logging.loggers.database import DatabaseLogger
+
+class MongoDB_Circuit_Breaker:
+    ''' Fails MongoDB operations fast while the database can't be reached
+
+        The breaker opens after `failure_threshold` consecutive connection
+        failures. While it is open, requests are rejected immediately instead
+        of each waiting for server selection to time out. After
+        `reset_timeout_secs` one request is let through as a probe
+        (half-open). The breaker closes if the probe succeeds and opens
+        again if it fails.
+        ```
+        breaker = MongoDB_Circuit_Breaker(failure_threshold=5, reset_timeout_secs=10)
+        with breaker.guard():
+            collection.find_one({})
+        ```
+        A `failure_threshold` of 0 disables the breaker
+    '''
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    # Timeouts this close to a request deadline were caused by the deadline
+    DEADLINE_TOLERANCE_SECS = 0.1
+
+    def __init__(self, failure_threshold:int=5, reset_timeout_secs:float=10):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_secs = reset_timeout_secs
+
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at:Optional[float] = None
+        self._probing = False
+        self._rejected = 0
+        self._times_opened = 0
+        self._lock = Lock()
+
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_threshold > 0
+
+
+    @property
+    def state(self) -> str:
+        ''' Get the state of the breaker. An open breaker is reported as
+            half-open once its reset timeout has passed
+        '''
+
+        if self._state == self.OPEN and self.get_retry_after_secs() == 0:
+            return self.HALF_OPEN
+        return self._state
+
+
+    def get_retry_after_secs(self) -> float:
+        ''' Get the seconds left until an open breaker lets a probe through '''
+
+        if self._opened_at is None:
+            return 0
+        return max(0, self.reset_timeout_secs - (time.monotonic() - self._opened_at))
+
+
+    def allow_request(self) -> bool:
+        ''' Returns True if an operation can run. Only one probe at a
+            time is let through once the reset timeout of an open breaker passes
+        '''
+
+        if not self.enabled or self._state == self.CLOSED:
+            return True
+
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+
+            if not self._probing and self.get_retry_after_secs() == 0:
+                self._state = self.HALF_OPEN
+                self._probing = True
+                DatabaseLogger().warn(f"* MongoDB circuit breaker is HALF OPEN. Probing the database *")
+                return True
+
+            self._rejected += 1
+            return False
+
+
+    def ensure_closed(self):
+        ''' Raise a DatabaseError with code 503 if an operation can't run '''
+
+        if not self.allow_request():
+            raise DatabaseError(
+                f"MongoDB_Circuit_Breaker: The database is unavailable!",
+                code=503,
+                data={
+                    'circuit_breaker': self.state,
+                    'retry_after_secs': round(self.get_retry_after_secs(), 3)
+                }
+            )
+
+
+    @contextmanager
+    def guard(self, deadline:Optional[float]=None) -> Iterator[None]:
+        ''' Fail fast if the breaker is open, then record if the operations
+            run in the block could reach the database. Timeouts of operations
+            that ran out of the time left before a request `deadline` 
+            (from time.monotonic()) aren't failures
+        '''
+
+        self.ensure_closed()
+        try:
+            yield
+        except ConnectionFailure as e:
+            if self.is_deadline_timeout(e, deadline):
+                self.release_probe()
+            else:
+                self.record_failure()
+            raise
+        except DatabaseError as e:
+            # Only errors reporting the database as unreachable (like failed heartbeats) are
+            # failures. Others (like a missing collection name) don't say if it can be reached
+            if e.code == 503:
+                self.record_failure()
+            else:
+                self.release_probe()
+            raise
+        except PyMongoError:
+            # The database was reached even though the operation failed
+            self.record_success()
+            raise
+        except BaseException:
+            self.release_probe()
+            raise
+
+        self.record_success()
+
+
+    def is_deadline_timeout(self, error:ConnectionFailure, deadline:Optional[float]=None) -> bool:
+        ''' Returns True if an error is a timeout caused by a request running out of time '''
+
+        return bool(error.timeout) and deadline is not None and \
+            time.monotonic() >= deadline - self.DEADLINE_TOLERANCE_SECS
+
+
+    def release_probe(self):
+        ''' Let another request probe the database if the probe
+            finished without finding out if it can be reached
+        '''
+
+        if self._probing:
+            with self._lock:
+                self._probing = False
+
+
+    def record_success(self):
+        ''' Record an operation that reached the database '''
+
+        if not self.enabled or (self._state == self.CLOSED and not self._consecutive_failures):
+            return
+
+        with self._lock:
+            if self._state != self.CLOSED:
+                DatabaseLogger().warn(f"* MongoDB circuit breaker is CLOSED. The database is reachable again *")
+
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._probing = False
+
+
+    def record_failure(self):
+        ''' Record an operation that couldn't reach the database. Opens the
+            breaker when a probe fails or there are too many consecutive failures
+        '''
+
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN or \
+                (self._state == self.CLOSED and self._consecutive_failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+                self._times_opened += 1
+                DatabaseLogger().error(
+                    f"* MongoDB circuit breaker is OPEN after [{self._consecutive_failures}] consecutive failures. " +
+                    f"Failing fast for [{self.reset_timeout_secs}] seconds *"
+                )
+
+
+    def get_stats(self) -> dict[str, Any]:
+        ''' Get the state of the breaker for monitoring '''
+
+        return {
+            'state': self.state,
+            'consecutive_failures': self._consecutive_failures,
+            'failure_threshold': self.failure_threshold,
+            'retry_after_secs': round(self.get_retry_after_secs(), 3),
+            'times_opened': self._times_opened,
+            'rejected': self._rejected
+        }
@@ -0,0 +1,56 @@
+import os
+from threading import Lock
+from typing import Callable, Optional
+
+from pymongo import MongoClient
+
+from ...utils.logging.loggers.database import DatabaseLogger
+
+class MongoDB_Client_Provider:
+    ''' Provides one MongoClient for each process of an application
+
+        Clients are created lazily by the process that uses them so a
+        client is never shared across `fork()` (like gunicorn workers
+        forked from a `--preload` master process)
+        ```
+        provider = MongoDB_Client_Provider()
+        provider.get_client(create_client)
+        ```
+    '''
+
+    FLASK_PROVIDER_KEY = 'APP_DB_CLIENT_PROVIDER'
+
+    def __init__(self) -> None:
+        self._clients:dict[int, MongoClient] = {}
+        self._lock = Lock()
+        # The lock may be held by another thread when the process forks
+        os.register_at_fork(after_in_child=self._reset_after_fork)
+
+
+    def get_client(self, create_client:Callable[[], MongoClient]) -> MongoClient:
+        ''' Get the client for the current process, creating it with `create_client` on first use '''
+
+        pid = os.getpid()
+        if (client:=self._clients.get(pid)) is None:
+            with self._lock:
+                if (client:=self._clients.get(pid)) is None:
+                    client = create_client()
+                    self._clients[pid] = client
+                    DatabaseLogger(DatabaseLogger._BASE_NAME).info(f"* Created MongoDB client for process [{pid}] *")
+
+        return client
+
+
+    def get_current_client(self) -> Optional[MongoClient]:
+        ''' Get the client for the current process if it has been created '''
+
+        return self._clients.get(os.getpid())
+
+
+    def _reset_after_fork(self):
+        ''' Forget the clients of the parent process without closing them.
+            They are still in use by the parent
+        '''
+
+        self._clients = {}
+        self._lock = Lock()
@@ -0,0 +1,226 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Optional, Union
+
+from flask import Flask, current_app, has_app_context
+from pymongo import ReadPreference, WriteConcern
+from pymongo.collection import Collection
+
+from ...config.settings.mongodb_settings import MongoDB_Settings
+from ...database.errors.database_error import DatabaseError
+from ...database.mongodb.circuit_breaker import MongoDB_Circuit_Breaker
+from ...database.mongodb.database import MongoDB_Database
+from ...database.mongodb.monitoring import MongoDB_Heartbeat_Listener
+from ...utils.logging.loggers.database import DatabaseLogger
+
+class MongoDB_Collection_Registry:
+    ''' Per-application registry of MongoDB collection handles
+
+        Each collection is resolved once on first use and then re-used
+        by every request on routes with that `collection_name`.
+        ```
+        registry = MongoDB_Collection_Registry(settings)
+        registry.get_collection("collection")
+        ```
+        Connection health is tracked by pymongo's background server
+        monitoring instead of pinging the server for each request.
+
+        Handles are only re-used by the process that created them, so
+        forked worker processes resolve their own.
+
+        Routes can read and write a collection in another database or 
+        with their own read preference and write concern:
+        ```
+        registry.get_collection("events", read_preference="secondaryPreferred", write_concern=1)
+        ```
+        The registry's `circuit_breaker` fails requests fast while MongoDB
+        can't be reached. Its state is returned by `get_stats()`
+    '''
+
+    FLASK_REGISTRY_KEY = 'APP_DB_COLLECTIONS'
+    READ_PREFERENCES = {
+        'primary': ReadPreference.PRIMARY,
+        'primaryPreferred': ReadPreference.PRIMARY_PREFERRED,
+        'secondary': ReadPreference.SECONDARY,
+        'secondaryPreferred': ReadPreference.SECONDARY_PREFERRED,
+        'nearest': ReadPreference.NEAREST
+    }
+
+    def __init__(self, settings:Optional[MongoDB_Settings]=None):
+        self.settings = settings
+        self._database:Optional[MongoDB_Database] = None
+        self._collections:dict[Any, Collection] = {}
+        self._lock = Lock()
+        self._pid = os.getpid()
+        self.circuit_breaker = self._create_circuit_breaker()
+
+
+    def _create_circuit_breaker(self) -> MongoDB_Circuit_Breaker:
+        settings = self.settings or MongoDB_Settings.get_settings_from_flask() or MongoDB_Settings()
+        return MongoDB_Circuit_Breaker(
+            failure_threshold=settings.circuit_breaker_failure_threshold or 0,
+            reset_timeout_secs=(settings.circuit_breaker_reset_timeout_ms or 0) / 1000
+        )
+
+
+    def _reset_after_fork(self):
+        ''' Forget the handles created by a parent process '''
+
+        if self._pid != os.getpid():
+            self._database = None
+            self._collections = {}
+            self._lock = Lock()
+            self._pid = os.getpid()
+            self.circuit_breaker = self._create_circuit_breaker()
+
+
+    @property
+    def database(self) -> MongoDB_Database:
+        ''' Get the database driver shared by all collections in this registry '''
+
+        self._reset_after_fork()
+        if self._database is None:
+            with self._lock:
+                if self._database is None:
+                    self._database = MongoDB_Database(settings=self.settings)
+
+        return self._database
+
+
+    def get_collection(self, 
+            collection_name:str,
+            database_name:str='',
+            read_preference:Optional[str]=None,
+            write_concern:Optional[Union[int, str]]=None
+        ) -> Collection:
+        ''' Get a MongoDB Collection by name, resolving it on first use. The
+            collection is in the default database unless `database_name` is passed
+            and uses the client read preference and write concern unless passed
+        '''
+
+        self._reset_after_fork()
+        key = (collection_name, database_name, read_preference, write_concern) if \
+            (database_name or read_preference or write_concern is not None) else collection_name
+        if (collection:=self._collections.get(key)) is None:
+            database = self.database
+            with self._lock:
+                if (collection:=self._collections.get(key)) is None:
+                    if database_name:
+                        collection = database.get_client().get_database(database_name).get_collection(collection_name)
+                    else:
+                        collection = database[collection_name]
+
+                    if read_preference or write_concern is not None:
+                        collection = collection.with_options(**self.get_collection_options(read_preference, write_concern))
+
+                    self._collections[key] = collection
+                    DatabaseLogger(
+                        database=database_name or database.database_name,
+                        collection=collection_name
+                    ).debug(f"* Registered collection handle for re-use *")
+
+        return collection
+
+
+    @classmethod
+    def get_collection_options(cls, 
+            read_preference:Optional[str]=None, 
+            write_concern:Optional[Union[int, str]]=None
+        ) -> dict[str, Any]:
+        ''' Get the options to get a collection with a read preference and write concern by name '''
+
+        options:dict[str, Any] = {}
+        if read_preference:
+            if read_preference not in cls.READ_PREFERENCES:
+                raise ValueError(f"MongoDB_Collection_Registry: [{read_preference}] is not a valid read preference. Must be one of {list(cls.READ_PREFERENCES)}")
+            options['read_preference'] = cls.READ_PREFERENCES[read_preference]
+
+        if write_concern is not None:
+            if isinstance(write_concern, str) and write_concern.isdigit():
+                write_concern = int(write_concern)
+            options['write_concern'] = WriteConcern(w=write_concern)
+
+        return options
+
+
+    def validate_connection(self, raise_exception:bool=False) -> bool:
+        ''' Tests if the connection to MongoDB is healthy using the result
+            of the most recent background heartbeats. Does not contact the server.
+            Raises a DatabaseError with code 503 if it isn't and `raise_exception` is True
+        '''
+
+        client = self.database.get_client()
+        listener = MongoDB_Heartbeat_Listener.get_listener(client)
+        if not listener or listener.is_healthy:
+            return True
+
+        if raise_exception:
+            # The database is unavailable at least until the next heartbeat
+            MongoDB_Database._log_and_throw_database_error(DatabaseError(
+                f"MongoDB_Database: Could not connect to the database!",
+                code=503,
+                data={
+                    'host': self.database.settings.host,
+                    'port': self.database.settings.port,
+                    'failed_servers': listener.get_failed_servers(),
+                    'retry_after_secs': client.options.heartbeat_frequency
+                }
+            ))
+
+        return False
+
+
+    def get_stats(self) -> dict[str, Any]:
+        ''' Get the state of the circuit breaker and the connection for monitoring '''
+
+        self._reset_after_fork()
+        listener = MongoDB_Heartbeat_Listener.get_listener(self._database.get_client()) if self._database else None
+        return {
+            'circuit_breaker': self.circuit_breaker.get_stats(),
+            'failed_servers': listener.get_failed_servers() if listener else [],
+            'collections': len(self._collections)
+        }
+
+
+    def log_slow_queries(self):
+        ''' Log the slow queries run by this thread if slow queries are recorded '''
+
+        self.database.log_slow_queries()
+
+
+    def warm_up(self, collection_names:list[str], connections:int=0):
+        ''' Open `connections` pooled connections to MongoDB and resolve and 
+            query each collection so the first requests don't wait on them
+        '''
+
+        client = self.database.get_client()
+        logger = DatabaseLogger(database=self.database.database_name)
+        if connections > 0:
+            # Concurrent pings check out separate connections from the pool
+            with ThreadPoolExecutor(max_workers=connections) as executor:
+                list(executor.map(lambda _: client.admin.command('ping'), range(connections)))
+
+        for collection_name in dict.fromkeys(collection_names):
+            self.get_collection(collection_name).find_one({}, {'_id': 1})
+
+        logger.info(f"* Warmed up [{connections}] MongoDB connections and [{len(set(collection_names))}] collections for process [{os.getpid()}] *")
+
+
+    @classmethod
+    def get_registry(cls, flask_app:Flask, settings:Optional[MongoDB_Settings]=None) -> "MongoDB_Collection_Registry":
+        ''' Get the collection registry for a Flask app, creating it if it does not exist '''
+
+        if not (registry:=flask_app.config.get(cls.FLASK_REGISTRY_KEY)):
+            registry = cls(settings)
+            flask_app.config[cls.FLASK_REGISTRY_KEY] = registry
+
+        return registry
+
+
+    @classmethod
+    def get_registry_from_flask(cls) -> Optional["MongoDB_Collection_Registry"]:
+        ''' Get the collection registry for the current Flask app '''
+
+        if has_app_context():
+            return current_app.config.get(cls.FLASK_REGISTRY_KEY)
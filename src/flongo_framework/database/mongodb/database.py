@@ -1,20 +1,23 @@
     
 import json
-from typing import Optional
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
 
 from flask import current_app, has_app_context
 
 from ...config.settings.mongodb_settings import MongoDB_Settings
-from pymongo import TEXT, MongoClient
+from pymongo import TEXT, MongoClient, UpdateOne
 from pymongo.database import Database
 from pymongo.collection import Collection
-from pymongo.errors import OperationFailure
+from pymongo.errors import BulkWriteError, OperationFailure
 
 from ...database.errors.database_error import DatabaseError
+from ...database.mongodb.client_provider import MongoDB_Client_Provider
 from ...database.mongodb.fixture.base import MongoDB_Fixture
 from ...database.mongodb.fixture.fixtures import MongoDB_Fixtures
 from ...database.mongodb.index.base import MongoDB_Index
 from ...database.mongodb.index.indices import MongoDB_Indices
+from ...database.mongodb.monitoring import MongoDB_Heartbeat_Listener, MongoDB_Index_Advisor, MongoDB_Slow_Query_Listener
 
 import traceback
 
@@ -38,9 +41,15 @@ class MongoDB_Database:
             pass
         ```
         # TODO - Indices docs
-        # TODO - Fixtures docs
+
+        Fixtures are applied with one unordered bulk write per collection. A hash 
+        of the fixtures for each collection is stored in the `_fixtures` collection
+        so fixtures that haven't changed since they were last applied are skipped
     '''
 
+    # Collection that stores a hash of the fixtures applied to each collection
+    FIXTURE_CHECKSUMS_COLLECTION = '_fixtures'
+
     def __init__(self, 
             collection_name:str='', 
             database_name:str='', 
@@ -69,12 +78,74 @@ class MongoDB_Database:
         if current_client:=getattr(self, "_client", None):
             return current_client
         
-        # If client already exists in Flask context, return it
-        if flask_client:=self.get_client_from_flask():
-            return flask_client
+        # If the Flask app provides clients, use the client for this process
+        if client_provider:=self.get_client_provider_from_flask():
+            return client_provider.get_client(self.create_client)
         
-        # Otherwise create a new client
-        return MongoClient(self.connection_string, serverSelectionTimeoutMS=self.settings.connection_timeout_ms)
+        return self.create_client()
+
+
+    def create_client(self) -> MongoClient:
+        ''' Create a new client that tracks server health in the background.
+            Configured client options override the options in the connection string
+        '''
+
+        event_listeners = [MongoDB_Heartbeat_Listener()]
+        # Record commands slower than the threshold if configured
+        if self.settings.slow_query_threshold_ms:
+            event_listeners.append(MongoDB_Slow_Query_Listener(
+                self.settings.slow_query_threshold_ms,
+                explain=bool(self.settings.explain_slow_queries)
+            ))
+
+        # Learn the query shapes used by the application if configured
+        if self.settings.index_advisor:
+            event_listeners.append(MongoDB_Index_Advisor())
+
+        return MongoClient(
+            self.connection_string,
+            serverSelectionTimeoutMS=self.settings.connection_timeout_ms,
+            event_listeners=event_listeners,
+            **self.settings.client_options
+        )
+
+
+    def get_index_advice(self, limit:int=10, include_partial:bool=True) -> list[dict]:
+        ''' Get the query shapes recorded by the index advisor for this database that
+            aren't fully covered by the existing indices, costliest first
+        '''
+
+        if not (advisor:=MongoDB_Index_Advisor.get_listener(self._client)):
+            return []
+
+        indices = {
+            collection_name: [list(index['key'].items()) for index in self._get_collection(collection_name).list_indexes()]
+            for collection_name in advisor.get_collection_names(self.database_name)
+        }
+
+        return advisor.get_report(indices, self.database_name, limit, include_partial)
+
+
+    def log_index_advice(self, limit:int=10) -> MongoDB_Indices:
+        ''' Log the query shapes that aren't fully covered by an index and
+            return index definitions for the shapes with no coverage
+        '''
+
+        report = self.get_index_advice(limit)
+        for entry in report:
+            DatabaseLogger(database=self.database_name, collection=entry['collection']).warn(
+                f"* Query shape with [{entry['coverage']}] index coverage ran [{entry['count']}] times " +
+                f"(avg [{entry['avg_ms']}ms], total [{entry['total_ms']}ms]). Equality: {entry['equality']}, " +
+                f"Range: {entry['range']}, Sort: {entry['sort']}. Suggested index: {entry['suggested_index']} *"
+            )
+
+        return MongoDB_Index_Advisor.get_suggested_indices(report)
+
+
+    def log_slow_queries(self):
+        ''' Log the slow queries run by this thread if slow queries are recorded '''
+
+        MongoDB_Slow_Query_Listener.log_slow_queries(self._client)
 
 
     @property
@@ -245,21 +316,207 @@ class MongoDB_Database:
         raise error
         
 
-    def create_indices(self, background:bool=False):
-        ''' Creates all stored indices on the connected database '''
+    def create_indices(self, background:bool=False) -> dict[str, dict[str, list[str]]]:
+        ''' Creates all stored indices on the connected database that don't exist yet.
+            Drops undeclared indices or only reports changes if configured in the settings
+        '''
+
+        return self.sync_indices(
+            drop_undeclared=bool(self.settings.drop_undeclared_indices),
+            dry_run=bool(self.settings.index_sync_dry_run),
+            background=background
+        )
 
-        # Create all indices
-        for index in self.indices:
-            self.create_index(index, background)
 
+    def sync_indices(self, drop_undeclared:bool=False, dry_run:bool=False, background:bool=False) -> dict[str, dict[str, list[str]]]:
+        ''' Synchronize the stored indices with the connected database. The existing indices
+            are read once for each collection with stored indices and the missing ones are 
+            created with a single `create_indexes` call per collection.
 
-    def create_fixtures(self, fixtures:Optional[MongoDB_Fixtures]=None):
-        ''' Create pre-defined database records in the MongoDB database '''
+            If `drop_undeclared` is True, indices on those collections that aren't stored are
+            dropped. If `dry_run` is True, the changes are only reported. Returns a report of the
+            indices to `create`, `drop` and that already `exist` for each collection
+        '''
+
+        report = {}
+        for collection_name, indices in self.indices.get_indices_by_collection().items():
+            report[collection_name] = self._sync_collection_indices(collection_name, indices, drop_undeclared, dry_run, background)
+
+        self.log_slow_queries()
+        return report
+
+
+    def _sync_collection_indices(self, 
+            collection_name:str, 
+            indices:list[MongoDB_Index], 
+            drop_undeclared:bool=False, 
+            dry_run:bool=False, 
+            background:bool=False
+        ) -> dict[str, list[str]]:
+        ''' Synchronize the stored indices for a single collection '''
+
+        logger = DatabaseLogger(database=self.database_name, collection=collection_name)
+        collection = self._get_collection(collection_name)
+        try:
+            existing = {self._get_index_key_spec(index): index["name"] for index in collection.list_indexes()}
+
+            declared, missing = set(), []
+            for index in indices:
+                if index.key_spec in declared:
+                    continue
+                declared.add(index.key_spec)
+                if index.key_spec not in existing:
+                    missing.append(index)
+
+            undeclared = [name for key_spec, name in existing.items() if key_spec not in declared and name != '_id_']
+            report = {
+                "create": [str(index.keys) for index in missing],
+                "drop": undeclared if drop_undeclared else [],
+                "exist": [name for key_spec, name in existing.items() if key_spec in declared]
+            }
+
+            if dry_run:
+                logger.warn(f"* Index sync dry run: {report} *")
+                return report
+
+            if missing:
+                collection.create_indexes([index.to_index_model(background) for index in missing])
+                for index in missing:
+                    logger.info(f"* Created {index.index_type} index on field [{index.field_name}] *")
+
+            for name in report["drop"]:
+                collection.drop_index(name)
+                logger.warn(f"* Dropped undeclared index [{name}] *")
+
+            if report["exist"]:
+                logger.debug(f"Indices already exist: {report['exist']}")
+
+            return report
+
+        except OperationFailure as e:
+            self._log_and_throw_database_error(DatabaseError(
+                f"Failed to synchronize indices", e.code, data={
+                    "collection_name": collection_name, 
+                    "indices": [str(index.keys) for index in indices],
+                    "details": e.details
+                }
+            ))
+        
+        except Exception as e:
+            self._log_and_throw_database_error(DatabaseError(
+                f"Error synchronizing indices: {e}", 
+                data={
+                    "collection_name": collection_name, 
+                    "indices": [str(index.keys) for index in indices]
+                }
+            ))
+
+        return {}
+
+
+    @staticmethod
+    def _get_index_key_spec(index_info:dict) -> tuple:
+        ''' Get a hashable key pattern from index information returned by MongoDB '''
+
+        keys = index_info["key"]
+        # Text indices store their fields as weights
+        if "_fts" in keys:
+            return (TEXT, tuple(sorted(index_info.get("weights", {}).keys())))
+
+        return tuple((field, int(order) if isinstance(order, (int, float)) else order) for field, order in keys.items())
+
+
+    def create_fixtures(self, fixtures:Optional[MongoDB_Fixtures]=None, force:bool=False) -> int:
+        ''' Create pre-defined database records in the MongoDB database. Skips
+            collections whose fixtures haven't changed unless `force` is True.
+            Returns the number of fixtures written
+        '''
         
         fixtures = fixtures or self.fixtures
-        for fixture in fixtures.get_fixtures():
-            collection = self._get_collection(fixture.collection_name)
-            self.create_fixture(fixture, collection)
+        created = 0
+        for collection_name in fixtures.get_collection_names():
+            created += self.create_collection_fixtures(collection_name, fixtures, force)
+
+        self.log_slow_queries()
+        return created
+
+
+    def create_collection_fixtures(self, collection_name:str, fixtures:MongoDB_Fixtures, force:bool=False) -> int:
+        ''' Create the pre-defined database records for a collection with unordered 
+            bulk writes if they have changed since they were last applied. 
+            Returns the number of fixtures written
+        '''
+
+        logger = DatabaseLogger(database=self.database_name, collection=collection_name)
+        checksums = self._get_collection(self.FIXTURE_CHECKSUMS_COLLECTION)
+        checksum = fixtures.get_checksum(collection_name)
+        if not force and checksums.find_one({"_id": collection_name, "checksum": checksum}, {"_id": 1}):
+            logger.info(f"* Fixtures are unchanged, skipping *")
+            return 0
+
+        collection = self._get_collection(collection_name)
+        created = 0
+        for batch in self._get_fixture_batches(fixtures.iter_fixtures(collection_name)):
+            created += self._write_fixture_batch(batch, collection)
+
+        checksums.update_one(
+            {"_id": collection_name}, 
+            {"$set": {"checksum": checksum, "updated_at": datetime.utcnow()}}, 
+            upsert=True
+        )
+        logger.info(f"* Created [{created}] fixture{'s' if created != 1 else ''} *")
+
+        return created
+
+
+    def _get_fixture_batches(self, fixtures:Iterable[MongoDB_Fixture]) -> Iterator[list[MongoDB_Fixture]]:
+        ''' Group fixtures into batches of the configured bulk write size '''
+
+        batch_size = max(self.settings.bulk_write_batch_size or 0, 1)
+        batch = []
+        for fixture in fixtures:
+            batch.append(fixture)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+
+    def _write_fixture_batch(self, batch:list[MongoDB_Fixture], collection:Collection) -> int:
+        ''' Upsert a batch of fixtures with one unordered bulk write '''
+
+        logger = DatabaseLogger(database=self.database_name, collection=collection.name)
+        try:
+            collection.bulk_write([
+                UpdateOne({"_id": fixture.data["_id"]}, {"$set": fixture.data}, upsert=True)
+                for fixture in batch
+            ], ordered=False)
+            logger.debug(f"Fixture IDs: {[str(fixture.data['_id']) for fixture in batch]}")
+
+            return len(batch)
+        
+        except BulkWriteError as e:
+            self._log_and_throw_database_error(DatabaseError(
+                f"Failed to create fixtures", 
+                data={
+                    "collection_name": collection.name, 
+                    "errors": [
+                        {"_id": str(batch[error["index"]].data["_id"]), "code": error.get("code"), "message": error.get("errmsg")}
+                        for error in e.details.get("writeErrors", [])
+                    ],
+                    "write_concern_errors": [error.get("errmsg") for error in e.details.get("writeConcernErrors", [])]
+                }
+            ))
+        
+        except Exception as e:
+            self._log_and_throw_database_error(DatabaseError(
+                f"Error creating fixtures: {e}",
+                data={"collection_name": collection.name}
+            ))
+
+        return 0
 
 
     def create_fixture(self, fixture:MongoDB_Fixture, collection:Collection):
@@ -295,8 +552,16 @@ class MongoDB_Database:
             ))
 
     @classmethod
-    def get_client_from_flask(cls) -> Optional[MongoClient]:
-        ''' Get the MongoDB client for the current Flask app '''
+    def get_client_provider_from_flask(cls) -> Optional[MongoDB_Client_Provider]:
+        ''' Get the MongoDB client provider for the current Flask app '''
 
         if has_app_context():
-            return current_app.config.get('APP_DB_CLIENT')
+            return current_app.config.get(MongoDB_Client_Provider.FLASK_PROVIDER_KEY)
+
+
+    @classmethod
+    def get_client_from_flask(cls) -> Optional[MongoClient]:
+        ''' Get the MongoDB client for the current Flask app and process if it has been created '''
+
+        if client_provider:=cls.get_client_provider_from_flask():
+            return client_provider.get_current_client()
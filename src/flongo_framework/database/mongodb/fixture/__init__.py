@@ -1,2 +1,3 @@
 from .base import MongoDB_Fixture
 from .fixtures import MongoDB_Fixtures
+from .file import MongoDB_Fixture_File
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+import traceback
+from typing import Iterator, Optional
+
+from bson import decode_file_iter, json_util
+
+from ....database.errors.database_error import DatabaseError
+from ....database.mongodb.fixture.base import MongoDB_Fixture
+
+class MongoDB_Fixture_File:
+    ''' Stores MongoDB fixtures in a file so they don't have to
+        be defined as Python literals. Supports:
+
+        - JSON: A MongoDB Extended JSON array of fixtures (`.json`)
+        - NDJSON: A MongoDB Extended JSON fixture on each line (`.ndjson` or `.jsonl`)
+        - BSON: Concatenated BSON documents like `mongodump` output (`.bson`)
+
+        NDJSON and BSON files are streamed one fixture at a time
+    '''
+
+    JSON = 'json'
+    NDJSON = 'ndjson'
+    BSON = 'bson'
+
+    EXTENSIONS = {
+        '.json': JSON,
+        '.ndjson': NDJSON,
+        '.jsonl': NDJSON,
+        '.bson': BSON
+    }
+
+    def __init__(self, collection_name:str, path:str, file_format:Optional[str]=None):
+
+        self.collection_name = collection_name
+        self.path = path
+        self.file_format = self._validate_file_format(file_format)
+
+
+    def _validate_file_format(self, file_format:Optional[str]) -> str:
+        ''' Validate the fixture file exists and has a supported format '''
+
+        if not os.path.isfile(self.path):
+            raise DatabaseError(
+                f'Error in fixture definitions for collection [{self.collection_name}]. The fixture file [{self.path}] does not exist',
+                stack_trace=traceback.format_exc()
+            )
+
+        file_format = file_format or self.EXTENSIONS.get(os.path.splitext(self.path)[1].lower())
+        if file_format not in self.EXTENSIONS.values():
+            raise DatabaseError(
+                f'Error in fixture definitions for collection [{self.collection_name}]. The fixture file [{self.path}] must be one of the following formats: {sorted(set(self.EXTENSIONS.values()))}',
+                stack_trace=traceback.format_exc()
+            )
+
+        return file_format
+
+
+    @property
+    def checksum(self) -> str:
+        ''' Get a hash of the contents of the fixture file '''
+
+        file_hash = hashlib.sha256()
+        with open(self.path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                file_hash.update(block)
+
+        return file_hash.hexdigest()
+
+
+    def __iter__(self) -> Iterator[MongoDB_Fixture]:
+        ''' Read the fixtures stored in the file '''
+
+        if self.file_format == self.BSON:
+            with open(self.path, 'rb') as f:
+                for data in decode_file_iter(f):
+                    yield MongoDB_Fixture(self.collection_name, data)
+
+        elif self.file_format == self.NDJSON:
+            with open(self.path, 'r') as f:
+                for line in f:
+                    if line.strip():
+                        yield MongoDB_Fixture(self.collection_name, json_util.loads(line))
+
+        else:
+            with open(self.path, 'r') as f:
+                for data in json.load(f, object_hook=json_util.object_hook):
+                    yield MongoDB_Fixture(self.collection_name, data)
@@ -1,15 +1,29 @@
+import hashlib
 import traceback
+from typing import Iterator, Union
+
+import bson
 
 from ....database.errors.database_error import DatabaseError
 from ....database.mongodb.fixture.base import MongoDB_Fixture
+from ....database.mongodb.fixture.file import MongoDB_Fixture_File
 
 class MongoDB_Fixtures:
-    ''' Class to facilitate applying database fixtures '''
+    ''' Class to facilitate applying database fixtures
+
+        Fixtures can be defined directly or read from fixture files:
+        ```
+        MongoDB_Fixtures(
+            MongoDB_Fixture("collection", {"_id": ObjectId(), "name": "Peter"}),
+            MongoDB_Fixture_File("collection", "fixtures/collection.ndjson")
+        )
+        ```
+    '''
 
-    def __init__(self, *fixtures:MongoDB_Fixture) -> None:
+    def __init__(self, *fixtures:Union[MongoDB_Fixture, MongoDB_Fixture_File]) -> None:
         self._fixtures = self._validate_fixtures(list(fixtures))
-        
-    def _validate_fixtures(self, fixtures:list[MongoDB_Fixture]) -> list[MongoDB_Fixture]:
+
+    def _validate_fixtures(self, fixtures:list[Union[MongoDB_Fixture, MongoDB_Fixture_File]]) -> list[Union[MongoDB_Fixture, MongoDB_Fixture_File]]:
         ''' Validate fixture structure and return fixtures'''
 
         if fixtures and not isinstance(fixtures, list):
@@ -20,20 +34,59 @@ class MongoDB_Fixtures:
 
         if fixtures:
             for fixture in fixtures:
-                if not isinstance(fixture, MongoDB_Fixture):
+                if not isinstance(fixture, (MongoDB_Fixture, MongoDB_Fixture_File)):
                     raise DatabaseError(
-                        f'Error in fixture definitions! The defined fixtures must be a list of MongoDB_Fixture objects to insert in the database. Found a {type(fixture)}',
+                        f'Error in fixture definitions! The defined fixtures must be a list of MongoDB_Fixture or MongoDB_Fixture_File objects to insert in the database. Found a {type(fixture)}',
                         stack_trace=traceback.format_exc()
                     )
-            
+
             return fixtures
-        
+
         return []
 
 
     def get_fixtures(self) -> list[MongoDB_Fixture]:
-        return self._fixtures
-    
+        ''' Get the fixtures defined directly. Does not read fixture files '''
+
+        return [fixture for fixture in self._fixtures if isinstance(fixture, MongoDB_Fixture)]
+
+
+    def get_collection_names(self) -> list[str]:
+        ''' Get the names of all collections with fixtures '''
+
+        return list(dict.fromkeys(fixture.collection_name for fixture in self._fixtures))
+
+
+    def iter_fixtures(self, collection_name:str) -> Iterator[MongoDB_Fixture]:
+        ''' Iterate over all fixtures for a collection, reading fixture files as they are reached '''
+
+        for fixture in self._fixtures:
+            if fixture.collection_name != collection_name:
+                continue
+
+            if isinstance(fixture, MongoDB_Fixture_File):
+                yield from fixture
+            else:
+                yield fixture
+
+
+    def get_checksum(self, collection_name:str) -> str:
+        ''' Get a hash of the fixtures defined for a collection. Fixture files are
+            hashed by their contents without being parsed
+        '''
+
+        fixtures_hash = hashlib.sha256()
+        for fixture in self._fixtures:
+            if fixture.collection_name != collection_name:
+                continue
+
+            if isinstance(fixture, MongoDB_Fixture_File):
+                fixtures_hash.update(fixture.checksum.encode())
+            else:
+                fixtures_hash.update(bson.encode(fixture.data))
+
+        return fixtures_hash.hexdigest()
+
 
     def __len__(self):
         return len(self._fixtures)
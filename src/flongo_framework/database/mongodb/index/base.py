@@ -1,4 +1,5 @@
-from typing import Optional
+from typing import Any, Optional
+from pymongo import TEXT, IndexModel
 from ....config.enums.mongodb_index_types import MONGODB_INDEX_TYPES
 
 class MongoDB_Index:
@@ -30,3 +31,35 @@ class MongoDB_Index:
             return MONGODB_INDEX_TYPES.COMPOUND
         else:
             return MONGODB_INDEX_TYPES.STANDARD
+
+
+    @property
+    def keys(self) -> list[tuple[str, Any]]:
+        ''' Get the key pattern of the index, including every field of a compound index '''
+
+        if self.is_text:
+            return [(self.field_name, TEXT)]
+
+        keys, index = [], self
+        while index:
+            keys.append((index.field_name, index.order))
+            index = index.compound_index
+
+        return keys
+
+
+    @property
+    def key_spec(self) -> tuple:
+        ''' Get a hashable key pattern used to compare this index to existing indices '''
+
+        if self.is_text:
+            return (TEXT, (self.field_name,))
+
+        return tuple(self.keys)
+
+
+    def to_index_model(self, background:bool=False) -> IndexModel:
+        ''' Get a pymongo IndexModel that creates this index '''
+
+        properties = {} if self.is_text else self.properties
+        return IndexModel(self.keys, **properties, background=background)
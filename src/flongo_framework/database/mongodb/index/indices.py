@@ -15,6 +15,16 @@ class MongoDB_Indices:
         self._indices.append(index)
 
 
+    def get_indices_by_collection(self) -> dict[str, list[MongoDB_Index]]:
+        ''' Get the stored indices grouped by collection name '''
+
+        indices:dict[str, list[MongoDB_Index]] = {}
+        for index in self._indices:
+            indices.setdefault(index.collection_name, []).append(index)
+
+        return indices
+
+
     def __iter__(self):
         # Return the iterator object (in this case, self)
         return self
@@ -0,0 +1,3 @@
+from .heartbeat_listener import MongoDB_Heartbeat_Listener
+from .slow_query_listener import MongoDB_Slow_Query, MongoDB_Slow_Query_Listener
+from .index_advisor import MongoDB_Index_Advisor
@@ -0,0 +1,60 @@
+from typing import Optional
+from pymongo import MongoClient, monitoring
+
+from ....utils.logging.loggers.database import DatabaseLogger
+
+class MongoDB_Heartbeat_Listener(monitoring.ServerHeartbeatListener):
+    ''' Tracks MongoDB connection health using pymongo's own
+        background server monitoring
+
+        The MongoClient sends a heartbeat to every server it knows about
+        on its own monitor threads, so the health of the connection can be 
+        checked without a round trip to the server for each request
+    '''
+
+    def __init__(self) -> None:
+        # Result of the most recent heartbeat for each server address
+        self._servers:dict[tuple, bool] = {}
+
+
+    @property
+    def is_healthy(self) -> bool:
+        ''' Returns False if the most recent heartbeat to every known server failed.
+            Returns True if no heartbeat has completed yet
+        '''
+
+        servers = dict(self._servers)
+        return not servers or any(servers.values())
+
+
+    def get_failed_servers(self) -> list[str]:
+        ''' Returns the addresses of servers whose most recent heartbeat failed '''
+
+        return [f"{host}:{port}" for (host, port), healthy in dict(self._servers).items() if not healthy]
+
+
+    def started(self, event:monitoring.ServerHeartbeatStartedEvent):
+        pass
+
+
+    def succeeded(self, event:monitoring.ServerHeartbeatSucceededEvent):
+        if self._servers.get(event.connection_id) == False:
+            DatabaseLogger().warn(f"* MongoDB server [{event.connection_id[0]}:{event.connection_id[1]}] is reachable again *")
+
+        self._servers[event.connection_id] = True
+
+
+    def failed(self, event:monitoring.ServerHeartbeatFailedEvent):
+        if self._servers.get(event.connection_id) != False:
+            DatabaseLogger().error(f"* MongoDB server [{event.connection_id[0]}:{event.connection_id[1]}] heartbeat failed: {event.reply} *")
+
+        self._servers[event.connection_id] = False
+
+
+    @classmethod
+    def get_listener(cls, client:MongoClient) -> Optional["MongoDB_Heartbeat_Listener"]:
+        ''' Get the heartbeat listener registered to a MongoClient if there is one '''
+
+        for listener in client.options.event_listeners:
+            if isinstance(listener, cls):
+                return listener
@@ -0,0 +1,245 @@
+from threading import Lock
+from typing import Any, Optional
+
+from pymongo import ASCENDING, MongoClient, monitoring
+
+from ....database.mongodb.index.base import MongoDB_Index
+from ....database.mongodb.index.indices import MongoDB_Indices
+from ....database.mongodb.monitoring.slow_query_listener import MongoDB_Slow_Query_Listener
+
+class MongoDB_Index_Advisor(monitoring.CommandListener):
+    ''' Learns the query shapes used by an application and finds the
+        ones that aren't covered by an index
+
+        The fields each query filters on by equality or by range and the
+        fields it sorts by are recorded for each collection along with how
+        often the shape ran and how long it took. Shapes are compared with
+        the existing indices of a collection by matching the shape to a prefix
+        of each index, following the Equality, Sort, Range rule:
+        ```
+        advisor.get_report({"users": [[("_id", 1)], [("email", 1)]]})
+        ```
+    '''
+
+    # Commands that filter or sort a collection
+    RECORDED_COMMANDS = ['find', 'aggregate', 'count', 'distinct', 'update', 'delete', 'findAndModify']
+    # Query operators that match a single value of the index
+    EQUALITY_OPERATORS = ['$eq', '$in']
+    # Maximum number of shapes recorded. New shapes are ignored once it is reached
+    MAX_SHAPES = 1000
+
+    FULL_COVERAGE = 'full'
+    PARTIAL_COVERAGE = 'partial'
+    NO_COVERAGE = 'none'
+
+    def __init__(self) -> None:
+        self._started:dict[int, tuple] = {}
+        # Statistics for each (database, collection, equality fields, range fields, sort) shape
+        self._shapes:dict[tuple, dict[str, float]] = {}
+        self._lock = Lock()
+
+
+    def started(self, event:monitoring.CommandStartedEvent):
+        if event.command_name not in self.RECORDED_COMMANDS:
+            return
+
+        collection_name = event.command.get(event.command_name)
+        if not isinstance(collection_name, str):
+            return
+
+        query_filter = MongoDB_Slow_Query_Listener.get_filter(event.command_name, event.command) or {}
+        equality, range_fields = self.get_filter_fields(query_filter)
+        sort = self.get_sort(event.command_name, event.command)
+        self._started[event.request_id] = (
+            event.database_name,
+            collection_name,
+            tuple(sorted(equality)),
+            tuple(sorted(range_fields - equality)),
+            sort
+        )
+
+
+    def succeeded(self, event:monitoring.CommandSucceededEvent):
+        self._record(event)
+
+
+    def failed(self, event:monitoring.CommandFailedEvent):
+        self._record(event)
+
+
+    def _record(self, event:Any):
+        if (shape:=self._started.pop(event.request_id, None)) is None:
+            return
+
+        duration_ms = event.duration_micros / 1000
+        with self._lock:
+            if (stats:=self._shapes.get(shape)) is None:
+                if len(self._shapes) >= self.MAX_SHAPES:
+                    return
+                stats = self._shapes[shape] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+
+            stats['count'] += 1
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+
+
+    @classmethod
+    def get_filter_fields(cls, query_filter:dict) -> tuple[set[str], set[str]]:
+        ''' Get the fields a filter matches by equality and by range '''
+
+        equality, range_fields = set(), set()
+        for field, value in (query_filter or {}).items():
+            if field == '$and' and isinstance(value, list):
+                for condition in value:
+                    condition_equality, condition_range = cls.get_filter_fields(condition)
+                    equality |= condition_equality
+                    range_fields |= condition_range
+            elif field in ['$or', '$nor'] and isinstance(value, list):
+                # Each branch of an $or is planned separately, so its fields can only narrow a range
+                for condition in value:
+                    range_fields |= set().union(*cls.get_filter_fields(condition))
+            elif field.startswith('$'):
+                continue
+            elif isinstance(value, dict) and any(str(operator).startswith('$') for operator in value):
+                if all(operator in cls.EQUALITY_OPERATORS for operator in value):
+                    equality.add(field)
+                else:
+                    range_fields.add(field)
+            else:
+                equality.add(field)
+
+        return equality, range_fields
+
+
+    @staticmethod
+    def get_sort(command_name:str, command:dict) -> tuple[tuple[str, int], ...]:
+        ''' Get the sort of a command. A trailing `_id` tie breaker is ignored '''
+
+        sort = command.get('sort') if command_name in ['find', 'findAndModify'] else None
+        if command_name == 'aggregate':
+            for stage in command.get('pipeline', []):
+                if '$sort' in stage:
+                    sort = stage['$sort']
+                    break
+                if not any(operator in stage for operator in ['$match', '$sort']):
+                    break
+
+        sort = [(field, order) for field, order in (sort or {}).items() if isinstance(order, int)]
+        if len(sort) > 1 and sort[-1][0] == '_id':
+            sort = sort[:-1]
+
+        return tuple(sort)
+
+
+    @classmethod
+    def get_coverage(cls, shape:tuple, indices:list[list[tuple[str, Any]]]) -> str:
+        ''' Get how well the best of the existing indices covers a query shape '''
+
+        _, _, equality, range_fields, sort = shape
+        if not (equality or range_fields or sort):
+            return cls.FULL_COVERAGE
+
+        queried_fields = set(equality) | set(range_fields) | {field for field, _ in sort}
+        coverage = cls.NO_COVERAGE
+        for index in indices:
+            fields = [field for field, _ in index]
+            if set(fields[:len(equality)]) == set(equality):
+                rest = fields[len(equality):]
+                if sort:
+                    if rest[:len(sort)] == [field for field, _ in sort]:
+                        return cls.FULL_COVERAGE
+                elif not range_fields or (rest and rest[0] in range_fields):
+                    return cls.FULL_COVERAGE
+
+            if fields and fields[0] in queried_fields:
+                coverage = cls.PARTIAL_COVERAGE
+
+        return coverage
+
+
+    @staticmethod
+    def get_suggested_keys(shape:tuple) -> list[tuple[str, int]]:
+        ''' Get the keys of an index for a query shape: equality fields, then sort fields, then a range field '''
+
+        _, _, equality, range_fields, sort = shape
+        keys = [(field, ASCENDING) for field in equality]
+        keys += [(field, order) for field, order in sort if field not in equality]
+        if range_fields and not sort:
+            keys.append((range_fields[0], ASCENDING))
+
+        return keys
+
+
+    def get_collection_names(self, database_name:str) -> list[str]:
+        ''' Get the names of the collections with recorded shapes in a database '''
+
+        with self._lock:
+            return list(dict.fromkeys(shape[1] for shape in self._shapes if shape[0] == database_name))
+
+
+    def get_report(self,
+            indices:dict[str, list[list[tuple[str, Any]]]],
+            database_name:Optional[str]=None,
+            limit:int=10,
+            include_partial:bool=True
+        ) -> list[dict]:
+        ''' Get the recorded query shapes that aren't fully covered by the existing
+            `indices` of each collection, costliest (count x latency) first
+        '''
+
+        with self._lock:
+            shapes = list(self._shapes.items())
+
+        report = []
+        for shape, stats in shapes:
+            if database_name and shape[0] != database_name:
+                continue
+
+            coverage = self.get_coverage(shape, indices.get(shape[1], [[('_id', ASCENDING)]]))
+            if coverage == self.FULL_COVERAGE or (coverage == self.PARTIAL_COVERAGE and not include_partial):
+                continue
+
+            report.append({
+                'database': shape[0],
+                'collection': shape[1],
+                'equality': list(shape[2]),
+                'range': list(shape[3]),
+                'sort': [list(field) for field in shape[4]],
+                'coverage': coverage,
+                'count': int(stats['count']),
+                'avg_ms': round(stats['total_ms'] / stats['count'], 3),
+                'max_ms': round(stats['max_ms'], 3),
+                'total_ms': round(stats['total_ms'], 3),
+                'suggested_index': [list(key) for key in self.get_suggested_keys(shape)]
+            })
+
+        report.sort(key=lambda entry: entry['total_ms'], reverse=True)
+        return report[:limit] if limit else report
+
+
+    @staticmethod
+    def get_suggested_indices(report:list[dict]) -> MongoDB_Indices:
+        ''' Get `MongoDB_Index` definitions for the shapes in a report with no index coverage '''
+
+        indices, suggested = MongoDB_Indices(), set()
+        for entry in report:
+            keys = tuple(tuple(key) for key in entry['suggested_index'])
+            if entry['coverage'] != MongoDB_Index_Advisor.NO_COVERAGE or not keys or (entry['collection'], keys) in suggested:
+                continue
+
+            suggested.add((entry['collection'], keys))
+            index = None
+            for field, order in reversed(keys):
+                index = MongoDB_Index(entry['collection'], field, order, compound_index=index)
+            indices.add_index(index)
+
+        return indices
+
+
+    @classmethod
+    def get_listener(cls, client:MongoClient) -> Optional["MongoDB_Index_Advisor"]:
+        ''' Get the index advisor registered to a MongoClient if there is one '''
+
+        for listener in client.options.event_listeners:
+            if isinstance(listener, cls):
+                return listener
@@ -0,0 +1,280 @@
+import os
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import pymongo
+from flask import g, has_request_context, request
+from pymongo import MongoClient, monitoring
+
+from ....utils.logging.loggers.database import DatabaseLogger
+
+@dataclass
+class MongoDB_Slow_Query:
+    ''' A MongoDB command that took longer than the slow query threshold '''
+
+    database_name: str
+    command_name: str
+    command: dict
+    duration_ms: float
+    url: Optional[str] = None
+    method: Optional[str] = None
+    request_id: Optional[str] = None
+
+
+class MongoDB_Slow_Query_Listener(monitoring.CommandListener):
+    ''' Records MongoDB commands that take longer than `threshold_ms`
+
+        Commands are recorded on the thread that ran them along with the
+        route, method and id of the request being handled. Recorded commands
+        are logged with `log_slow_queries()` once the operation is done. If
+        `explain` is True, they are logged with an `explain("executionStats")` 
+        summary of the query plan instead. Explains run on a background thread
+        with a time limit, so requests never wait for them, and are skipped
+        while too many are waiting. Commands are never explained from inside the listener
+    '''
+
+    # Commands that are never recorded
+    IGNORED_COMMANDS = ['hello', 'ismaster', 'isMaster', 'ping', 'buildinfo', 'buildInfo', 'explain', 'endSessions']
+    # Commands that can be explained
+    EXPLAINABLE_COMMANDS = ['find', 'aggregate', 'count', 'distinct', 'update', 'delete', 'findAndModify']
+    # Fields of a command that can't be passed to an explained command
+    UNEXPLAINABLE_FIELDS = ['lsid', 'txnNumber', 'readConcern', 'writeConcern', 'startTransaction', 'autocommit']
+    # Maximum number of slow queries kept per thread until they are logged
+    MAX_RECORDED = 100
+    # Maximum number of slow queries waiting to be explained and the time each explain can run for
+    MAX_QUEUED_EXPLAINS = 100
+    EXPLAIN_TIMEOUT_MS = 1000
+
+    def __init__(self, threshold_ms:int, explain:bool=True) -> None:
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self._local = threading.local()
+        self._explains:queue.Queue = queue.Queue(maxsize=self.MAX_QUEUED_EXPLAINS)
+        self._explain_thread:Optional[threading.Thread] = None
+        self._explain_lock = threading.Lock()
+        self._pid = os.getpid()
+
+
+    @property
+    def _started(self) -> dict[int, tuple]:
+        if not hasattr(self._local, 'started'):
+            self._local.started = {}
+
+        return self._local.started
+
+
+    @property
+    def _recorded(self) -> list[MongoDB_Slow_Query]:
+        if not hasattr(self._local, 'recorded'):
+            self._local.recorded = []
+
+        return self._local.recorded
+
+
+    def started(self, event:monitoring.CommandStartedEvent):
+        if event.command_name in self.IGNORED_COMMANDS or getattr(self._local, 'explaining', False):
+            return
+
+        url = method = request_id = None
+        if has_request_context():
+            url = request.url_rule.rule if request.url_rule else request.path
+            method = request.method
+            request_id = g.get('request_id')
+
+        self._started[event.request_id] = (event.command, url, method, request_id)
+
+
+    def succeeded(self, event:monitoring.CommandSucceededEvent):
+        self._record(event)
+
+
+    def failed(self, event:monitoring.CommandFailedEvent):
+        self._record(event)
+
+
+    def _record(self, event:Any):
+        if (started:=self._started.pop(event.request_id, None)) is None:
+            return
+
+        duration_ms = event.duration_micros / 1000
+        if duration_ms >= self.threshold_ms:
+            command, url, method, request_id = started
+            recorded = self._recorded
+            recorded.append(MongoDB_Slow_Query(event.database_name, event.command_name, command, duration_ms, url, method, request_id))
+            del recorded[:-self.MAX_RECORDED]
+
+
+    def flush(self, client:MongoClient):
+        ''' Log and forget the slow queries recorded on the current thread '''
+
+        recorded, self._local.recorded = self._recorded, []
+        for slow_query in recorded:
+            command = slow_query.command
+            collection_name = command.get(slow_query.command_name)
+            message = f"* SLOW QUERY [{slow_query.command_name}] took [{slow_query.duration_ms:.1f}ms]"
+            if slow_query.url:
+                message += f" on route [{slow_query.method} {slow_query.url}]"
+            if slow_query.request_id:
+                message += f" for request [{slow_query.request_id}]"
+            if (query_filter:=self.get_filter(slow_query.command_name, command)) is not None:
+                message += f". Filter: {self.get_filter_shape(query_filter)}"
+
+            logger = DatabaseLogger(slow_query.database_name, collection_name if isinstance(collection_name, str) else '')
+            if self.explain and slow_query.command_name in self.EXPLAINABLE_COMMANDS and self._queue_explain(client, slow_query, logger, message):
+                continue
+
+            logger.warn(message + " *")
+
+
+    def _queue_explain(self, client:MongoClient, slow_query:MongoDB_Slow_Query, logger:DatabaseLogger, message:str) -> bool:
+        ''' Queue a slow query to be explained and logged in the background.
+            Returns False if too many slow queries are waiting to be explained
+        '''
+
+        self._start_explain_thread()
+        try:
+            self._explains.put_nowait((client, slow_query, logger, message))
+            return True
+        except queue.Full:
+            return False
+
+
+    def _start_explain_thread(self):
+        ''' Start the thread that explains slow queries. Forked processes start their own '''
+
+        if self._pid != os.getpid():
+            with self._explain_lock:
+                if self._pid != os.getpid():
+                    self._explains = queue.Queue(maxsize=self.MAX_QUEUED_EXPLAINS)
+                    self._explain_thread = None
+                    self._pid = os.getpid()
+
+        if self._explain_thread is None or not self._explain_thread.is_alive():
+            with self._explain_lock:
+                if self._explain_thread is None or not self._explain_thread.is_alive():
+                    self._explain_thread = threading.Thread(target=self._run_explains, name='slow-query-explain', daemon=True)
+                    self._explain_thread.start()
+
+
+    def _run_explains(self):
+        ''' Explain and log queued slow queries until the process exits '''
+
+        explains = self._explains
+        while True:
+            client, slow_query, logger, message = explains.get()
+            try:
+                logger.warn(message + f". Explain: {self._explain(client, slow_query)} *")
+            except Exception as e:
+                logger.error(f"* Failed to log SLOW QUERY explain: {e} *")
+
+
+    def _explain(self, client:MongoClient, slow_query:MongoDB_Slow_Query) -> dict:
+        ''' Explain a slow query and summarize its plan and execution stats '''
+
+        command = {
+            field: value for field, value in slow_query.command.items()
+            if not field.startswith('$') and field not in self.UNEXPLAINABLE_FIELDS
+        }
+
+        self._local.explaining = True
+        try:
+            # The explain runs the query again, so it can't run for long
+            with pymongo.timeout(self.EXPLAIN_TIMEOUT_MS / 1000):
+                explained = client[slow_query.database_name].command({'explain': command, 'verbosity': 'executionStats'})
+        except Exception as e:
+            return {'error': str(e)}
+        finally:
+            self._local.explaining = False
+
+        stats = self._find_field(explained, 'executionStats') or {}
+        return {
+            'plan': self._get_plan(self._find_field(explained, 'winningPlan')),
+            'docs_examined': stats.get('totalDocsExamined'),
+            'keys_examined': stats.get('totalKeysExamined'),
+            'returned': stats.get('nReturned'),
+            'execution_time_ms': stats.get('executionTimeMillis')
+        }
+
+
+    @classmethod
+    def _get_plan(cls, plan:Optional[dict]) -> str:
+        ''' Summarize a query plan as its stages like `FETCH <- IXSCAN(name_1)` '''
+
+        stages = []
+        while isinstance(plan, dict):
+            if 'stage' not in plan and 'queryPlan' in plan:
+                plan = plan['queryPlan']
+                continue
+
+            stage = str(plan.get('stage'))
+            if index_name:=plan.get('indexName'):
+                stage += f"({index_name})"
+            stages.append(stage)
+            plan = plan.get('inputStage') or (plan.get('inputStages') or [None])[0]
+
+        return ' <- '.join(stages)
+
+
+    @classmethod
+    def _find_field(cls, document:Any, field:str) -> Any:
+        ''' Find the first value of a field nested anywhere in a document '''
+
+        if isinstance(document, dict):
+            if field in document:
+                return document[field]
+            values = document.values()
+        elif isinstance(document, list):
+            values = document
+        else:
+            return None
+
+        for value in values:
+            if (found:=cls._find_field(value, field)) is not None:
+                return found
+
+
+    @staticmethod
+    def get_filter(command_name:str, command:dict) -> Optional[dict]:
+        ''' Get the filter of a command if it has one '''
+
+        if command_name == 'find':
+            return command.get('filter', {})
+        if command_name in ['count', 'distinct', 'findAndModify']:
+            return command.get('query', {})
+        if command_name == 'update' and command.get('updates'):
+            return command['updates'][0].get('q')
+        if command_name == 'delete' and command.get('deletes'):
+            return command['deletes'][0].get('q')
+        if command_name == 'aggregate' and command.get('pipeline'):
+            return command['pipeline'][0].get('$match')
+
+
+    @classmethod
+    def get_filter_shape(cls, value:Any) -> Any:
+        ''' Replace the values in a filter with their types so it can be logged '''
+
+        if isinstance(value, dict):
+            return {key: cls.get_filter_shape(field_value) for key, field_value in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [cls.get_filter_shape(item) for item in value]
+
+        return type(value).__name__
+
+
+    @classmethod
+    def get_listener(cls, client:MongoClient) -> Optional["MongoDB_Slow_Query_Listener"]:
+        ''' Get the slow query listener registered to a MongoClient if there is one '''
+
+        for listener in client.options.event_listeners:
+            if isinstance(listener, cls):
+                return listener
+
+
+    @classmethod
+    def log_slow_queries(cls, client:MongoClient):
+        ''' Log the slow queries recorded on the current thread for a MongoClient '''
+
+        if listener:=cls.get_listener(client):
+            listener.flush(client)
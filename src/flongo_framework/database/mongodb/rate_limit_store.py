@@ -0,0 +1,90 @@
+import time
+from contextlib import nullcontext
+from typing import Optional
+
+import pymongo
+from pymongo import ReturnDocument
+from pymongo.collection import Collection
+from pymongo.errors import PyMongoError
+
+from ...database.errors.database_error import DatabaseError
+from ...database.mongodb.collection_registry import MongoDB_Collection_Registry
+from ...database.mongodb.database import MongoDB_Database
+from ...utils.logging.loggers.database import DatabaseLogger
+from ...utils.rate_limit import Rate_Limit_Result, Rate_Limit_Store
+
+class MongoDB_Rate_Limit_Store(Rate_Limit_Store):
+    ''' Rate limit store backed by a MongoDB collection so buckets are
+        shared between all workers on all hosts
+
+        Each request takes its tokens with a single atomic `find_one_and_update`
+        timed by the server clock. Buckets that are full again are removed
+        by a TTL index. If MongoDB can't be reached within `timeout_ms` or
+        the circuit breaker of the app is open, requests are allowed 
+        unless `fail_open` is False
+        ```
+        Route_Rate_Limit(limit=100, period_secs=60, store=MongoDB_Rate_Limit_Store())
+        ```
+    '''
+
+    def __init__(self, collection_name:str='_rate_limits', database_name:str='', fail_open:bool=True, timeout_ms:int=100) -> None:
+        self.collection_name = collection_name
+        self.database_name = database_name
+        self.fail_open = fail_open
+        # Time a request waits for its tokens before the store is treated as unreachable
+        self.timeout_ms = timeout_ms
+        self._has_ttl_index = False
+
+
+    def _get_collection(self, registry:Optional[MongoDB_Collection_Registry]=None) -> Collection:
+        ''' Get the collection of the buckets, creating its TTL index on first use '''
+
+        if registry:
+            collection = registry.get_collection(self.collection_name, self.database_name)
+        else:
+            collection = MongoDB_Database(database_name=self.database_name)[self.collection_name]
+
+        if not self._has_ttl_index:
+            collection.create_index('full_at', expireAfterSeconds=0)
+            self._has_ttl_index = True
+
+        return collection
+
+
+    def consume(self, key:str, capacity:int, refill_per_sec:float, cost:int=1) -> Rate_Limit_Result:
+        elapsed_secs = {'$divide': [{'$subtract': ['$$NOW', {'$ifNull': ['$updated_at', '$$NOW']}]}, 1000]}
+        registry = MongoDB_Collection_Registry.get_registry_from_flask()
+        # Timing out waiting for tokens doesn't count as a failure to reach the database
+        deadline = time.monotonic() + self.timeout_ms / 1000
+        # Fails fast without waiting for the database while the circuit breaker is open
+        guard = registry.circuit_breaker.guard(deadline) if registry else nullcontext()
+        try:
+            with guard, pymongo.timeout(self.timeout_ms / 1000):
+                bucket:Optional[dict] = self._get_collection(registry).find_one_and_update(
+                    {'_id': key},
+                    [
+                        {'$set': {
+                            'tokens': {'$min': [capacity, {'$add': [
+                                {'$ifNull': ['$tokens', capacity]}, {'$multiply': [elapsed_secs, refill_per_sec]}
+                            ]}]},
+                            'updated_at': '$$NOW'
+                        }},
+                        {'$set': {'allowed': {'$gte': ['$tokens', cost]}}},
+                        {'$set': {'tokens': {'$cond': ['$allowed', {'$min': [capacity, {'$subtract': ['$tokens', cost]}]}, '$tokens']}}},
+                        {'$set': {'full_at': {'$add': [
+                            '$$NOW', {'$multiply': [{'$divide': [{'$subtract': [capacity, '$tokens']}, refill_per_sec]}, 1000]}
+                        ]}}}
+                    ],
+                    projection={'tokens': 1, 'allowed': 1},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+        except (PyMongoError, DatabaseError) as e:
+            if not self.fail_open:
+                raise
+
+            DatabaseLogger(collection=self.collection_name).warn(f"* Allowing request without rate limiting. Error: {e} *")
+            return self.get_result(True, capacity, capacity, refill_per_sec, cost)
+
+        bucket = bucket or {}
+        return self.get_result(bool(bucket.get('allowed', True)), bucket.get('tokens', capacity), capacity, refill_per_sec, cost)
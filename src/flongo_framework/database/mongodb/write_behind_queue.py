@@ -0,0 +1,235 @@
+import atexit
+import os
+import time
+from threading import Condition, Lock, Thread
+from typing import Any, Callable, Optional
+
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from ...utils.logging.loggers.database import DatabaseLogger
+
+class MongoDB_Write_Behind_Queue:
+    ''' Buffers `$set` updates to records by `_id` and writes them to MongoDB
+        in the background as unordered `bulk_write` batches
+
+        Updates to the same record within `window_ms` are merged into a
+        single update (later values win), so bursts of updates to the same
+        fields (like progress or heartbeats) become one write:
+        ```
+        queue = MongoDB_Write_Behind_Queue(window_ms=250, max_size=10000)
+        queue.add(collection, _id, {'progress': 50})
+        ```
+        If `max_size` records are waiting, the queue is flushed by the
+        thread adding the update. Pending updates are flushed when
+        the process exits. Updates that are buffered when the process
+        is killed are lost, so only use it for data that can be lost.
+        Listeners are called with each collection updates were written to
+    '''
+
+    def __init__(self, window_ms:int=250, max_size:int=10000, batch_size:int=1000) -> None:
+        # Time updates are buffered for before they are written
+        self.window_ms = window_ms
+        # Maximum number of records with pending updates
+        self.max_size = max_size
+        # Maximum number of updates in each bulk write
+        self.batch_size = batch_size
+        # Functions called with each collection after buffered updates are written to it
+        self._listeners:list[Callable[[Collection], None]] = []
+
+        self._reset()
+        atexit.register(self.flush)
+        # The background thread doesn't exist in forked processes
+        os.register_at_fork(after_in_child=self._reset)
+
+
+    def _reset(self):
+        # Pending `$set` updates by (collection namespace, _id)
+        self._pending:dict[tuple[str, Any], tuple[Collection, dict]] = {}
+        self._condition = Condition()
+        # Flushes are serialized so updates to a record are written in order
+        self._flush_lock = Lock()
+        self._thread:Optional[Thread] = None
+        self._stopped = False
+        # Number of updates added, merged into a pending update and written to MongoDB
+        self.added_count = 0
+        self.coalesced_count = 0
+        self.written_count = 0
+        self.failed_count = 0
+
+
+    def add(self, collection:Collection, _id:Any, fields:dict):
+        ''' Buffer a `$set` update of a record by `_id` '''
+
+        with self._condition:
+            key = (collection.full_name, self._get_id_key(_id))
+            if pending:=self._pending.get(key):
+                self._merge(pending[1], fields)
+                self.coalesced_count += 1
+            else:
+                self._pending[key] = (collection, {'_id': _id, **dict(fields)})
+                # Wake up the background thread to start a new window
+                if len(self._pending) == 1:
+                    self._start()
+                    self._condition.notify()
+
+            self.added_count += 1
+            full = len(self._pending) >= self.max_size
+
+        # Apply back pressure instead of growing without bounds
+        if full:
+            self.flush()
+
+
+    def add_listener(self, listener:Callable[[Collection], None]):
+        ''' Call a function with each collection after buffered updates are written to it '''
+
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+
+    def flush(self):
+        ''' Write all pending updates to MongoDB '''
+
+        with self._flush_lock:
+            with self._condition:
+                pending, self._pending = self._pending, {}
+
+            if pending:
+                self._write(pending)
+
+
+    def _write(self, pending:dict[tuple[str, Any], tuple[Collection, dict]]):
+        ''' Write pending updates as unordered bulk writes for each collection '''
+
+        operations:dict[str, tuple[Collection, list[UpdateOne]]] = {}
+        for (namespace, _), (collection, fields) in pending.items():
+            _id = fields.pop('_id')
+            operations.setdefault(namespace, (collection, []))[1].append(UpdateOne({'_id': _id}, {'$set': fields}))
+
+        for namespace, (collection, updates) in operations.items():
+            for start in range(0, len(updates), self.batch_size):
+                batch = updates[start:start + self.batch_size]
+                try:
+                    collection.bulk_write(batch, ordered=False)
+                    written = len(batch)
+                except BulkWriteError as e:
+                    written = len(batch) - len(e.details.get('writeErrors', []))
+                    if written < len(batch):
+                        DatabaseLogger(collection.database.name, collection.name).error(
+                            f"* Failed to write [{len(batch) - written}] buffered updates: {e.details.get('writeErrors', [])[:5]} *"
+                        )
+                    if write_concern_errors:=e.details.get('writeConcernErrors'):
+                        DatabaseLogger(collection.database.name, collection.name).error(
+                            f"* Write concern not satisfied for [{written}] buffered updates: {write_concern_errors[:5]} *"
+                        )
+                except PyMongoError as e:
+                    written = 0
+                    DatabaseLogger(collection.database.name, collection.name).error(f"* Failed to write [{len(batch)}] buffered updates: {e} *")
+
+                with self._condition:
+                    self.written_count += written
+                    self.failed_count += len(batch) - written
+
+            for listener in self._listeners:
+                try:
+                    listener(collection)
+                except Exception as e:
+                    DatabaseLogger(collection.database.name, collection.name).error(f"* Failed to notify a listener of buffered updates: {e} *")
+
+        DatabaseLogger(DatabaseLogger._BASE_NAME).debug(
+            f"* Flushed [{len(pending)}] buffered updates. Coalescing ratio: [{self.coalescing_ratio}] *"
+        )
+
+
+    @property
+    def coalescing_ratio(self) -> float:
+        ''' Get the number of updates added for each record update sent to MongoDB '''
+
+        record_updates = self.added_count - self.coalesced_count
+        return round(self.added_count / record_updates, 3) if record_updates else 0.0
+
+
+    def get_stats(self) -> dict[str, Any]:
+        ''' Get statistics for the updates handled by the queue '''
+
+        with self._condition:
+            return {
+                'pending': len(self._pending),
+                'added': self.added_count,
+                'coalesced': self.coalesced_count,
+                'written': self.written_count,
+                'failed': self.failed_count,
+                'coalescing_ratio': self.coalescing_ratio
+            }
+
+
+    def stop(self):
+        ''' Stop the background thread and flush all pending updates '''
+
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+        if self._thread:
+            self._thread.join()
+        self.flush()
+
+
+    def _start(self):
+        ''' Start the background thread if it isn't running. Called with the lock held '''
+
+        if self._thread is None and not self._stopped:
+            self._thread = Thread(target=self._run, name='mongodb-write-behind', daemon=True)
+            self._thread.start()
+
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+
+                # Wait for the window to close so more updates to the same records can be merged
+                closes_at = time.monotonic() + self.window_ms / 1000
+                while not self._stopped and (remaining:=closes_at - time.monotonic()) > 0:
+                    self._condition.wait(remaining)
+
+            try:
+                self.flush()
+            except Exception as e:
+                DatabaseLogger(DatabaseLogger._BASE_NAME).error(f"* Failed to flush buffered updates: {e} *")
+
+
+    @staticmethod
+    def _merge(pending:dict, fields:dict):
+        ''' Merge `$set` fields into a pending update so the result is the same
+            as applying them in order. Paths can't conflict in a single `$set`, so
+            a field set under a pending object (like `a.b` after `a`) is set in it
+            and pending fields under a replaced field are removed
+        '''
+
+        for field, value in fields.items():
+            parent = next((pending_field for pending_field in pending if field.startswith(f"{pending_field}.")), None)
+            if parent and isinstance(pending[parent], dict):
+                container = pending[parent] = dict(pending[parent])
+                *path, name = field[len(parent) + 1:].split('.')
+                for key in path:
+                    container[key] = dict(container[key]) if isinstance(container.get(key), dict) else {}
+                    container = container[key]
+                container[name] = value
+                continue
+            elif parent:
+                del pending[parent]
+
+            for pending_field in [pending_field for pending_field in pending if pending_field.startswith(f"{field}.")]:
+                del pending[pending_field]
+            pending[field] = value
+
+
+    @staticmethod
+    def _get_id_key(_id:Any) -> Any:
+        return _id if getattr(type(_id), '__hash__', None) else repr(_id)
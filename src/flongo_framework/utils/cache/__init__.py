@@ -0,0 +1,4 @@
+from .cache_entry import Cache_Entry
+from .cache_store import Cache_Store
+from .lru_cache_store import LRU_Cache_Store
+from .sqlite_cache_store import SQLite_Cache_Store
@@ -0,0 +1,28 @@
+import time
+from dataclasses import dataclass, field
+
+@dataclass
+class Cache_Entry:
+    ''' A cached response body with its status, headers and expiration '''
+
+    body: bytes
+    status_code: int = 200
+    headers: list[tuple[str, str]] = field(default_factory=list)
+    # Generation of the cache namespace (like a collection) when the entry was created
+    generation: int = 0
+    # Time the entry stops being fresh
+    expires_at: float = 0
+    # Time the entry stops being served as a stale fallback
+    stale_until: float = 0
+
+
+    def is_fresh(self, generation:int) -> bool:
+        ''' Returns True if the entry has not expired or been invalidated '''
+
+        return self.generation == generation and time.time() < self.expires_at
+
+
+    def is_stale_usable(self) -> bool:
+        ''' Returns True if the entry can still be served when the data source is unavailable '''
+
+        return time.time() < self.stale_until
@@ -0,0 +1,40 @@
+from typing import Optional
+
+from .cache_entry import Cache_Entry
+
+class Cache_Store:
+    ''' Base class for storing cached responses
+
+        Entries are invalidated by namespace (like a MongoDB collection name)
+        by increasing the namespace generation, so entries created for an
+        older generation are no longer fresh
+    '''
+
+    def get(self, key:str) -> Optional[Cache_Entry]:
+        ''' Get a cached entry by key '''
+
+        raise NotImplementedError()
+
+
+    def set(self, key:str, entry:Cache_Entry):
+        ''' Store a cached entry by key '''
+
+        raise NotImplementedError()
+
+
+    def delete(self, key:str):
+        ''' Remove a cached entry by key '''
+
+        raise NotImplementedError()
+
+
+    def get_generation(self, namespace:str) -> int:
+        ''' Get the current generation of a namespace '''
+
+        raise NotImplementedError()
+
+
+    def invalidate(self, namespace:str):
+        ''' Invalidate all entries in a namespace '''
+
+        raise NotImplementedError()
@@ -0,0 +1,49 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
+
+from .cache_entry import Cache_Entry
+from .cache_store import Cache_Store
+
+class LRU_Cache_Store(Cache_Store):
+    ''' In-process cache store that keeps up to `max_entries` entries and
+        evicts the least recently used entry when it is full
+
+        Entries are not shared between worker processes
+    '''
+
+    def __init__(self, max_entries:int=1024) -> None:
+        self.max_entries = max_entries
+        self._entries:OrderedDict[str, Cache_Entry] = OrderedDict()
+        self._generations:dict[str, int] = {}
+        self._lock = Lock()
+
+
+    def get(self, key:str) -> Optional[Cache_Entry]:
+        with self._lock:
+            if (entry:=self._entries.get(key)) is not None:
+                self._entries.move_to_end(key)
+
+            return entry
+
+
+    def set(self, key:str, entry:Cache_Entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+    def delete(self, key:str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+    def get_generation(self, namespace:str) -> int:
+        return self._generations.get(namespace, 0)
+
+
+    def invalidate(self, namespace:str):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
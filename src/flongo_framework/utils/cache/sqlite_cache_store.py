@@ -0,0 +1,89 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from .cache_entry import Cache_Entry
+from .cache_store import Cache_Store
+
+class SQLite_Cache_Store(Cache_Store):
+    ''' Cache store backed by a SQLite database file so entries and
+        invalidations are shared between all worker processes on a host
+
+        Entries that can no longer be served are purged every 
+        `purge_interval` writes
+    '''
+
+    def __init__(self, path:str='/tmp/flongo_cache.sqlite3', timeout_secs:float=5.0, purge_interval:int=1000) -> None:
+        self.path = path
+        self.timeout_secs = timeout_secs
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._writes = 0
+        self._create_tables()
+
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        ''' Get the SQLite connection for the current thread. Connections
+            inherited from a parent process are never used after fork()
+        '''
+
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout_secs, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+
+        return connection
+
+
+    def _create_tables(self):
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, body BLOB, status_code INTEGER, '
+            'headers TEXT, generation INTEGER, expires_at REAL, stale_until REAL)'
+        )
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS generations (namespace TEXT PRIMARY KEY, generation INTEGER)'
+        )
+
+
+    def get(self, key:str) -> Optional[Cache_Entry]:
+        row = self._connection.execute(
+            'SELECT body, status_code, headers, generation, expires_at, stale_until FROM entries WHERE key = ?', (key,)
+        ).fetchone()
+
+        if row:
+            body, status_code, headers, generation, expires_at, stale_until = row
+            return Cache_Entry(body, status_code, [tuple(header) for header in json.loads(headers)], generation, expires_at, stale_until)
+
+
+    def set(self, key:str, entry:Cache_Entry):
+        self._connection.execute(
+            'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (key, entry.body, entry.status_code, json.dumps(entry.headers), entry.generation, entry.expires_at, entry.stale_until)
+        )
+
+        self._writes += 1
+        if self.purge_interval and self._writes % self.purge_interval == 0:
+            self._connection.execute('DELETE FROM entries WHERE stale_until < ?', (time.time(),))
+
+
+    def delete(self, key:str):
+        self._connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+
+
+    def get_generation(self, namespace:str) -> int:
+        row = self._connection.execute('SELECT generation FROM generations WHERE namespace = ?', (namespace,)).fetchone()
+        return row[0] if row else 0
+
+
+    def invalidate(self, namespace:str):
+        self._connection.execute(
+            'INSERT INTO generations VALUES (?, 1) ON CONFLICT(namespace) DO UPDATE SET generation = generation + 1',
+            (namespace,)
+        )
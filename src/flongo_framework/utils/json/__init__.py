@@ -1,2 +1,3 @@
 from .json_encoder import JSON_Encoder
+from .bson_json_converter import BSON_JSON_Converter
 from .json_provider import JSON_Provider
@@ -0,0 +1,77 @@
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+from bson import ObjectId, decode_all
+from bson.codec_options import CodecOptions, TypeDecoder, TypeRegistry
+from bson.decimal128 import Decimal128
+from bson.raw_bson import RawBSONDocument
+
+class BSON_JSON_Converter:
+    ''' Converts raw BSON documents read from MongoDB to JSON serializable
+        records in a single decoding pass
+
+        ObjectIds, datetimes and decimals are converted to strings by the
+        BSON decoder as the documents are decoded (using the same format as
+        `JSON_Encoder`), so records don't need to be walked again when they
+        are encoded. Read documents as `RawBSONDocument` to use it:
+        ```
+        collection.with_options(codec_options=BSON_JSON_Converter.get_raw_codec_options(collection.codec_options))
+        ```
+
+        Pass the codec options of the collection to `convert` so other values
+        (like timezone aware datetimes and UUIDs) are decoded the same way
+        they would be when the documents aren't read as raw BSON
+    '''
+
+    class _String_Decoder(TypeDecoder):
+        def __init__(self, bson_type:type, to_string:Callable[[Any], str]) -> None:
+            self._bson_type = bson_type
+            self._to_string = to_string
+
+        @property
+        def bson_type(self):
+            return self._bson_type
+
+        def transform_bson(self, value:Any) -> str:
+            return self._to_string(value)
+
+
+    CODEC_OPTIONS = CodecOptions(type_registry=TypeRegistry([
+        _String_Decoder(ObjectId, str),
+        # Same output as `strftime("%c")` in the default locale without parsing a format
+        _String_Decoder(datetime, datetime.ctime),
+        _String_Decoder(Decimal128, str)
+    ]))
+
+    @staticmethod
+    def get_raw_codec_options(codec_options:CodecOptions) -> CodecOptions:
+        ''' Get codec options that read documents as `RawBSONDocument` '''
+
+        return codec_options.with_options(document_class=RawBSONDocument)
+
+
+    @classmethod
+    def get_codec_options(cls, codec_options:Optional[CodecOptions]=None) -> CodecOptions:
+        ''' Get codec options that decode documents to JSON serializable records
+            with the other options (like `tz_aware` and `uuid_representation`)
+            of the passed codec options
+        '''
+
+        if codec_options is None:
+            return cls.CODEC_OPTIONS
+
+        return codec_options.with_options(document_class=dict, type_registry=cls.CODEC_OPTIONS.type_registry)
+
+
+    @classmethod
+    def convert(cls, documents:list[RawBSONDocument], codec_options:Optional[CodecOptions]=None) -> list[dict]:
+        ''' Convert a list of raw BSON documents read with the passed
+            codec options to JSON serializable records
+        '''
+
+        return decode_all(b''.join(document.raw for document in documents), cls.get_codec_options(codec_options))
+
+
+    @staticmethod
+    def is_raw(records:list[Any]) -> bool:
+        return bool(records) and all(isinstance(record, RawBSONDocument) for record in records)
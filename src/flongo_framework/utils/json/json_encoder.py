@@ -4,7 +4,9 @@ from json import JSONEncoder
 from decimal import Decimal
 
 from bson import ObjectId
+from bson.raw_bson import RawBSONDocument
 
+from ...utils.json.bson_json_converter import BSON_JSON_Converter
 from ...utils.logging.loggers.app import ApplicationLogger
 
 class JSON_Encoder(JSONEncoder):
@@ -28,6 +30,10 @@ class JSON_Encoder(JSONEncoder):
             if isinstance(obj, ObjectId):
                 return str(obj)
             
+            # Handle raw BSON documents read from MongoDB
+            if isinstance(obj, RawBSONDocument):
+                return BSON_JSON_Converter.convert([obj])[0]
+
             # Handle bytes
             if isinstance(obj, bytes):
                 return obj.decode()
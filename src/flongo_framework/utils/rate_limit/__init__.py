@@ -0,0 +1,4 @@
+from .rate_limit_result import Rate_Limit_Result
+from .rate_limit_store import Rate_Limit_Store
+from .memory_rate_limit_store import Memory_Rate_Limit_Store
+from .sqlite_rate_limit_store import SQLite_Rate_Limit_Store
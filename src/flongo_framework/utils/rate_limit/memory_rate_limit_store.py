@@ -0,0 +1,38 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from .rate_limit_result import Rate_Limit_Result
+from .rate_limit_store import Rate_Limit_Store
+
+class Memory_Rate_Limit_Store(Rate_Limit_Store):
+    ''' In-process rate limit store that keeps the buckets of up to
+        `max_keys` keys and evicts the least recently used bucket when it is full
+
+        Buckets are not shared between worker processes
+    '''
+
+    def __init__(self, max_keys:int=100000) -> None:
+        self.max_keys = max_keys
+        # Tokens left in each bucket and the time they were counted
+        self._buckets:OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = Lock()
+
+
+    def consume(self, key:str, capacity:int, refill_per_sec:float, cost:int=1) -> Rate_Limit_Result:
+        with self._lock:
+            now = time.monotonic()
+            if (bucket:=self._buckets.get(key)) is None:
+                tokens = float(capacity)
+            else:
+                tokens = self.refill(bucket[0], now - bucket[1], capacity, refill_per_sec)
+
+            if allowed:=(tokens >= cost):
+                tokens = min(capacity, tokens - cost)
+
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+        return self.get_result(allowed, tokens, capacity, refill_per_sec, cost)
@@ -0,0 +1,15 @@
+from dataclasses import dataclass
+
+@dataclass
+class Rate_Limit_Result:
+    ''' The result of taking tokens from a token bucket '''
+
+    allowed: bool
+    # Maximum tokens the bucket holds
+    limit: int
+    # Whole tokens left in the bucket
+    remaining: int
+    # Seconds until the bucket is full again
+    reset_secs: float = 0
+    # Seconds until enough tokens are back for a rejected request
+    retry_after_secs: float = 0
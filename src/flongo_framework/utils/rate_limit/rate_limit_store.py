@@ -0,0 +1,44 @@
+import math
+
+from .rate_limit_result import Rate_Limit_Result
+
+class Rate_Limit_Store:
+    ''' Base class for storing the token buckets of rate limits
+
+        Each bucket holds up to `capacity` tokens and is refilled with
+        `refill_per_sec` tokens each second. A request is allowed if it
+        can take `cost` tokens from its bucket. A negative `cost` returns tokens
+    '''
+
+    def consume(self, key:str, capacity:int, refill_per_sec:float, cost:int=1) -> Rate_Limit_Result:
+        ''' Take `cost` tokens from the bucket for a key if it has enough '''
+
+        raise NotImplementedError()
+
+
+    def refund(self, key:str, capacity:int, refill_per_sec:float, cost:int=1):
+        ''' Return `cost` tokens taken by a request that wasn't handled. Buckets
+            are never filled past `capacity`
+        '''
+
+        self.consume(key, capacity, refill_per_sec, -cost)
+
+
+    @staticmethod
+    def refill(tokens:float, elapsed_secs:float, capacity:int, refill_per_sec:float) -> float:
+        ''' Get the tokens in a bucket after `elapsed_secs` of refilling '''
+
+        return min(capacity, tokens + max(0, elapsed_secs) * refill_per_sec)
+
+
+    @staticmethod
+    def get_result(allowed:bool, tokens:float, capacity:int, refill_per_sec:float, cost:int=1) -> Rate_Limit_Result:
+        ''' Get the result of taking tokens from a bucket that has `tokens` left '''
+
+        return Rate_Limit_Result(
+            allowed=allowed,
+            limit=capacity,
+            remaining=max(0, math.floor(tokens)),
+            reset_secs=(capacity - tokens) / refill_per_sec,
+            retry_after_secs=0 if allowed else (cost - tokens) / refill_per_sec
+        )
@@ -0,0 +1,74 @@
+import os
+import sqlite3
+import threading
+import time
+
+from .rate_limit_result import Rate_Limit_Result
+from .rate_limit_store import Rate_Limit_Store
+
+class SQLite_Rate_Limit_Store(Rate_Limit_Store):
+    ''' Rate limit store backed by a SQLite database file so buckets are
+        shared between all worker processes on a host. Put the file on a
+        memory backed filesystem (like `/dev/shm`) to avoid disk writes
+
+        Buckets that are full again are purged every `purge_interval` requests
+    '''
+
+    def __init__(self, path:str='/tmp/flongo_rate_limits.sqlite3', timeout_secs:float=5.0, purge_interval:int=1000) -> None:
+        self.path = path
+        self.timeout_secs = timeout_secs
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._writes = 0
+        self._create_tables()
+
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        ''' Get the SQLite connection for the current thread. Connections
+            inherited from a parent process are never used after fork()
+        '''
+
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout_secs, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+
+        return connection
+
+
+    def _create_tables(self):
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated_at REAL, full_at REAL)'
+        )
+
+
+    def consume(self, key:str, capacity:int, refill_per_sec:float, cost:int=1) -> Rate_Limit_Result:
+        connection = self._connection
+        # Lock the database so concurrent workers can't take the same tokens
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            row = connection.execute('SELECT tokens, updated_at FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens = self.refill(row[0], now - row[1], capacity, refill_per_sec) if row else float(capacity)
+            if allowed:=(tokens >= cost):
+                tokens = min(capacity, tokens - cost)
+
+            connection.execute(
+                'INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?)',
+                (key, tokens, now, now + (capacity - tokens) / refill_per_sec)
+            )
+
+            self._writes += 1
+            if self.purge_interval and self._writes % self.purge_interval == 0:
+                connection.execute('DELETE FROM buckets WHERE full_at < ?', (now,))
+
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+        return self.get_result(allowed, tokens, capacity, refill_per_sec, cost)
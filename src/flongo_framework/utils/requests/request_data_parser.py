@@ -1,6 +1,6 @@
 
 
-from typing import Optional
+from typing import Optional, Union
 import xmltodict
 from flask import Request
 from QueryStringManager import QueryStringManager
@@ -15,14 +15,20 @@ class RequestDataParser:
     '''
 
     @classmethod
-    def get_request_data(cls, request:Request, logger:Optional[RoutingLogger]=None) -> dict:
+    def get_request_data(cls, request:Request, logger:Optional[RoutingLogger]=None) -> Union[dict, list[dict]]:
         ''' Gets the request data from a Flask request body
-            or query string
+            or query string. Returns a list of records if the 
+            request body is a JSON array
         '''
 
         query_string_params = cls.parse_query_string(request, logger)
         request_body_params = cls.parse_request_body(request, logger)
 
+        if isinstance(request_body_params, list):
+            if query_string_params and logger:
+                logger.warn(f"* Ignored QUERY STRING data for request with a JSON array body")
+            return request_body_params
+
         return {**query_string_params, **request_body_params}
 
 
@@ -40,7 +46,7 @@ class RequestDataParser:
 
 
     @classmethod
-    def parse_request_body(cls, request:Request, logger:Optional[RoutingLogger]=None) -> dict:
+    def parse_request_body(cls, request:Request, logger:Optional[RoutingLogger]=None) -> Union[dict, list[dict]]:
         ''' Parse the request body into a dictionary if one is present '''
 
         body = {}
@@ -0,0 +1,94 @@
+import os
+import sys
+from types import SimpleNamespace
+from typing import Any, Callable
+
+import mongomock
+import pytest
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from flongo_framework.application import Application
+from flongo_framework.api.routing import App_Routes, Route
+from flongo_framework.config.settings import App_Settings
+from flongo_framework.database.mongodb.collection_registry import MongoDB_Collection_Registry
+from flongo_framework.utils.json import JSON_Provider
+
+
+class Mock_Collection:
+    ''' mongomock collection that ignores the operation options mongomock doesn't support '''
+
+    UNSUPPORTED_OPTIONS = ['comment', 'hint', 'allowDiskUse', 'maxTimeMS', 'max_time_ms']
+
+    def __init__(self, collection:mongomock.Collection) -> None:
+        self._collection = collection
+
+
+    def __getattr__(self, name:str) -> Any:
+        attribute = getattr(self._collection, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            for option in self.UNSUPPORTED_OPTIONS:
+                kwargs.pop(option, None)
+            return attribute(*args, **kwargs)
+        return call
+
+
+class Fake_Clock:
+    ''' Replaces `time.monotonic` and `time.time` in a module with a clock moved by the test '''
+
+    def __init__(self, now:float=1000.0) -> None:
+        self.now = now
+
+
+    def __call__(self) -> float:
+        return self.now
+
+
+    def advance(self, secs:float):
+        self.now += secs
+
+
+@pytest.fixture
+def clock() -> Callable[[Any], Fake_Clock]:
+    ''' Get a function that replaces the clock of a module '''
+
+    patcher = pytest.MonkeyPatch()
+    def patch(module:Any) -> Fake_Clock:
+        fake_clock = Fake_Clock()
+        patcher.setattr(module, 'time', SimpleNamespace(monotonic=fake_clock, time=fake_clock, sleep=lambda secs: None))
+        return fake_clock
+
+    yield patch
+    patcher.undo()
+
+
+@pytest.fixture
+def database() -> mongomock.Database:
+    return mongomock.MongoClient().db
+
+
+@pytest.fixture
+def make_app(database:mongomock.Database) -> Callable[..., Flask]:
+    ''' Get a function that creates a Flask app serving the passed routes from a mongomock database '''
+
+    def make(*routes:Route, settings:App_Settings=None) -> Flask:
+        settings = settings or App_Settings()
+        app = Flask(__name__)
+        app.config['APP_SETTINGS'] = settings
+
+        registry = MongoDB_Collection_Registry(settings.mongodb)
+        registry.get_collection = lambda name, *args, **kwargs: Mock_Collection(database[name])
+        registry.validate_connection = lambda *args, **kwargs: True
+        registry.log_slow_queries = lambda: None
+        app.config[MongoDB_Collection_Registry.FLASK_REGISTRY_KEY] = registry
+
+        App_Routes(*routes).register_routes(app, settings)
+        Application._register_error_handlers(SimpleNamespace(app=app, settings=settings))
+        app.json = JSON_Provider(app)
+        return app
+
+    return make
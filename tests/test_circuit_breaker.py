@@ -0,0 +1,164 @@
+import pytest
+from pymongo.errors import AutoReconnect, NetworkTimeout, OperationFailure
+
+from flongo_framework.api.routing import Route
+from flongo_framework.api.routing.handlers.default_route_handler import Default_Route_Handler
+from flongo_framework.config.settings import App_Settings
+from flongo_framework.database.errors.database_error import DatabaseError
+from flongo_framework.database.mongodb import circuit_breaker
+from flongo_framework.database.mongodb.circuit_breaker import MongoDB_Circuit_Breaker
+from flongo_framework.database.mongodb.collection_registry import MongoDB_Collection_Registry
+
+
+@pytest.fixture
+def breaker_clock(clock):
+    return clock(circuit_breaker)
+
+
+@pytest.fixture
+def breaker(breaker_clock) -> MongoDB_Circuit_Breaker:
+    return MongoDB_Circuit_Breaker(failure_threshold=3, reset_timeout_secs=10)
+
+
+def fail(breaker:MongoDB_Circuit_Breaker, error:BaseException=AutoReconnect('connection refused'), **options):
+    with pytest.raises(type(error)):
+        with breaker.guard(**options):
+            raise error
+
+
+def succeed(breaker:MongoDB_Circuit_Breaker):
+    with breaker.guard():
+        pass
+
+
+def open_breaker(breaker:MongoDB_Circuit_Breaker):
+    for _ in range(breaker.failure_threshold):
+        fail(breaker)
+    assert breaker.state == MongoDB_Circuit_Breaker.OPEN
+
+
+def test_opens_after_consecutive_failures(breaker):
+    fail(breaker)
+    fail(breaker)
+    assert breaker.state == MongoDB_Circuit_Breaker.CLOSED
+
+    fail(breaker)
+    assert breaker.state == MongoDB_Circuit_Breaker.OPEN
+    assert breaker.get_stats()['times_opened'] == 1
+
+
+def test_success_resets_consecutive_failures(breaker):
+    fail(breaker)
+    fail(breaker)
+    succeed(breaker)
+    fail(breaker)
+    fail(breaker)
+
+    assert breaker.state == MongoDB_Circuit_Breaker.CLOSED
+    assert breaker.get_stats()['consecutive_failures'] == 2
+
+
+def test_open_breaker_rejects_with_retry_after(breaker, breaker_clock):
+    open_breaker(breaker)
+    breaker_clock.advance(4)
+
+    with pytest.raises(DatabaseError) as error:
+        succeed(breaker)
+
+    assert error.value.code == 503
+    assert error.value.data['retry_after_secs'] == 6
+    assert breaker.get_stats()['rejected'] == 1
+
+
+def test_half_open_lets_one_probe_through(breaker, breaker_clock):
+    open_breaker(breaker)
+    breaker_clock.advance(10)
+    assert breaker.state == MongoDB_Circuit_Breaker.HALF_OPEN
+
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+
+def test_successful_probe_closes_breaker(breaker, breaker_clock):
+    open_breaker(breaker)
+    breaker_clock.advance(10)
+
+    succeed(breaker)
+
+    assert breaker.state == MongoDB_Circuit_Breaker.CLOSED
+    assert breaker.get_stats()['consecutive_failures'] == 0
+    succeed(breaker)
+
+
+def test_failed_probe_opens_breaker_again(breaker, breaker_clock):
+    open_breaker(breaker)
+    breaker_clock.advance(10)
+
+    fail(breaker)
+
+    assert breaker.state == MongoDB_Circuit_Breaker.OPEN
+    assert breaker.get_retry_after_secs() == 10
+    assert breaker.get_stats()['times_opened'] == 2
+
+
+def test_inconclusive_probe_lets_another_probe_through(breaker, breaker_clock):
+    open_breaker(breaker)
+    breaker_clock.advance(10)
+
+    fail(breaker, ValueError('not a database error'))
+
+    assert breaker.state == MongoDB_Circuit_Breaker.HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_operation_errors_reach_the_database(breaker, breaker_clock):
+    fail(breaker)
+    fail(breaker)
+    fail(breaker, OperationFailure('duplicate key', code=11000))
+
+    assert breaker.state == MongoDB_Circuit_Breaker.CLOSED
+    assert breaker.get_stats()['consecutive_failures'] == 0
+
+
+def test_only_unavailable_database_errors_are_failures(breaker):
+    for _ in range(5):
+        fail(breaker, DatabaseError('Missing collection name', code=400))
+    assert breaker.state == MongoDB_Circuit_Breaker.CLOSED
+
+    for _ in range(3):
+        fail(breaker, DatabaseError('Heartbeat failed', code=503))
+    assert breaker.state == MongoDB_Circuit_Breaker.OPEN
+
+
+def test_timeouts_caused_by_request_deadline_are_not_failures(breaker, breaker_clock):
+    for _ in range(5):
+        fail(breaker, NetworkTimeout('timed out'), deadline=breaker_clock.now)
+    assert breaker.state == MongoDB_Circuit_Breaker.CLOSED
+
+    for _ in range(3):
+        fail(breaker, NetworkTimeout('timed out'), deadline=breaker_clock.now + 5)
+    assert breaker.state == MongoDB_Circuit_Breaker.OPEN
+
+
+def test_threshold_of_zero_disables_breaker(breaker_clock):
+    breaker = MongoDB_Circuit_Breaker(failure_threshold=0)
+    for _ in range(10):
+        fail(breaker)
+
+    assert breaker.state == MongoDB_Circuit_Breaker.CLOSED
+    succeed(breaker)
+
+
+
+def test_routes_fail_fast_with_503_while_open(make_app, breaker_clock):
+    settings = App_Settings()
+    settings.mongodb.circuit_breaker_failure_threshold = 3
+    settings.mongodb.circuit_breaker_reset_timeout_ms = 10000
+    app = make_app(Route(url='/records', handler=Default_Route_Handler(), collection_name='records'), settings=settings)
+    open_breaker(MongoDB_Collection_Registry.get_registry(app).circuit_breaker)
+    breaker_clock.advance(2.5)
+
+    response = app.test_client().get('/records')
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '8'
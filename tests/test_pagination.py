@@ -0,0 +1,147 @@
+import pytest
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from QueryStringManager import QueryStringManager
+
+from flongo_framework.api.requests.pagination import Request_Pagination
+from flongo_framework.api.responses.errors.api_error import API_Error
+from flongo_framework.api.routing import Route
+from flongo_framework.api.routing.handlers.default_route_handler import Default_Route_Handler
+
+# Records with a null or missing `rank` sort before all others in ascending order, like in MongoDB
+RECORDS = [
+    {'_id': 1, 'rank': 3},
+    {'_id': 2, 'rank': None},
+    {'_id': 3, 'rank': 1},
+    {'_id': 4},
+    {'_id': 5, 'rank': 3},
+    {'_id': 6, 'rank': 2},
+    {'_id': 7, 'rank': None},
+]
+ASCENDING_IDS = [2, 4, 7, 3, 6, 1, 5]
+DESCENDING_IDS = [5, 1, 6, 3, 7, 4, 2]
+
+
+@pytest.fixture
+def client(make_app, database):
+    database['records'].insert_many([dict(record) for record in RECORDS])
+    return make_app(
+        Route(url='/records', handler=Default_Route_Handler(), collection_name='records', sort_fields=['rank'])
+    ).test_client()
+
+
+def read_all_pages(client, **query) -> tuple[list, int]:
+    ''' Follow the `next` cursors of a paginated route and return the _ids read and the number of pages '''
+
+    ids, pages, after = [], 0, None
+    while True:
+        response = client.get('/records', query_string={**query, **({'after': after} if after else {})})
+        assert response.status_code == 200
+        ids += [record['_id'] for record in response.json['data']]
+        pages += 1
+        if not (after:=response.json['next']):
+            return ids, pages
+
+
+@pytest.mark.parametrize('sort, expected', [
+    ('_id', sorted(record['_id'] for record in RECORDS)),
+    ('-_id', sorted((record['_id'] for record in RECORDS), reverse=True)),
+    ('rank', ASCENDING_IDS),
+    ('-rank', DESCENDING_IDS)
+])
+@pytest.mark.parametrize('limit', [1, 2, 3, 7])
+def test_pages_read_every_record_once_in_order(client, sort, expected, limit):
+    ids, pages = read_all_pages(client, sort=sort, limit=limit)
+
+    assert ids == expected
+    assert pages == -(-len(RECORDS) // limit)
+
+
+def test_next_cursor_is_returned_in_envelope_and_header(client):
+    response = client.get('/records', query_string={'sort': 'rank', 'limit': 2})
+
+    assert response.json['next']
+    assert response.headers[Default_Route_Handler.NEXT_CURSOR_HEADER] == response.json['next']
+
+
+def test_single_record_page_uses_envelope(client):
+    response = client.get('/records', query_string={'sort': '-rank', 'limit': 1})
+
+    assert response.status_code == 200
+    assert response.json['data'] == [{'_id': 5, 'rank': 3}]
+    assert response.json['next']
+
+
+def test_empty_page_is_404_with_envelope(client):
+    response = client.get('/records', query_string={'rank': 10, 'limit': 2})
+
+    assert response.status_code == 404
+    assert response.json == {'data': [], 'next': None}
+
+
+def test_pages_are_filtered(client):
+    ids, _ = read_all_pages(client, sort='-rank', limit=1, rank=3)
+
+    assert ids == [5, 1]
+
+
+def test_cursor_round_trips_null_values():
+    pagination = Request_Pagination(limit=2, sort_field='rank', sort_order=DESCENDING)
+    cursor = pagination.get_next_cursor({'_id': 7})
+
+    after = Request_Pagination.from_payload({'after': cursor, 'sort': '-rank', 'limit': 2}, sort_fields=['rank']).after
+
+    assert after == (None, 7)
+
+
+@pytest.mark.parametrize('last_record', [{'_id': 5, 'rank': 3}, {'_id': ObjectId(), 'rank': 3.5}, {'_id': ObjectId()}])
+def test_cursor_round_trips_through_query_string(last_record):
+    cursor = Request_Pagination(2, 'rank', DESCENDING).get_next_cursor(last_record)
+    # The query string parser decodes some cursors to lists
+    payload = QueryStringManager.parse(f"after={cursor}&sort=-rank")
+
+    after = Request_Pagination.from_payload(payload, sort_fields=['rank']).after
+
+    assert after == (last_record.get('rank'), last_record['_id'])
+
+
+def test_keyset_filter_for_null_values():
+    ascending = Request_Pagination(2, 'rank', ASCENDING, after=(None, 4))
+    descending = Request_Pagination(2, 'rank', DESCENDING, after=(None, 4))
+
+    assert ascending.apply({}) == {'$or': [{'rank': {'$ne': None}}, {'rank': None, '_id': {'$gt': 4}}]}
+    assert descending.apply({}) == {'rank': None, '_id': {'$lt': 4}}
+
+
+def test_keyset_filter_includes_null_values_after_descending_values():
+    pagination = Request_Pagination(2, 'rank', DESCENDING, after=(2, 6))
+
+    assert pagination.apply({'kind': 'a'}) == {'$and': [
+        {'kind': 'a'},
+        {'$or': [{'rank': {'$lt': 2}}, {'rank': 2, '_id': {'$lt': 6}}, {'rank': None}]}
+    ]}
+
+
+@pytest.mark.parametrize('payload', [
+    {'sort': 'name'},
+    {'limit': 0},
+    {'limit': 'ten'},
+    {'after': 'not a cursor'},
+])
+def test_invalid_pagination_fields_are_rejected(payload):
+    with pytest.raises(API_Error) as error:
+        Request_Pagination.from_payload(payload, default_limit=10, max_limit=100, sort_fields=['rank'])
+
+    assert error.value.status_code == 400
+
+
+def test_cursor_for_another_sort_is_rejected():
+    cursor = Request_Pagination(2, 'rank', ASCENDING).get_next_cursor({'_id': 1, 'rank': 3})
+
+    with pytest.raises(API_Error):
+        Request_Pagination.from_payload({'after': cursor, 'sort': '-rank'}, sort_fields=['rank'])
+
+
+def test_limit_is_capped_by_route_maximum():
+    assert Request_Pagination.from_payload({'limit': 500}, default_limit=10, max_limit=100).limit == 100
+    assert Request_Pagination.from_payload({}, default_limit=10, max_limit=100).limit == 10
@@ -0,0 +1,172 @@
+import pytest
+
+from flongo_framework.api.routing import Route, Route_Rate_Limit
+from flongo_framework.api.routing.handlers.default_route_handler import Default_Route_Handler
+from flongo_framework.utils.rate_limit import Memory_Rate_Limit_Store, Rate_Limit_Store, SQLite_Rate_Limit_Store
+from flongo_framework.utils.rate_limit import memory_rate_limit_store, sqlite_rate_limit_store
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store_and_clock(request, clock, tmp_path) -> tuple[Rate_Limit_Store, object]:
+    if request.param == 'memory':
+        return Memory_Rate_Limit_Store(), clock(memory_rate_limit_store)
+    return SQLite_Rate_Limit_Store(str(tmp_path / 'rate_limits.sqlite3')), clock(sqlite_rate_limit_store)
+
+
+def test_bucket_allows_burst_then_rejects(store_and_clock):
+    store, _ = store_and_clock
+
+    results = [store.consume('key', capacity=3, refill_per_sec=0.5) for _ in range(4)]
+
+    assert [result.allowed for result in results] == [True, True, True, False]
+    assert [result.remaining for result in results] == [2, 1, 0, 0]
+    assert results[-1].retry_after_secs == 2
+    assert results[-1].reset_secs == 6
+
+
+def test_bucket_refills_over_time(store_and_clock):
+    store, clock = store_and_clock
+    for _ in range(3):
+        store.consume('key', capacity=3, refill_per_sec=0.5)
+
+    clock.advance(1)
+    assert not store.consume('key', capacity=3, refill_per_sec=0.5).allowed
+
+    clock.advance(1)
+    result = store.consume('key', capacity=3, refill_per_sec=0.5)
+    assert result.allowed and result.remaining == 0
+
+
+def test_bucket_never_refills_past_capacity(store_and_clock):
+    store, clock = store_and_clock
+    store.consume('key', capacity=3, refill_per_sec=0.5)
+
+    clock.advance(3600)
+    store.refund('key', capacity=3, refill_per_sec=0.5)
+
+    assert store.consume('key', capacity=3, refill_per_sec=0.5).remaining == 2
+
+
+def test_refund_returns_a_token(store_and_clock):
+    store, _ = store_and_clock
+    store.consume('key', capacity=3, refill_per_sec=0.5)
+    store.consume('key', capacity=3, refill_per_sec=0.5)
+
+    store.refund('key', capacity=3, refill_per_sec=0.5)
+
+    assert store.consume('key', capacity=3, refill_per_sec=0.5).remaining == 1
+
+
+def test_buckets_are_kept_per_key(store_and_clock):
+    store, _ = store_and_clock
+    store.consume('a', capacity=1, refill_per_sec=1)
+
+    assert not store.consume('a', capacity=1, refill_per_sec=1).allowed
+    assert store.consume('b', capacity=1, refill_per_sec=1).allowed
+
+
+def test_memory_store_evicts_least_recently_used_bucket(clock):
+    clock(memory_rate_limit_store)
+    store = Memory_Rate_Limit_Store(max_keys=2)
+    store.consume('a', capacity=1, refill_per_sec=1)
+    store.consume('b', capacity=1, refill_per_sec=1)
+    store.consume('a', capacity=1, refill_per_sec=1)
+    store.consume('c', capacity=1, refill_per_sec=1)
+
+    assert not store.consume('a', capacity=1, refill_per_sec=1).allowed
+    assert store.consume('b', capacity=1, refill_per_sec=1).allowed
+
+
+@pytest.fixture
+def route_clock(clock):
+    return clock(memory_rate_limit_store)
+
+
+def make_client(make_app, *rate_limits:Route_Rate_Limit):
+    return make_app(
+        Route(url='/records', handler=Default_Route_Handler(), collection_name='records', rate_limits=list(rate_limits))
+    ).test_client()
+
+
+def test_responses_include_rate_limit_headers(make_app, route_clock):
+    client = make_client(make_app, Route_Rate_Limit(limit=2, period_secs=60))
+
+    response = client.get('/records')
+
+    assert response.headers['RateLimit-Limit'] == '2'
+    assert response.headers['RateLimit-Remaining'] == '1'
+    assert response.headers['RateLimit-Reset'] == '30'
+    assert response.headers['RateLimit-Policy'] == '2;w=60'
+    assert 'Retry-After' not in response.headers
+
+
+def test_requests_over_the_limit_are_rejected_until_refilled(make_app, route_clock):
+    # Refills a token every 32 seconds
+    client = make_client(make_app, Route_Rate_Limit(limit=2, period_secs=64))
+    client.get('/records')
+    client.get('/records')
+
+    route_clock.advance(16)
+    response = client.get('/records')
+
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '16'
+    assert response.headers['RateLimit-Remaining'] == '0'
+
+    route_clock.advance(16)
+    assert client.get('/records').status_code != 429
+
+
+def test_only_limited_methods_are_counted(make_app, route_clock):
+    client = make_client(make_app, Route_Rate_Limit(limit=1, period_secs=60, methods=['POST']))
+
+    assert client.get('/records').status_code != 429
+    assert client.get('/records').status_code != 429
+    assert 'RateLimit-Limit' not in client.get('/records').headers
+
+
+def test_rejected_requests_are_refunded_to_other_limits(make_app, route_clock):
+    class Recording_Store(Memory_Rate_Limit_Store):
+        def consume(self, key, capacity, refill_per_sec, cost=1):
+            result = super().consume(key, capacity, refill_per_sec, cost)
+            self.remaining.append(result.remaining)
+            return result
+
+    store = Recording_Store()
+    store.remaining = []
+    client = make_client(make_app,
+        Route_Rate_Limit(limit=10, period_secs=60, store=store),
+        Route_Rate_Limit(limit=1, period_secs=60)
+    )
+    client.get('/records')
+
+    for _ in range(3):
+        assert client.get('/records').status_code == 429
+
+    # Each rejected request takes a token from the first limit and then refunds it
+    assert store.remaining == [9, 8, 9, 8, 9, 8, 9]
+
+
+def test_most_limited_headers_are_returned(make_app, route_clock):
+    client = make_client(make_app,
+        Route_Rate_Limit(limit=10, period_secs=60),
+        Route_Rate_Limit(limit=3, period_secs=60)
+    )
+
+    response = client.get('/records')
+
+    assert response.headers['RateLimit-Limit'] == '3'
+    assert response.headers['RateLimit-Remaining'] == '2'
+
+
+def test_store_errors_reject_requests_with_503(make_app, route_clock):
+    class Failing_Store(Rate_Limit_Store):
+        def consume(self, key, capacity, refill_per_sec, cost=1):
+            raise ConnectionError('store is down')
+
+    client = make_client(make_app, Route_Rate_Limit(limit=10, period_secs=60, store=Failing_Store()))
+
+    response = client.get('/records')
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
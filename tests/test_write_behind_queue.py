@@ -0,0 +1,192 @@
+import time
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from flongo_framework.api.routing import Route
+from flongo_framework.api.routing.handlers.default_route_handler import Default_Route_Handler
+from flongo_framework.database.mongodb.write_behind_queue import MongoDB_Write_Behind_Queue
+
+
+@pytest.fixture
+def queue():
+    # The window is long enough that only the test flushes the queue
+    queue = MongoDB_Write_Behind_Queue(window_ms=60000, max_size=100, batch_size=2)
+    yield queue
+    queue.stop()
+
+
+@pytest.fixture
+def collection(database):
+    database['jobs'].insert_many([{'_id': _id, 'progress': 0, 'meta': {'owner': 'a'}} for _id in range(5)])
+    return database['jobs']
+
+
+@pytest.mark.parametrize('updates, merged', [
+    ([{'a': 1}, {'b': 2}], {'a': 1, 'b': 2}),
+    ([{'a': 1}, {'a': 2}], {'a': 2}),
+    ([{'a': {'b': 1}}, {'a.c': 2}], {'a': {'b': 1, 'c': 2}}),
+    ([{'a': {'b': {'c': 1}}}, {'a.b.d': 2}], {'a': {'b': {'c': 1, 'd': 2}}}),
+    ([{'a': {'b': 1}}, {'a.b.c': 2}], {'a': {'b': {'c': 2}}}),
+    ([{'a': 5}, {'a.b': 1}], {'a.b': 1}),
+    ([{'a.b': 1, 'a.c': 2}, {'a': 3}], {'a': 3}),
+])
+def test_merged_updates(updates, merged):
+    pending = {}
+    for fields in updates:
+        MongoDB_Write_Behind_Queue._merge(pending, fields)
+
+    assert pending == merged
+
+
+def test_merge_does_not_change_added_values(queue, collection):
+    fields = {'meta': {'owner': 'b'}}
+    queue.add(collection, 1, fields)
+    queue.add(collection, 1, {'meta.group': 'x'})
+
+    assert fields == {'meta': {'owner': 'b'}}
+
+
+@pytest.mark.parametrize('updates', [
+    [{'progress': 10}, {'progress': 20, 'status': 'running'}, {'status': 'done'}],
+    [{'meta.owner': 'b'}, {'meta': {'owner': 'c', 'group': 'x'}}, {'meta.group': 'y'}],
+    [{'meta': {'owner': 'b'}}, {'meta.tags.first': 1}, {'meta.tags.second': 2}],
+    [{'meta.owner': 'b'}, {'meta': 'none'}, {'progress': 5}],
+])
+def test_merged_update_matches_updates_applied_in_order(queue, collection, database, updates):
+    database['replayed'].insert_one(collection.find_one({'_id': 1}))
+    for fields in updates:
+        database['replayed'].update_one({'_id': 1}, {'$set': fields})
+        queue.add(collection, 1, fields)
+
+    queue.flush()
+
+    assert collection.find_one({'_id': 1}) == database['replayed'].find_one({'_id': 1})
+
+
+def test_updates_to_the_same_record_are_coalesced(queue, collection):
+    for progress in range(1, 11):
+        queue.add(collection, 1, {'progress': progress * 10})
+    queue.add(collection, 2, {'progress': 50})
+
+    stats = queue.get_stats()
+    assert stats['pending'] == 2
+    assert stats['added'] == 11
+    assert stats['coalesced'] == 9
+    assert stats['coalescing_ratio'] == 5.5
+
+
+def test_flush_writes_pending_updates_in_batches(queue, collection, database, monkeypatch):
+    batches = []
+    original_bulk_write = type(collection).bulk_write
+    def bulk_write(self, operations, **options):
+        batches.append(len(operations))
+        return original_bulk_write(self, operations, **options)
+    monkeypatch.setattr(type(collection), 'bulk_write', bulk_write)
+    for _id in range(5):
+        queue.add(collection, _id, {'progress': 100})
+    queue.add(database['other'], 1, {'progress': 100})
+
+    queue.flush()
+
+    assert sorted(batches) == [1, 1, 2, 2]
+    assert [record['progress'] for record in collection.find()] == [100] * 5
+    assert queue.get_stats()['pending'] == 0
+    assert queue.get_stats()['written'] == 6
+
+
+def test_flush_does_not_create_records(queue, collection):
+    queue.add(collection, 'missing', {'progress': 100})
+
+    queue.flush()
+
+    assert collection.count_documents({}) == 5
+    assert queue.get_stats()['written'] == 1
+
+
+def test_updates_added_after_a_flush_are_written_next_flush(queue, collection):
+    queue.add(collection, 1, {'progress': 10})
+    queue.flush()
+    queue.add(collection, 1, {'status': 'done'})
+
+    assert collection.find_one({'_id': 1})['progress'] == 10
+    assert 'status' not in collection.find_one({'_id': 1})
+
+    queue.flush()
+    assert collection.find_one({'_id': 1})['status'] == 'done'
+
+
+def test_full_queue_is_flushed_when_adding(collection):
+    queue = MongoDB_Write_Behind_Queue(window_ms=60000, max_size=3)
+    try:
+        queue.add(collection, 1, {'progress': 10})
+        queue.add(collection, 2, {'progress': 10})
+        queue.add(collection, 1, {'progress': 20})
+        assert queue.get_stats()['pending'] == 2
+
+        queue.add(collection, 3, {'progress': 10})
+        assert queue.get_stats()['pending'] == 0
+        assert collection.count_documents({'progress': {'$gt': 0}}) == 3
+    finally:
+        queue.stop()
+
+
+def test_background_thread_flushes_after_window(collection):
+    queue = MongoDB_Write_Behind_Queue(window_ms=10)
+    try:
+        queue.add(collection, 1, {'progress': 10})
+        deadline = time.monotonic() + 5
+        while queue.get_stats()['written'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert collection.find_one({'_id': 1})['progress'] == 10
+    finally:
+        queue.stop()
+
+
+def test_stop_flushes_pending_updates(collection):
+    queue = MongoDB_Write_Behind_Queue(window_ms=60000)
+    queue.add(collection, 1, {'progress': 10})
+
+    queue.stop()
+
+    assert collection.find_one({'_id': 1})['progress'] == 10
+
+
+def test_failed_writes_are_counted(queue, collection, monkeypatch):
+    def bulk_write(self, operations, **options):
+        raise BulkWriteError({'writeErrors': [{'index': 0, 'code': 9, 'errmsg': 'failed'}]})
+    monkeypatch.setattr(type(collection), 'bulk_write', bulk_write)
+    queue.add(collection, 1, {'progress': 10})
+    queue.add(collection, 2, {'progress': 10})
+
+    queue.flush()
+
+    assert queue.get_stats()['written'] == 1
+    assert queue.get_stats()['failed'] == 1
+
+
+def test_listeners_are_called_with_written_collections(queue, collection):
+    written = []
+    queue.add_listener(lambda written_collection: written.append(written_collection.name))
+    queue.add(collection, 1, {'progress': 10})
+
+    queue.flush()
+    queue.flush()
+
+    assert written == ['jobs']
+
+
+def test_patch_requests_are_buffered(make_app, database, queue):
+    database['jobs'].insert_one({'_id': 'job', 'progress': 0})
+    client = make_app(
+        Route(url='/jobs', handler=Default_Route_Handler(write_behind=queue), collection_name='jobs')
+    ).test_client()
+
+    for progress in (10, 20, 30):
+        assert client.patch('/jobs', json={'_id': 'job', 'progress': progress}).status_code == 202
+    assert database['jobs'].find_one({'_id': 'job'})['progress'] == 0
+
+    queue.flush()
+    assert database['jobs'].find_one({'_id': 'job'})['progress'] == 30
+    assert queue.get_stats()['coalesced'] == 2